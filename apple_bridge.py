@@ -5,57 +5,380 @@ AppleScript桥接模块
 用于与macOS备忘录应用程序交互
 """
 
+import os
+import json
+import time
+import sqlite3
 import subprocess
 import logging
-from typing import List, Optional, Dict, Any
+import tempfile
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict, Any, Iterator, Callable
 import re
 
+from osascript_pool import OsascriptWorkerPool, ScriptRunnerError
+from applescript_templates import SCRIPT_TEMPLATES, CompiledScriptCache
+from notes_index import NotesIndex, FolderTree
+from note_manifest import NoteManifest
+from notes_backend import NotesBackend
+from concurrency import AdaptiveConcurrencyLimiter
+from resilience import (
+    ScriptRetrier, ERROR_TIMEOUT, ERROR_PERMISSION, RETRYABLE_ERRORS, SAFE_RETRY_ERRORS, classify_error, parse_error_code
+)
+from notestore_reader import NoteStoreReader, NoteStoreError
+from cassette import ScriptCassette
+from metrics import OperationMetrics, timed_operation
+from jxa_stream import (
+    JXA_LIST_FOLDERS_SCRIPT,
+    JXA_LIST_NOTES_SCRIPT,
+    JXA_COUNT_NOTES_SCRIPT,
+    JXA_NOTE_INFO_SCRIPT,
+    JXA_APPLY_BATCH_SCRIPT,
+    stream_records
+)
+
 logger = logging.getLogger(__name__)
 
-class AppleScriptBridge:
+# 脚本捕获错误后返回 "error: 错误信息 (错误码)"
+SCRIPT_ERROR_PREFIX = "error: "
+
+class AppleScriptBridge(NotesBackend):
     """AppleScript桥接类，封装与备忘录应用的交互"""
     
-    def __init__(self, account: str = "iCloud", default_folder: str = "Notes"):
+    # 批量写入时每个操作额外增加的超时秒数
+    BATCH_TIMEOUT_PER_OP = 2.0
+    
+    def __init__(self, account: str = "iCloud", default_folder: str = "Notes",
+                 worker_pool: Optional[OsascriptWorkerPool] = None,
+                 manifest: Optional[NoteManifest] = None,
+                 body_transport: str = "inline",
+                 script_cache: Optional[CompiledScriptCache] = None,
+                 read_protocol: str = "text",
+                 jxa_command: Optional[List[str]] = None,
+                 max_batch_size: int = 50,
+                 max_batch_bytes: int = 4 * 1024 * 1024,
+                 cache_folders: bool = True,
+                 concurrency: Optional[AdaptiveConcurrencyLimiter] = None,
+                 retrier: Optional[ScriptRetrier] = None,
+                 script_timeout: float = 30, timeout_per_mb: float = 10,
+                 read_store: Optional[NoteStoreReader] = None,
+                 cassette: Optional[ScriptCassette] = None,
+                 metrics: Optional[OperationMetrics] = None):
         """
         初始化AppleScript桥接
         
         Args:
             account: 备忘录账户名，默认为"iCloud"
             default_folder: 默认文件夹名，默认为"Notes"
+            worker_pool: 常驻osascript进程池，为None时每次调用启动新的osascript进程
+            manifest: 源文件到备忘录ID的清单，为None时只能按标题定位备忘录
+            body_transport: 备忘录正文的传递方式，"inline" 拼接进脚本文本，
+                            "file" 写入临时文件并由固定脚本通过 on run argv 读取
+            script_cache: 预编译脚本缓存。提供时所有有模板的操作都执行已编译的参数化模板
+                          （正文同样经临时文件传递），不再为每次调用生成并编译新脚本
+            read_protocol: 读取类操作的返回格式，"text" 为 "|||" 拼接的字符串，
+                           "json" 由JXA脚本逐行输出JSON记录并流式解析
+                           （每次读取启动新的JXA进程，不经过进程池和重试器）
+            jxa_command: 执行JXA读取脚本的命令，默认 osascript -l JavaScript
+            max_batch_size: apply_batch 单次脚本调用包含的最大操作数
+            max_batch_bytes: apply_batch 单次脚本调用的最大正文字节数
+            cache_folders: 是否缓存嵌套文件夹树。首次需要时用一次脚本加载，
+                           之后的文件夹检查和本地创建的文件夹都在缓存中完成
+            concurrency: 自适应并发控制器，提供时 apply_batch 的各组脚本并发执行，
+                         并发数由控制器根据延迟和失败情况调整
+            retrier: 重试器，提供时超时、备忘录未运行等可重试错误按退避策略重试，
+                     备忘录持续无响应时由其熔断器暂停后续调用
+            script_timeout: 单个脚本的基础超时秒数
+            timeout_per_mb: 正文每MB增加的超时秒数，大正文的写入按大小放宽超时
+            read_store: 备忘录数据库只读查询器，提供时文件夹列表、标题查找和修改时间
+                        直接查询数据库，查询失败时退回脚本
+            cassette: 脚本录制文件，录制模式下记录每次脚本调用，回放模式下不执行脚本而返回录制结果；
+                      为None时按 MINDSYNC_CASSETTE_MODE 等环境变量创建
+            metrics: 操作统计，提供时记录每类操作的调用次数、正文字节数和延迟直方图
         """
-        self.account = account
-        self.default_folder = default_folder
+        if body_transport not in ("inline", "file"):
+            raise ValueError(f"不支持的正文传递方式: {body_transport}")
+        if read_protocol not in ("text", "json"):
+            raise ValueError(f"不支持的读取协议: {read_protocol}")
+        
+        super().__init__(account, default_folder)
+        self.worker_pool = worker_pool
+        self.manifest = manifest
+        self.body_transport = body_transport
+        self.script_cache = script_cache
+        self.read_protocol = read_protocol
+        self.jxa_command = jxa_command
+        self.max_batch_size = max_batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.cache_folders = cache_folders
+        self.concurrency = concurrency
+        self.retrier = retrier
+        self.script_timeout = script_timeout
+        self.timeout_per_mb = timeout_per_mb
+        self.read_store = read_store
+        self.cassette = cassette if cassette is not None else ScriptCassette.from_env()
+        self.metrics = metrics
+        # 已加载的文件夹树缓存，None表示未加载
+        self.folder_tree: Optional[FolderTree] = None
     
-    def execute_applescript(self, script: str) -> Optional[str]:
+    def close(self):
+        """释放桥接持有的资源（常驻进程池、清单数据库等）"""
+        if self.worker_pool:
+            self.worker_pool.close()
+        if self.manifest is not None:
+            self.manifest.close()
+        if self.read_store is not None:
+            self.read_store.close()
+        if self.cassette is not None:
+            self.cassette.close()
+    
+    @property
+    def use_templates(self) -> bool:
+        """是否使用参数化模板执行操作"""
+        return self.script_cache is not None or self.body_transport == "file"
+    
+    @timed_operation("script")
+    def execute_applescript(self, script: str, args: List[str] = None,
+                            script_file: str = None, timeout: float = None,
+                            idempotent: bool = True,
+                            on_timeout: Callable[[], Optional[str]] = None) -> Optional[str]:
         """
-        执行AppleScript脚本
+        执行AppleScript脚本，配置了重试器时可重试的错误会自动重试
+        
+        超时不代表备忘录没有执行写入（可能只是回复晚了），非幂等的脚本超时后不重试，
+        只在脚本未送达备忘录（如备忘录未运行）时重试
         
         Args:
             script: AppleScript代码
-            
+            args: 传给脚本 on run argv 的参数
+            script_file: 已编译脚本文件路径，提供时忽略script
+            timeout: 超时秒数，默认使用 script_timeout（进程池使用其自身配置）
+            idempotent: 脚本重复执行是否安全（读取、按ID或标题更新），False时超时不重试
+            on_timeout: 超时后、重试前调用，确认写入是否已生效；返回非None时作为脚本结果，不再重试
+        
         Returns:
             脚本执行结果，失败返回None
         """
+        args = [str(arg) for arg in (args or [])]
+        
+        def run_once() -> str:
+            try:
+                return self._execute_once(script, args, script_file, timeout)
+            except ScriptRunnerError as e:
+                recovered = on_timeout() if on_timeout is not None and e.kind == ERROR_TIMEOUT else None
+                if recovered is None:
+                    raise
+                logger.warning("⏱️ 脚本执行超时，但写入已生效，不再重试")
+                return recovered
+        
+        try:
+            if self.retrier is None:
+                return run_once()
+            return self.retrier.call(run_once, self._describe_error,
+                                     retryable=RETRYABLE_ERRORS if idempotent else SAFE_RETRY_ERRORS)
+        except ScriptRunnerError as e:
+            if e.kind == ERROR_TIMEOUT:
+                logger.error("AppleScript执行超时")
+            else:
+                logger.error(f"AppleScript执行失败（{e.kind}）: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"AppleScript执行异常: {e}")
+            return None
+    
+    def _execute_once(self, script: str, args: List[str], script_file: str = None,
+                      timeout: float = None) -> str:
+        """
+        执行一次AppleScript脚本
+        
+        Returns:
+            脚本输出
+        
+        Raises:
+            ScriptRunnerError: 脚本执行失败或超时，错误码从osascript的错误输出中解析；
+                               脚本捕获的备忘录无响应、未运行或无权限错误同样抛出
+        """
+        if self.cassette is not None:
+            output = self.cassette.run(script, args, lambda: self._run_osascript(script, args, script_file, timeout),
+                                       script_file=script_file)
+        else:
+            output = self._run_osascript(script, args, script_file, timeout)
+        self._raise_script_error(output)
+        return output
+    
+    @staticmethod
+    def _raise_script_error(output: Optional[str]):
+        """
+        脚本在 on error 中捕获错误后以 "error: 错误信息 (错误码)" 正常返回。
+        可重试的错误（超时、备忘录未运行）和无权限错误改为抛出，交给重试器、熔断器和权限提示处理；
+        其他错误（如备忘录不存在）仍作为返回值由调用方处理
+        
+        Raises:
+            ScriptRunnerError: 脚本返回了上述类别的错误
+        """
+        if not output or not output.startswith(SCRIPT_ERROR_PREFIX):
+            return
+        message = output[len(SCRIPT_ERROR_PREFIX):]
+        code = parse_error_code(message)
+        kind = classify_error(message, code)
+        if kind in RETRYABLE_ERRORS or kind == ERROR_PERMISSION:
+            raise ScriptRunnerError(message, code=code)
+    
+    def _run_osascript(self, script: str, args: List[str], script_file: str = None,
+                       timeout: float = None) -> str:
+        """通过进程池或新的osascript进程执行脚本"""
+        if self.worker_pool:
+            return self.worker_pool.run_script(script, args, timeout=timeout, script_file=script_file)
+        
         try:
             result = subprocess.run(
-                ['osascript', '-e', script], 
+                (['osascript', script_file] if script_file else ['osascript', '-e', script]) + args, 
                 capture_output=True, 
                 text=True, 
                 check=True,
-                timeout=30
+                timeout=timeout or self.script_timeout
             )
             return result.stdout.strip() if result.stdout else ""
         except subprocess.CalledProcessError as e:
-            logger.error(f"AppleScript执行失败: {e}")
-            logger.error(f"错误输出: {e.stderr}")
-            return None
+            raise ScriptRunnerError((e.stderr or "").strip() or f"osascript退出码 {e.returncode}")
         except subprocess.TimeoutExpired:
-            logger.error("AppleScript执行超时")
+            raise ScriptRunnerError("AppleScript执行超时", timeout=True)
+    
+    def _stream(self, script: str, args: List[str], timeout: float = None) -> Iterator[Dict[str, Any]]:
+        """
+        执行JXA脚本并流式产出记录，配置了录制文件时经其录制或回放
+        
+        Args:
+            script: JXA脚本源码
+            args: 脚本参数
+            timeout: 已按写入正文大小计算的超时秒数；默认使用 script_timeout，
+                     并按读取到的数据量以 timeout_per_mb 放宽
+        
+        Raises:
+            ScriptRunnerError: 读取失败或超时
+        """
+        timeout_per_mb = 0.0 if timeout is not None else self.timeout_per_mb
+        timeout = timeout if timeout is not None else self.script_timeout
+        
+        def run():
+            return stream_records(script, args, command=self.jxa_command, timeout=timeout,
+                                  timeout_per_mb=timeout_per_mb)
+        
+        if self.cassette is not None:
+            return self.cassette.stream(script, args, run)
+        return run()
+    
+    @staticmethod
+    def _describe_error(error: Exception) -> Optional[str]:
+        """重试器使用的错误分类，只处理脚本执行错误"""
+        return error.kind if isinstance(error, ScriptRunnerError) else None
+    
+    def _store_read(self, read: Callable[[], Any]) -> Any:
+        """
+        通过只读数据库读取
+        
+        Args:
+            read: 使用 read_store 的无参调用
+            
+        Returns:
+            读取结果；未配置数据库或读取失败时返回None，由调用方退回脚本
+        """
+        if self.read_store is None:
             return None
-        except Exception as e:
-            logger.error(f"AppleScript执行异常: {e}")
+        try:
+            return read()
+        except NoteStoreError as e:
+            # 数据库不存在或结构不符，本次运行不再尝试
+            logger.warning(f"⚠️ 备忘录数据库不可用，改用脚本读取: {e}")
+            self.read_store.close()
+            self.read_store = None
             return None
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ 备忘录数据库读取失败，改用脚本: {e}")
+            return None
+    
+    def _timeout_for(self, payload_bytes: int, op_count: int = 1) -> float:
+        """
+        按正文大小和操作数计算脚本超时
+        
+        Args:
+            payload_bytes: 正文字节数
+            op_count: 一次调用包含的操作数
+            
+        Returns:
+            超时秒数
+        """
+        return (self.script_timeout
+                + max(0, op_count - 1) * self.BATCH_TIMEOUT_PER_OP
+                + payload_bytes / (1024 * 1024) * self.timeout_per_mb)
+    
+    def _run_template(self, name: str, args: List[str], payload_bytes: int = 0,
+                      **retry_options) -> Optional[str]:
+        """
+        执行参数化脚本模板，有预编译版本时直接运行.scpt，否则执行模板源码
+        
+        Args:
+            name: 模板名称
+            args: 模板参数
+            payload_bytes: 写入的正文字节数，用于放宽超时
+            **retry_options: 传给 execute_applescript 的 idempotent 和 on_timeout
+            
+        Returns:
+            脚本执行结果，失败返回None
+        """
+        timeout = self._timeout_for(payload_bytes) if payload_bytes else None
+        compiled_path = self.script_cache.get_compiled_path(name) if self.script_cache else None
+        if compiled_path:
+            return self.execute_applescript(None, args, script_file=compiled_path, timeout=timeout,
+                                            **retry_options)
+        return self.execute_applescript(SCRIPT_TEMPLATES[name], args, timeout=timeout, **retry_options)
+    
+    @timed_operation("iter_notes")
+    def iter_notes(self, folder: str = None, include_body: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        流式遍历文件夹中的备忘录
+        
+        Args:
+            folder: 文件夹路径，支持嵌套路径，默认使用default_folder
+            include_body: 是否同时读取正文（用于备份导出）
+            
+        Yields:
+            备忘录记录，包含 folder、name、id、creation_date、modification_date，
+            include_body 时还包含 body
+            
+        Raises:
+            ScriptRunnerError: 读取失败
+        """
+        folder = folder or self.default_folder
+        if not include_body:
+            records = self._store_read(lambda: list(self.read_store.iter_notes(folder)))
+            if records is not None:
+                yield from records
+                return
+        
+        args = [self.account, folder, "true" if include_body else "false"]
+        yield from self._stream(JXA_LIST_NOTES_SCRIPT, args)
+    
+    @timed_operation("iter_folders")
+    def iter_folders(self, recursive: bool = False) -> Iterator[str]:
+        """
+        流式遍历文件夹路径
+        
+        Args:
+            recursive: 是否包含嵌套文件夹
+            
+        Yields:
+            文件夹路径，如 "Claude/ProjectName"
+            
+        Raises:
+            ScriptRunnerError: 读取失败
+        """
+        args = [self.account, "true" if recursive else "false"]
+        for record in self._stream(JXA_LIST_FOLDERS_SCRIPT, args):
+            yield record['path']
     
+    @timed_operation("list")
     def get_existing_notes(self, folder: str = None) -> List[str]:
         """
         获取现有备忘录标题列表
@@ -68,16 +391,36 @@ class AppleScriptBridge:
         """
         folder = folder or self.default_folder
         
+        notes = self._store_read(lambda: self.read_store.get_notes(folder))
+        if notes is not None:
+            return notes
+        
+        if self.read_protocol == "json":
+            try:
+                notes = [record['name'] for record in self.iter_notes(folder)]
+            except ScriptRunnerError as e:
+                logger.warning(f"获取备忘录列表失败: {e}")
+                return []
+            logger.debug(f"找到 {len(notes)} 个备忘录")
+            return notes
+        
+        if self.script_cache is not None:
+            folder_path = "/".join(part.strip() for part in folder.split('/') if part.strip())
+            result = self._run_template('list', [self.account, folder_path])
+            return self._parse_note_list(result)
+        
+        folder_parts = [part.strip() for part in folder.split('/') if part.strip()]
+        
         script = f'''
         tell application "Notes"
             set noteList to {{}}
             try
                 tell account "{self.account}"
-                    tell folder "{folder}"
+                    {self._build_folder_reference(folder_parts)}
                         repeat with thisNote in notes
                             set end of noteList to (name of thisNote)
                         end repeat
-                    end tell
+                    {self._build_end_tell_blocks(folder_parts)}
                 end tell
             on error
                 -- 如果文件夹不存在，返回空列表
@@ -93,6 +436,10 @@ class AppleScriptBridge:
         '''
         
         result = self.execute_applescript(script)
+        return self._parse_note_list(result)
+    
+    def _parse_note_list(self, result: Optional[str]) -> List[str]:
+        """解析 "|||" 分隔的备忘录标题列表"""
         if result is None:
             logger.warning("获取备忘录列表失败")
             return []
@@ -105,6 +452,7 @@ class AppleScriptBridge:
         logger.debug(f"找到 {len(notes)} 个备忘录")
         return notes
     
+    @timed_operation("exists")
     def note_exists(self, title: str, folder: str = None) -> bool:
         """
         检查指定标题的备忘录是否存在
@@ -118,6 +466,36 @@ class AppleScriptBridge:
         """
         folder = folder or self.default_folder
         
+        # 已加载快照时直接查询内存索引
+        if self.snapshot_index is not None:
+            return self.snapshot_index.has_note(folder, title)
+        
+        # 文件夹都不存在时备忘录必然不存在
+        if self.folder_tree is not None and not self.folder_tree.has_folder(folder):
+            return False
+        
+        exists = self._store_read(lambda: self.read_store.note_exists(title, folder))
+        if exists is not None:
+            return exists
+        
+        return bool(self._query_note_exists(title, folder))
+    
+    def _query_note_exists(self, title: str, folder: str) -> Optional[bool]:
+        """
+        通过脚本向备忘录查询备忘录是否存在，不使用快照和数据库等可能滞后的缓存
+        
+        Args:
+            title: 备忘录标题
+            folder: 文件夹路径
+            
+        Returns:
+            存在返回True，不存在返回False，脚本执行失败返回None
+        """
+        if self.script_cache is not None:
+            folder_path = "/".join(part.strip() for part in folder.split('/') if part.strip())
+            result = self._run_template('exists', [self.account, folder_path, title, ""])
+            return result == "true" if result else None
+        
         # 转义AppleScript中的特殊字符
         escaped_title = self._escape_applescript_string(title)
         
@@ -155,9 +533,23 @@ class AppleScriptBridge:
             '''
         
         result = self.execute_applescript(script)
-        return result == "true" if result else False
+        return result == "true" if result else None
     
-    def create_note(self, title: str, content: str, folder: str = None) -> bool:
+    def _confirm_created(self, title: str, folder: str) -> str:
+        """
+        创建脚本超时后确认备忘录是否已创建，作为 create_note 的 on_timeout
+        
+        Returns:
+            已创建返回 "success|||"（ID未知），确认不存在返回None以便重试，无法确认时返回错误结果不再重试
+        """
+        exists = self._query_note_exists(title, folder)
+        if exists is None:
+            return "error: 创建超时且无法确认备忘录是否已创建"
+        return "success|||" if exists else None
+    
+    @timed_operation("create", payload="content", check_result=True)
+    def create_note(self, title: str, content: str, folder: str = None,
+                    source_path: str = None) -> bool:
         """
         创建新备忘录
         
@@ -165,67 +557,69 @@ class AppleScriptBridge:
             title: 备忘录标题
             content: 备忘录内容
             folder: 文件夹路径，支持嵌套路径如 "Claude/ProjectName"，默认使用default_folder
+            source_path: 源文件路径，提供时把新备忘录的ID记录到清单中
             
         Returns:
             创建成功返回True，否则返回False
         """
         folder = folder or self.default_folder
         
-        # 转义特殊字符
-        escaped_title = self._escape_applescript_string(title)
-        escaped_content = self._escape_applescript_string(content)
-        
         # 处理嵌套文件夹路径
         folder_parts = [part.strip() for part in folder.split('/') if part.strip()]
+        
+        if self.use_templates:
+            with self._body_file(content) as body_path:
+                result = self._run_template(
+                    'create',
+                    [self.account, "/".join(folder_parts), body_path],
+                    payload_bytes=len(content.encode('utf-8')),
+                    on_timeout=lambda: self._confirm_created(title, folder)
+                )
+            return self._finish_create(result, title, folder, source_path)
+        
+        # 转义特殊字符
+        escaped_content = self._escape_applescript_string(content)
         folder_ref = self._build_folder_reference(folder_parts)
         
-        if folder_parts:
-            script = f'''
-            tell application "Notes"
-                activate
-                try
-                    tell account "{self.account}"
-                        {folder_ref}
-                            set newNote to make new note
-                            tell newNote
-                                set body to "{escaped_content}"
-                            end tell
-                        {self._build_end_tell_blocks(folder_parts)}
-                    end tell
-                    return "success"
-                on error errMsg
-                    return "error: " & errMsg
-                end try
-            end tell
-            '''
-        else:
-            script = f'''
-            tell application "Notes"
-                activate
-                try
-                    tell account "{self.account}"
+        script = f'''
+        tell application "Notes"
+            activate
+            try
+                tell account "{self.account}"
+                    {folder_ref}
                         set newNote to make new note
                         tell newNote
                             set body to "{escaped_content}"
                         end tell
-                    end tell
-                    return "success"
-                on error errMsg
-                    return "error: " & errMsg
-                end try
-            end tell
-            '''
+                    {self._build_end_tell_blocks(folder_parts)}
+                end tell
+                return "success|||" & (id of newNote)
+            on error errMsg number errNum
+                return "error: " & errMsg & " (" & errNum & ")"
+            end try
+        end tell
+        '''
         
-        result = self.execute_applescript(script)
+        result = self.execute_applescript(script, timeout=self._timeout_for(len(content.encode('utf-8'))),
+                                          on_timeout=lambda: self._confirm_created(title, folder))
+        return self._finish_create(result, title, folder, source_path)
+    
+    def _finish_create(self, result: Optional[str], title: str, folder: str,
+                       source_path: str = None) -> bool:
+        """处理创建脚本的返回值"""
+        status, note_id = self._parse_status_result(result)
         
-        if result and result.startswith("success"):
+        if status == "success":
             logger.info(f"✅ 创建备忘录成功: {title}")
+            self._record_note_written(title, folder, note_id, source_path)
             return True
         else:
             logger.error(f"❌ 创建备忘录失败: {title} - {result}")
             return False
     
-    def update_note(self, title: str, content: str, folder: str = None) -> bool:
+    @timed_operation("update", payload="content", check_result=True)
+    def update_note(self, title: str, content: str, folder: str = None,
+                    source_path: str = None) -> bool:
         """
         更新现有备忘录
         
@@ -233,71 +627,227 @@ class AppleScriptBridge:
             title: 备忘录标题
             content: 新的备忘录内容
             folder: 文件夹路径，支持嵌套路径如 "Claude/ProjectName"，默认使用default_folder
+            source_path: 源文件路径，清单中有ID时按ID直接定位，ID失效才按标题查找
             
         Returns:
             更新成功返回True，否则返回False
         """
         folder = folder or self.default_folder
         
+        # 处理嵌套文件夹路径
+        folder_parts = [part.strip() for part in folder.split('/') if part.strip()]
+        note_id = self._resolve_note_id(source_path)
+        
+        if self.use_templates:
+            with self._body_file(content) as body_path:
+                result = self._run_template(
+                    'update',
+                    [self.account, "/".join(folder_parts), title, body_path, note_id or ""],
+                    payload_bytes=len(content.encode('utf-8'))
+                )
+            return self._finish_update(result, title, folder, source_path)
+        
         # 转义特殊字符
         escaped_title = self._escape_applescript_string(title)
         escaped_content = self._escape_applescript_string(content)
-        
-        # 处理嵌套文件夹路径
-        folder_parts = [part.strip() for part in folder.split('/') if part.strip()]
         folder_ref = self._build_folder_reference(folder_parts)
+        id_lookup = self._build_note_id_lookup(note_id, folder_parts)
         
-        if folder_parts:
-            script = f'''
-            tell application "Notes"
-                try
+        script = f'''
+        tell application "Notes"
+            try
+                {id_lookup}
+                if targetNote is missing value then
                     tell account "{self.account}"
                         {folder_ref}
                             set targetNote to first note whose name is "{escaped_title}"
-                            tell targetNote
-                                set body to "{escaped_content}"
-                            end tell
                         {self._build_end_tell_blocks(folder_parts)}
                     end tell
-                    return "success"
-                on error errMsg
-                    return "error: " & errMsg
-                end try
-            end tell
-            '''
-        else:
-            script = f'''
-            tell application "Notes"
-                try
-                    tell account "{self.account}"
-                        set targetNote to first note whose name is "{escaped_title}"
-                        tell targetNote
-                            set body to "{escaped_content}"
-                        end tell
-                    end tell
-                    return "success"
-                on error errMsg
-                    return "error: " & errMsg
-                end try
-            end tell
-            '''
+                end if
+                tell targetNote
+                    set body to "{escaped_content}"
+                end tell
+                return "success|||" & (id of targetNote)
+            on error errMsg number errNum
+                return "error: " & errMsg & " (" & errNum & ")"
+            end try
+        end tell
+        '''
         
-        result = self.execute_applescript(script)
+        result = self.execute_applescript(script, timeout=self._timeout_for(len(content.encode('utf-8'))))
+        return self._finish_update(result, title, folder, source_path)
+    
+    def _finish_update(self, result: Optional[str], title: str, folder: str,
+                       source_path: str = None) -> bool:
+        """处理更新脚本的返回值"""
+        status, note_id = self._parse_status_result(result)
         
-        if result and result.startswith("success"):
+        if status == "success":
             logger.info(f"🔄 更新备忘录成功: {title}")
+            self._record_note_written(title, folder, note_id, source_path)
             return True
         else:
             logger.error(f"❌ 更新备忘录失败: {title} - {result}")
             return False
     
-    def delete_note(self, title: str, folder: str = None) -> bool:
+    @timed_operation("append", payload="content", check_result=True)
+    def append_note(self, title: str, content: str, folder: str = None,
+                    source_path: str = None) -> bool:
+        """
+        在现有备忘录正文末尾追加内容，只传递追加的部分
+        
+        Args:
+            title: 备忘录标题
+            content: 追加的内容
+            folder: 文件夹路径，默认使用default_folder
+            source_path: 源文件路径，清单中有ID时按ID直接定位
+            
+        Returns:
+            追加成功返回True，否则返回False
+        """
+        folder = folder or self.default_folder
+        folder_parts = [part.strip() for part in folder.split('/') if part.strip()]
+        note_id = self._resolve_note_id(source_path)
+        
+        with self._body_file(content) as body_path:
+            # 重复追加会让内容出现两次，超时后不重试
+            result = self._run_template(
+                'append',
+                [self.account, "/".join(folder_parts), title, body_path, note_id or ""],
+                payload_bytes=len(content.encode('utf-8')),
+                idempotent=False
+            )
+        return self._finish_append(result, title, folder, source_path)
+    
+    def _finish_append(self, result: Optional[str], title: str, folder: str,
+                       source_path: str = None) -> bool:
+        """处理追加脚本的返回值"""
+        status, note_id = self._parse_status_result(result)
+        
+        if status == "success":
+            logger.info(f"➕ 追加备忘录成功: {title}")
+            self._record_note_written(title, folder, note_id, source_path)
+            return True
+        
+        logger.error(f"❌ 追加备忘录失败: {title} - {result}")
+        return False
+    
+    @timed_operation("upsert", payload="content", check_result=True)
+    def upsert_note(self, title: str, content: str, folder: str = None,
+                    create_folders: bool = True, source_path: str = None) -> Optional[str]:
+        """
+        在一次脚本调用中完成"确保文件夹 → 查找备忘录 → 更新或创建"
+        
+        Args:
+            title: 备忘录标题
+            content: 备忘录内容
+            folder: 文件夹路径，支持嵌套路径如 "Claude/ProjectName"，默认使用default_folder
+            create_folders: 文件夹不存在时是否逐级创建
+            source_path: 源文件路径，清单中有ID时按ID直接定位；
+                         按标题查找时会跳过已属于其他源文件的同名备忘录
+            
+        Returns:
+            "created" 或 "updated"，失败返回None
+        """
+        folder = folder or self.default_folder
+        
+        folder_parts = [part.strip() for part in folder.split('/') if part.strip()]
+        note_id = self._resolve_note_id(source_path)
+        
+        claimed_ids: List[str] = []
+        if self.manifest is not None and source_path:
+            claimed_ids = self.manifest.claimed_ids("/".join(folder_parts), title, source_path)
+        
+        if self.use_templates:
+            with self._body_file(content) as body_path:
+                result = self._run_template(
+                    'upsert',
+                    [self.account, "/".join(folder_parts), title, body_path, note_id or "",
+                     "\n".join(claimed_ids), "true" if create_folders else "false"],
+                    payload_bytes=len(content.encode('utf-8'))
+                )
+            return self._finish_upsert(result, title, folder, source_path)
+        
+        escaped_title = self._escape_applescript_string(title)
+        escaped_content = self._escape_applescript_string(content)
+        folder_list = self._build_applescript_list(folder_parts)
+        id_lookup = self._build_note_id_lookup(note_id, folder_parts)
+        claimed_list = self._build_applescript_list(claimed_ids)
+        
+        if create_folders:
+            missing_folder_action = 'set targetContainer to make new folder at end of folders of targetContainer with properties {name:folderName}'
+        else:
+            missing_folder_action = 'error "文件夹不存在: " & folderName'
+        
+        script = f'''
+        tell application "Notes"
+            try
+                {id_lookup}
+                if targetNote is missing value then
+                    set targetContainer to account "{self.account}"
+                    repeat with folderItem in {folder_list}
+                        set folderName to folderItem as text
+                        if exists folder folderName of targetContainer then
+                            set targetContainer to folder folderName of targetContainer
+                        else
+                            {missing_folder_action}
+                        end if
+                    end repeat
+                    
+                    -- 同名备忘录中跳过已被其他源文件占用的
+                    set claimedIds to {claimed_list}
+                    repeat with candidate in (notes of targetContainer whose name is "{escaped_title}")
+                        if (id of candidate) is not in claimedIds then
+                            set targetNote to contents of candidate
+                            exit repeat
+                        end if
+                    end repeat
+                    
+                    if targetNote is missing value then
+                        set newNote to make new note at end of notes of targetContainer
+                        tell newNote
+                            set body to "{escaped_content}"
+                        end tell
+                        return "created|||" & (id of newNote)
+                    end if
+                end if
+                
+                tell targetNote
+                    set body to "{escaped_content}"
+                end tell
+                return "updated|||" & (id of targetNote)
+            on error errMsg number errNum
+                return "error: " & errMsg & " (" & errNum & ")"
+            end try
+        end tell
+        '''
+        
+        result = self.execute_applescript(script, timeout=self._timeout_for(len(content.encode('utf-8'))))
+        return self._finish_upsert(result, title, folder, source_path)
+    
+    def _finish_upsert(self, result: Optional[str], title: str, folder: str,
+                       source_path: str = None) -> Optional[str]:
+        """处理upsert脚本的返回值"""
+        status, note_id = self._parse_status_result(result)
+        
+        if status in ("created", "updated"):
+            icon = "✅" if status == "created" else "🔄"
+            logger.info(f"{icon} 同步备忘录成功({status}): {title}")
+            self._record_note_written(title, folder, note_id, source_path)
+            return status
+        
+        logger.error(f"❌ 同步备忘录失败: {title} - {result}")
+        return None
+    
+    @timed_operation("delete", check_result=True)
+    def delete_note(self, title: str, folder: str = None, source_path: str = None) -> bool:
         """
         删除备忘录
         
         Args:
             title: 备忘录标题
-            folder: 文件夹名，默认使用default_folder
+            folder: 文件夹路径，支持嵌套路径如 "Claude/ProjectName"，默认使用default_folder
+            source_path: 源文件路径，清单中有ID时按ID直接定位，删除后移除清单记录
             
         Returns:
             删除成功返回True，否则返回False
@@ -306,69 +856,541 @@ class AppleScriptBridge:
         
         escaped_title = self._escape_applescript_string(title)
         
+        folder_parts = [part.strip() for part in folder.split('/') if part.strip()]
+        folder_ref = self._build_folder_reference(folder_parts)
+        id_lookup = self._build_note_id_lookup(self._resolve_note_id(source_path), folder_parts)
+        
         script = f'''
         tell application "Notes"
             try
-                tell account "{self.account}"
-                    tell folder "{folder}"
-                        set targetNote to first note whose name is "{escaped_title}"
-                        delete targetNote
+                {id_lookup}
+                if targetNote is missing value then
+                    tell account "{self.account}"
+                        {folder_ref}
+                            set targetNote to first note whose name is "{escaped_title}"
+                        {self._build_end_tell_blocks(folder_parts)}
                     end tell
-                end tell
+                end if
+                delete targetNote
                 return "success"
-            on error errMsg
-                return "error: " & errMsg
+            on error errMsg number errNum
+                return "error: " & errMsg & " (" & errNum & ")"
             end try
         end tell
         '''
         
-        result = self.execute_applescript(script)
+        # 超时后按标题重试可能删掉同名的另一条备忘录，不重试
+        result = self.execute_applescript(script, idempotent=False)
         
         if result and result.startswith("success"):
             logger.info(f"🗑️ 删除备忘录成功: {title}")
+            if self.snapshot_index is not None:
+                self.snapshot_index.remove_note(folder, title)
+            if self.manifest is not None and source_path:
+                self.manifest.remove(source_path)
             return True
         else:
             logger.error(f"❌ 删除备忘录失败: {title} - {result}")
             return False
     
+    @timed_operation("batch", payload="ops")
+    def apply_batch(self, ops: List[Dict[str, Any]], max_batch_size: int = None,
+                    max_batch_bytes: int = None) -> List[Dict[str, Any]]:
+        """
+        批量执行创建/更新/删除操作
+        
+        操作按目标文件夹分组，每组（超出大小限制时再拆分）只需一次脚本调用，
+        单个操作失败不影响同组其他操作
+        
+        Args:
+            ops: 操作列表，每项包含 action（create/update/upsert/append/delete）、title、
+                 folder（默认default_folder）、content（删除时不需要）、
+                 可选的 source_path 和 create_folders（默认True）
+            max_batch_size: 单次调用的最大操作数，默认使用初始化参数
+            max_batch_bytes: 单次调用的最大正文字节数，默认使用初始化参数
+            
+        Returns:
+            与ops一一对应的结果列表，每项包含 success、status
+            （created/updated/appended/deleted/error）、note_id 和 error
+        """
+        max_batch_size = max_batch_size or self.max_batch_size
+        max_batch_bytes = max_batch_bytes or self.max_batch_bytes
+        results: List[Optional[Dict[str, Any]]] = [None] * len(ops)
+        
+        # 按文件夹分组，保持组内原始顺序
+        groups: Dict[str, List[int]] = {}
+        for index, op in enumerate(ops):
+            if op.get('action') not in ("create", "update", "upsert", "append", "delete"):
+                results[index] = self._batch_result("error", error=f"不支持的操作: {op.get('action')}")
+                continue
+            folder = op.get('folder') or self.default_folder
+            folder_path = "/".join(part.strip() for part in folder.split('/') if part.strip())
+            groups.setdefault(folder_path, []).append(index)
+        
+        chunks = []
+        for folder_path, indices in groups.items():
+            chunk: List[int] = []
+            chunk_bytes = 0
+            for index in indices:
+                op_bytes = len(ops[index].get('content', '').encode('utf-8'))
+                if chunk and (len(chunk) >= max_batch_size or chunk_bytes + op_bytes > max_batch_bytes):
+                    chunks.append((folder_path, chunk))
+                    chunk, chunk_bytes = [], 0
+                chunk.append(index)
+                chunk_bytes += op_bytes
+            if chunk:
+                chunks.append((folder_path, chunk))
+        
+        if self.concurrency is None or len(chunks) < 2:
+            for folder_path, chunk in chunks:
+                self._run_limited_chunk(folder_path, chunk, ops, results)
+        else:
+            # 先串行建好缺失的文件夹，避免并发脚本重复创建同名文件夹
+            for folder_path, indices in groups.items():
+                if any(ops[index].get('create_folders', True) for index in indices):
+                    self.create_folder(folder_path)
+            
+            # 各组并发执行，实际同时运行的脚本数由自适应控制器决定
+            with ThreadPoolExecutor(max_workers=self.concurrency.max_limit) as executor:
+                futures = [executor.submit(self._run_limited_chunk, folder_path, chunk, ops, results)
+                           for folder_path, chunk in chunks]
+                for future in futures:
+                    future.result()
+        
+        succeeded = sum(1 for result in results if result['success'])
+        logger.info(f"📦 批量操作完成: 成功 {succeeded}/{len(ops)}，共 {len(groups)} 个文件夹")
+        return results
+    
+    def _run_limited_chunk(self, folder_path: str, indices: List[int],
+                           ops: List[Dict[str, Any]], results: List[Optional[Dict[str, Any]]]):
+        """执行一组操作，配置了并发控制器时先获取名额并回报耗时和结果"""
+        if self.concurrency is None:
+            self._run_batch_chunk(folder_path, indices, ops, results)
+            return
+        
+        self.concurrency.acquire()
+        start = time.monotonic()
+        error = None
+        try:
+            error = self._run_batch_chunk(folder_path, indices, ops, results)
+        finally:
+            self.concurrency.release(
+                time.monotonic() - start,
+                success=error is None,
+                timed_out=error is not None and error.kind == ERROR_TIMEOUT
+            )
+    
+    def _run_batch_chunk(self, folder_path: str, indices: List[int],
+                         ops: List[Dict[str, Any]], results: List[Optional[Dict[str, Any]]]):
+        """
+        在一次脚本调用中执行同一文件夹下的一组操作，结果写入results
+        
+        Args:
+            folder_path: 规范化后的文件夹路径
+            indices: 本组操作在ops中的下标
+            ops: 全部操作
+            results: 全部结果
+            
+        Returns:
+            脚本本身执行失败时返回异常，否则返回None（单个操作的失败记录在results中）
+        """
+        batch = {
+            'account': self.account,
+            'folder': folder_path,
+            'create_folders': any(ops[i].get('create_folders', True) for i in indices),
+            'ops': []
+        }
+        for index in indices:
+            op = ops[index]
+            source_path = op.get('source_path')
+            batch['ops'].append({
+                'index': index,
+                'action': op['action'],
+                'title': op['title'],
+                'body': op.get('content', ''),
+                'note_id': self._resolve_note_id(source_path) or "",
+                'claimed_ids': (self.manifest.claimed_ids(folder_path, op['title'], source_path)
+                                if self.manifest is not None else [])
+            })
+        
+        received = []
+        timeout = self._timeout_for(sum(len(item['body'].encode('utf-8')) for item in batch['ops']),
+                                    op_count=len(indices))
+        
+        def run_chunk(batch_path: str):
+            for record in self._stream(JXA_APPLY_BATCH_SCRIPT, [batch_path], timeout=timeout):
+                if record.get('type') != 'result' or record.get('index') not in indices:
+                    continue
+                received.append(record['index'])
+                results[record['index']] = self._batch_result(
+                    record.get('status', 'error'),
+                    note_id=record.get('id'),
+                    error=record.get('message')
+                )
+        
+        def describe(error: Exception) -> Optional[str]:
+            # 已有操作生效后不再整组重试，避免重复创建
+            return None if received else self._describe_error(error)
+        
+        # 超时时可能已有操作生效但结果未返回，只有全是更新/upsert的组才能整组重试
+        idempotent = all(item['action'] in ("update", "upsert") for item in batch['ops'])
+        try:
+            with self._body_file(json.dumps(batch, ensure_ascii=False), suffix=".json") as batch_path:
+                if self.retrier is None:
+                    run_chunk(batch_path)
+                else:
+                    self.retrier.call(lambda: run_chunk(batch_path), describe,
+                                      retryable=RETRYABLE_ERRORS if idempotent else SAFE_RETRY_ERRORS)
+        except ScriptRunnerError as e:
+            logger.error(f"❌ 批量操作失败: {folder_path} - {e}")
+            script_error = e
+            error = str(e)
+        else:
+            script_error = None
+            error = "脚本未返回该操作的结果"
+        
+        for index in indices:
+            op = ops[index]
+            result = results[index]
+            if result is None:
+                results[index] = self._batch_result("error", error=error)
+                logger.error(f"❌ 批量操作失败: {op['title']} - {error}")
+            elif not result['success']:
+                logger.error(f"❌ 批量操作失败: {op['title']} - {result['error']}")
+            elif result['status'] == "deleted":
+                if self.snapshot_index is not None:
+                    self.snapshot_index.remove_note(folder_path, op['title'])
+                if self.manifest is not None and op.get('source_path'):
+                    self.manifest.remove(op['source_path'])
+            else:
+                self._record_note_written(op['title'], folder_path, result['note_id'], op.get('source_path'))
+        
+        return script_error
+    
+    @timed_operation("folders")
     def get_folders(self) -> List[str]:
         """
         获取备忘录文件夹列表
         
         Returns:
-            文件夹名称列表
+            文件夹路径列表，包含嵌套文件夹（如 "Claude/ProjectName"）
+        """
+        tree = self._get_folder_tree()
+        return tree.get_folders() if tree is not None else []
+    
+    @timed_operation("count")
+    def count_notes_by_folder(self) -> Optional[Dict[str, int]]:
+        """
+        用一次查询或一次脚本调用统计每个文件夹（含嵌套文件夹）中的备忘录数量，
+        只发送计数事件，不读取标题
+        
+        Returns:
+            文件夹路径到备忘录数量的映射，失败返回None
         """
+        counts = self._store_read(self.read_store.count_notes_by_folder) if self.read_store is not None else None
+        if counts is not None:
+            return counts
+        
+        if self.read_protocol == "json":
+            try:
+                return {record['path']: record['count']
+                        for record in self._stream(JXA_COUNT_NOTES_SCRIPT, [self.account])}
+            except ScriptRunnerError as e:
+                logger.warning(f"统计备忘录数量失败: {e}")
+                return None
+        
         script = f'''
+        on countFolders(theContainer, prefix, output)
+            tell application "Notes" to set subFolders to folders of theContainer
+            repeat with subFolder in subFolders
+                tell application "Notes"
+                    set subName to name of subFolder
+                    set noteCount to count of notes of subFolder
+                end tell
+                if prefix is "" then
+                    set subPath to subName
+                else
+                    set subPath to prefix & "/" & subName
+                end if
+                set end of output to subPath & (character id 31) & noteCount
+                my countFolders(subFolder, subPath, output)
+            end repeat
+        end countFolders
+        
         tell application "Notes"
-            set folderList to {{}}
             try
-                tell account "{self.account}"
-                    repeat with thisFolder in folders
-                        set end of folderList to (name of thisFolder)
-                    end repeat
-                end tell
-            on error
-                set folderList to {{}}
+                set theAccount to account "{self.account}"
+            on error errMsg number errNum
+                return "error: " & errMsg & " (" & errNum & ")"
             end try
         end tell
         
-        set AppleScript's text item delimiters to "|||"
-        set folderListString to folderList as string
+        set output to {{}}
+        countFolders(theAccount, "", output)
+        
+        set AppleScript's text item delimiters to (character id 30)
+        set outputText to output as string
         set AppleScript's text item delimiters to ""
         
-        return folderListString
+        return outputText
         '''
         
         result = self.execute_applescript(script)
-        if result is None:
-            return []
+        if result is None or result.startswith("error"):
+            logger.warning(f"统计备忘录数量失败: {result}")
+            return None
+        
+        counts = {}
+        for record in result.split('\x1e'):
+            path, _, count = record.rpartition('\x1f')
+            if path.strip():
+                counts[path] = int(count)
+        return counts
+    
+    def load_folder_tree(self) -> Optional[FolderTree]:
+        """
+        用一次脚本调用加载完整的嵌套文件夹树并缓存
+        
+        Returns:
+            文件夹树，失败返回None
+        """
+        tree = self._fetch_folder_tree()
+        if tree is not None:
+            self.folder_tree = tree
+            logger.debug(f"已加载文件夹树: {len(tree)} 个文件夹")
+        return tree
+    
+    def invalidate_folder_tree(self):
+        """丢弃文件夹树缓存，下次需要时重新加载"""
+        self.folder_tree = None
+    
+    def _get_folder_tree(self) -> Optional[FolderTree]:
+        """获取文件夹树，启用缓存时复用已加载的结果"""
+        if self.folder_tree is not None:
+            return self.folder_tree
+        if self.cache_folders:
+            return self.load_folder_tree()
+        return self._fetch_folder_tree()
+    
+    @timed_operation("folder_tree")
+    def _fetch_folder_tree(self) -> Optional[FolderTree]:
+        """从备忘录数据库或备忘录应用读取完整的嵌套文件夹树"""
+        tree = self._store_read(self.read_store.folder_tree) if self.read_store is not None else None
+        if tree is not None:
+            return tree
+        
+        if self.read_protocol == "json":
+            try:
+                return FolderTree(list(self.iter_folders(recursive=True)))
+            except ScriptRunnerError as e:
+                logger.warning(f"获取文件夹列表失败: {e}")
+                return None
+        
+        script = f'''
+        on collectFolders(theContainer, prefix, output)
+            tell application "Notes" to set subFolders to folders of theContainer
+            repeat with subFolder in subFolders
+                tell application "Notes" to set subName to name of subFolder
+                if prefix is "" then
+                    set subPath to subName
+                else
+                    set subPath to prefix & "/" & subName
+                end if
+                set end of output to subPath
+                my collectFolders(subFolder, subPath, output)
+            end repeat
+        end collectFolders
+        
+        tell application "Notes"
+            try
+                set theAccount to account "{self.account}"
+            on error errMsg number errNum
+                return "error: " & errMsg & " (" & errNum & ")"
+            end try
+        end tell
+        
+        set output to {{}}
+        collectFolders(theAccount, "", output)
+        
+        set AppleScript's text item delimiters to (character id 30)
+        set outputText to output as string
+        set AppleScript's text item delimiters to ""
+        
+        return outputText
+        '''
+        
+        result = self.execute_applescript(script)
+        if result is None or result.startswith("error"):
+            logger.warning(f"获取文件夹列表失败: {result}")
+            return None
+        
+        return FolderTree([folder for folder in result.split('\x1e') if folder.strip()])
+    
+    @timed_operation("snapshot")
+    def load_snapshot(self) -> Optional[NotesIndex]:
+        """
+        一次性导出账户下的完整文件夹树以及每个备忘录的名称、ID和修改时间，
+        建立内存索引。加载后 note_exists 直接查询索引，不再逐个发送脚本
+        
+        Returns:
+            快照索引，失败返回None
+        """
+        index = self._store_read(self.read_store.load_index) if self.read_store is not None else None
+        if index is not None:
+            return self._use_snapshot(index)
+        
+        script = f'''
+        on dumpFolder(theFolder, folderPath, output)
+            set fieldSep to character id 31
+            set end of output to "F" & fieldSep & folderPath
+            tell application "Notes"
+                set noteIds to id of notes of theFolder
+                set noteNames to name of notes of theFolder
+                set noteDates to modification date of notes of theFolder
+                set subFolders to folders of theFolder
+            end tell
+            repeat with i from 1 to count of noteIds
+                set noteDate to (item i of noteDates) as «class isot» as string
+                set end of output to "N" & fieldSep & folderPath & fieldSep & (item i of noteIds) & fieldSep & noteDate & fieldSep & (item i of noteNames)
+            end repeat
+            repeat with subFolder in subFolders
+                tell application "Notes" to set subName to name of subFolder
+                my dumpFolder(subFolder, folderPath & "/" & subName, output)
+            end repeat
+        end dumpFolder
+        
+        tell application "Notes"
+            try
+                set topFolders to folders of account "{self.account}"
+            on error errMsg number errNum
+                return "error: " & errMsg & " (" & errNum & ")"
+            end try
+        end tell
+        
+        set output to {{}}
+        repeat with topFolder in topFolders
+            tell application "Notes" to set topName to name of topFolder
+            dumpFolder(topFolder, topName, output)
+        end repeat
+        
+        set AppleScript's text item delimiters to (character id 30)
+        set outputText to output as string
+        set AppleScript's text item delimiters to ""
+        
+        return outputText
+        '''
+        
+        result = self.execute_applescript(script)
+        if result is None or result.startswith("error"):
+            logger.warning(f"加载备忘录快照失败: {result}")
+            return None
+        
+        index = NotesIndex(self.account)
+        for record in result.split('\x1e'):
+            fields = record.split('\x1f')
+            if fields[0] == 'F' and len(fields) >= 2:
+                index.add_folder(fields[1])
+            elif fields[0] == 'N' and len(fields) >= 5:
+                # 标题中理论上不会出现分隔符，保险起见把多余字段拼回标题
+                title = '\x1f'.join(fields[4:])
+                index.add_note(fields[1], title, note_id=fields[2], modification_date=fields[3])
+        
+        return self._use_snapshot(index)
+    
+    def _use_snapshot(self, index: NotesIndex) -> NotesIndex:
+        """启用已加载的快照索引"""
+        self.snapshot_index = index
+        if self.cache_folders:
+            # 快照已包含完整文件夹树，直接作为文件夹缓存
+            self.folder_tree = index.folder_tree
+        logger.info(f"📸 已加载备忘录快照: {len(index.get_folders())} 个文件夹, {len(index)} 个备忘录")
+        return index
+    
+    def _record_note_written(self, title: str, folder: str, note_id: Optional[str] = None,
+                             source_path: str = None):
+        """
+        本地写入成功后同步更新快照索引和ID清单，避免与实际状态不一致
+        
+        Args:
+            title: 备忘录标题
+            folder: 文件夹路径
+            note_id: 脚本返回的备忘录ID
+            source_path: 源文件路径
+        """
+        folder_path = "/".join(part.strip() for part in folder.split('/') if part.strip())
+        
+        if self.manifest is not None and source_path and note_id:
+            self.manifest.record(source_path, note_id, title, folder_path)
+        
+        if self.folder_tree is not None:
+            # 写入成功说明文件夹已存在（upsert可能刚创建了它）
+            self.folder_tree.add_folder(folder_path)
+        
+        if self.snapshot_index is None:
+            return
+        
+        if not note_id:
+            existing = self.snapshot_index.get_note(folder, title)
+            note_id = existing.get('id') if existing else None
+        # 修改时间留空，等待下一次快照
+        self.snapshot_index.add_note(folder, title, note_id=note_id)
+    
+    def _resolve_note_id(self, source_path: str = None) -> Optional[str]:
+        """从清单中查找源文件对应的备忘录ID"""
+        if self.manifest is None or not source_path:
+            return None
+        return self.manifest.get_note_id(source_path)
+    
+    def _build_note_id_lookup(self, note_id: Optional[str], folder_parts: List[str]) -> str:
+        """
+        构建按ID定位备忘录的AppleScript片段
+        
+        执行后 targetNote 为找到的备忘录；ID不存在、或备忘录已被移出目标文件夹
+        （例如进入"最近删除"）时为 missing value，调用方再按标题查找
+        
+        Args:
+            note_id: 备忘录ID，为None时只初始化变量
+            folder_parts: 目标文件夹路径部分列表
             
-        if not result:
-            return []
+        Returns:
+            AppleScript代码片段
+        """
+        if not note_id:
+            return "set targetNote to missing value"
+        
+        escaped_id = self._escape_applescript_string(note_id)
+        container_check = ""
+        if folder_parts:
+            escaped_leaf = self._escape_applescript_string(folder_parts[-1])
+            container_check = f'''
+                    if (name of container of targetNote) is not "{escaped_leaf}" then
+                        set targetNote to missing value
+                    end if'''
+        
+        return f'''set targetNote to missing value
+                try
+                    set targetNote to note id "{escaped_id}"{container_check}
+                on error
+                    set targetNote to missing value
+                end try'''
+    
+    def _parse_status_result(self, result: Optional[str]):
+        """
+        解析形如 "status|||noteId" 的脚本返回值
+        
+        Args:
+            result: 脚本返回值
             
-        folders = [folder.strip() for folder in result.split('|||') if folder.strip()]
-        return folders
+        Returns:
+            (状态, 备忘录ID) 元组，失败时状态为None
+        """
+        if not result or result.startswith("error"):
+            return None, None
+        
+        status, _, note_id = result.partition('|||')
+        return status.strip(), (note_id.strip() or None)
     
+    @timed_operation("folder_create", check_result=True)
     def create_folder(self, folder_path: str) -> bool:
         """
         创建备忘录文件夹，支持嵌套路径如 "Claude/ProjectName"
@@ -386,26 +1408,57 @@ class AppleScriptBridge:
             logger.error("文件夹路径为空")
             return False
         
+        # 文件夹树缓存中已存在时无需任何脚本调用
+        tree = self.folder_tree
+        if tree is None and self.cache_folders:
+            tree = self.load_folder_tree()
+        if tree is not None and tree.has_folder(folder_path):
+            return True
+        
+        if self.script_cache is not None:
+            # 模板一次性逐级检查并创建缺失的文件夹
+            result = self._run_template('ensure_folder', [self.account, "/".join(path_parts)])
+            if not (result and result.startswith("success")):
+                logger.error(f"❌ 创建文件夹失败: {'/'.join(path_parts)} - {result}")
+                self.invalidate_folder_tree()
+                return False
+            self._record_folder_created(folder_path)
+            return True
+        
         # 逐级创建文件夹
         for i in range(len(path_parts)):
             current_path_parts = path_parts[:i+1]
             current_folder_name = current_path_parts[-1]
             parent_path_parts = current_path_parts[:-1]
             
-            # 检查当前级别的文件夹是否已存在
-            if self._folder_exists_at_path(current_path_parts):
+            # 检查当前级别的文件夹是否已存在，有缓存时直接查询缓存
+            if tree is not None:
+                if tree.has_folder("/".join(current_path_parts)):
+                    continue
+            elif self._folder_exists_at_path(current_path_parts):
                 continue
                 
             # 创建文件夹
             success = self._create_single_folder(current_folder_name, parent_path_parts)
             if not success:
                 logger.error(f"❌ 创建文件夹失败: {'/'.join(current_path_parts)}")
+                # 缓存可能已过期，下次重新加载
+                self.invalidate_folder_tree()
                 return False
             
             logger.info(f"📁 创建文件夹成功: {'/'.join(current_path_parts)}")
         
+        self._record_folder_created(folder_path)
         return True
     
+    def _record_folder_created(self, folder_path: str):
+        """文件夹创建成功后更新文件夹树缓存和快照索引"""
+        if self.folder_tree is not None:
+            self.folder_tree.add_folder(folder_path)
+        if self.snapshot_index is not None:
+            self.snapshot_index.add_folder(folder_path)
+    
+    @timed_operation("folder_check")
     def _folder_exists_at_path(self, path_parts: List[str]) -> bool:
         """
         检查指定路径的文件夹是否存在
@@ -462,6 +1515,7 @@ class AppleScriptBridge:
         result = self.execute_applescript(script)
         return result == "exists"
     
+    @timed_operation("folder_create_level", check_result=True)
     def _create_single_folder(self, folder_name: str, parent_path_parts: List[str]) -> bool:
         """
         在指定父路径下创建单个文件夹
@@ -488,8 +1542,8 @@ class AppleScriptBridge:
                         end tell
                     end tell
                     return "success"
-                on error errMsg
-                    return "error: " & errMsg
+                on error errMsg number errNum
+                    return "error: " & errMsg & " (" & errNum & ")"
                 end try
             end tell
             '''
@@ -502,8 +1556,8 @@ class AppleScriptBridge:
                         make new folder with properties {{name:"{escaped_folder}"}}
                     end tell
                     return "success"
-                on error errMsg
-                    return "error: " & errMsg
+                on error errMsg number errNum
+                    return "error: " & errMsg & " (" & errNum & ")"
                 end try
             end tell
             '''
@@ -531,6 +1585,19 @@ class AppleScriptBridge:
         
         return reference
     
+    def _build_applescript_list(self, items: List[str]) -> str:
+        """
+        构建AppleScript字符串列表字面量
+        
+        Args:
+            items: 字符串列表
+            
+        Returns:
+            形如 {"a", "b"} 的AppleScript列表
+        """
+        quoted = [f'"{self._escape_applescript_string(item)}"' for item in items]
+        return "{" + ", ".join(quoted) + "}"
+    
     def _build_end_tell_blocks(self, path_parts: List[str]) -> str:
         """
         构建对应数量的 end tell 块
@@ -543,6 +1610,29 @@ class AppleScriptBridge:
         """
         return "\n".join(["end tell" for _ in path_parts])
     
+    @contextmanager
+    def _body_file(self, content: str, suffix: str = ".html"):
+        """
+        把备忘录正文写入临时文件，供参数化脚本读取，退出时删除
+        
+        Args:
+            content: 备忘录正文
+            suffix: 临时文件扩展名
+            
+        Yields:
+            临时文件路径
+        """
+        fd, body_path = tempfile.mkstemp(prefix="mindsync-", suffix=suffix)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(content)
+            yield body_path
+        finally:
+            try:
+                os.unlink(body_path)
+            except OSError:
+                pass
+    
     def _escape_applescript_string(self, text: str) -> str:
         """
         转义AppleScript字符串中的特殊字符
@@ -563,13 +1653,47 @@ class AppleScriptBridge:
         
         return text
     
-    def get_note_info(self, title: str, folder: str = None) -> Optional[Dict[str, Any]]:
+    @timed_operation("metadata")
+    def get_note_metadata(self, title: str, folder: str = None,
+                          source_path: str = None) -> Optional[Dict[str, Any]]:
+        """
+        获取备忘录元数据（不含正文），配置了备忘录数据库时直接查询
+        
+        Args:
+            title: 备忘录标题
+            folder: 文件夹路径，默认使用default_folder
+            source_path: 源文件路径，清单中有ID时按ID定位
+            
+        Returns:
+            包含 creation_date、modification_date、id、title 的字典，不存在返回None
+        """
+        folder = folder or self.default_folder
+        note_id = self._resolve_note_id(source_path)
+        if self.read_store is not None:
+            # 包一层元组，区分"备忘录不存在"与"读取失败"
+            found = self._store_read(lambda: (self.read_store.get_note(title, folder, note_id),))
+            if found is not None:
+                record = found[0]
+                if record is None:
+                    return None
+                return {
+                    'creation_date': record['creation_date'],
+                    'modification_date': record['modification_date'],
+                    'id': record['id'],
+                    'title': title
+                }
+        return super().get_note_metadata(title, folder, source_path=source_path)
+    
+    @timed_operation("info")
+    def get_note_info(self, title: str, folder: str = None,
+                      source_path: str = None) -> Optional[Dict[str, Any]]:
         """
         获取备忘录详细信息
         
         Args:
             title: 备忘录标题
-            folder: 文件夹名，默认使用default_folder
+            folder: 文件夹路径，支持嵌套路径如 "Claude/ProjectName"，默认使用default_folder
+            source_path: 源文件路径，清单中有ID时按ID直接定位
             
         Returns:
             备忘录信息字典，包含创建时间、修改时间等
@@ -577,33 +1701,71 @@ class AppleScriptBridge:
         folder = folder or self.default_folder
         escaped_title = self._escape_applescript_string(title)
         
+        folder_parts = [part.strip() for part in folder.split('/') if part.strip()]
+        note_id = self._resolve_note_id(source_path)
+        
+        if self.read_protocol == "json":
+            args = [self.account, "/".join(folder_parts), title, note_id or ""]
+            try:
+                records = list(self._stream(JXA_NOTE_INFO_SCRIPT, args))
+            except ScriptRunnerError as e:
+                logger.debug(f"获取备忘录信息失败: {title} - {e}")
+                return None
+            if not records:
+                return None
+            return {
+                'creation_date': records[0].get('creation_date'),
+                'modification_date': records[0].get('modification_date'),
+                'id': records[0].get('id'),
+                'body': records[0].get('body', ''),
+                'title': title
+            }
+        
+        if self.script_cache is not None:
+            result = self._run_template(
+                'info',
+                [self.account, "/".join(folder_parts), title, note_id or ""]
+            )
+            return self._parse_note_info(result, title)
+        
+        folder_ref = self._build_folder_reference(folder_parts)
+        id_lookup = self._build_note_id_lookup(note_id, folder_parts)
+        
         script = f'''
         tell application "Notes"
             try
-                tell account "{self.account}"
-                    tell folder "{folder}"
-                        set targetNote to first note whose name is "{escaped_title}"
-                        set noteInfo to (creation date of targetNote) & "|||" & (modification date of targetNote) & "|||" & (body of targetNote)
-                        return noteInfo
+                {id_lookup}
+                if targetNote is missing value then
+                    tell account "{self.account}"
+                        {folder_ref}
+                            set targetNote to first note whose name is "{escaped_title}"
+                        {self._build_end_tell_blocks(folder_parts)}
                     end tell
-                end tell
-            on error errMsg
-                return "error: " & errMsg
+                end if
+                set noteInfo to ((creation date of targetNote) as string) & "|||" & ((modification date of targetNote) as string) & "|||" & (id of targetNote) & "|||" & (body of targetNote)
+                return noteInfo
+            on error errMsg number errNum
+                return "error: " & errMsg & " (" & errNum & ")"
             end try
         end tell
         '''
         
         result = self.execute_applescript(script)
+        return self._parse_note_info(result, title)
+    
+    def _parse_note_info(self, result: Optional[str], title: str) -> Optional[Dict[str, Any]]:
+        """解析备忘录信息脚本的返回值"""
         if not result or result.startswith("error"):
             return None
             
         try:
-            parts = result.split('|||')
-            if len(parts) >= 3:
+            parts = result.split('|||', 3)
+            if len(parts) >= 4:
                 return {
                     'creation_date': parts[0],
                     'modification_date': parts[1], 
-                    'body': parts[2],
+                    'id': parts[2],
+                    'body': parts[3],
                     'title': title
                 }
         except Exception as e:
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+参数化AppleScript模板
+脚本正文固定不变，标题、文件夹等参数通过 on run argv 传入，备忘录正文从临时文件读取，
+因此无论备忘录多大，脚本本身都保持很小，也不再需要转义正文。
+模板可以预编译为.scpt并缓存在磁盘上，去掉每次调用的编译开销
+"""
+
+import hashlib
+import logging
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# 公共处理器：路径拆分、按路径定位（或创建）文件夹、按ID定位备忘录、读取正文文件
+COMMON_HANDLERS = '''
+on splitPath(pathText)
+    if pathText is "" then return {}
+    set oldDelims to AppleScript's text item delimiters
+    set AppleScript's text item delimiters to "/"
+    set pathParts to text items of pathText
+    set AppleScript's text item delimiters to oldDelims
+    return pathParts
+end splitPath
+
+on resolveFolder(accountName, folderPath, createMissing)
+    tell application "Notes"
+        set targetContainer to account accountName
+        repeat with folderItem in my splitPath(folderPath)
+            set folderName to folderItem as text
+            if folderName is not "" then
+                if exists folder folderName of targetContainer then
+                    set targetContainer to folder folderName of targetContainer
+                else if createMissing then
+                    set targetContainer to make new folder at end of folders of targetContainer with properties {name:folderName}
+                else
+                    error "文件夹不存在: " & folderName
+                end if
+            end if
+        end repeat
+        return targetContainer
+    end tell
+end resolveFolder
+
+on findNoteById(noteId, folderPath)
+    if noteId is "" then return missing value
+    tell application "Notes"
+        try
+            set targetNote to note id noteId
+        on error
+            return missing value
+        end try
+        set pathParts to my splitPath(folderPath)
+        if (count of pathParts) > 0 then
+            if (name of container of targetNote) is not (last item of pathParts) then return missing value
+        end if
+        return targetNote
+    end tell
+end findNoteById
+
+on findNoteByName(targetContainer, noteTitle, claimedIds)
+    tell application "Notes"
+        repeat with candidate in (notes of targetContainer whose name is noteTitle)
+            if (id of candidate) is not in claimedIds then return contents of candidate
+        end repeat
+    end tell
+    return missing value
+end findNoteByName
+
+on readBody(bodyPath)
+    return read (POSIX file bodyPath) as «class utf8»
+end readBody
+'''
+
+# argv: 账户, 文件夹路径, 正文文件路径
+CREATE_NOTE_SCRIPT = COMMON_HANDLERS + '''
+on run argv
+    set {accountName, folderPath, bodyPath} to argv
+    try
+        set noteBody to readBody(bodyPath)
+        set targetContainer to resolveFolder(accountName, folderPath, false)
+        tell application "Notes"
+            set newNote to make new note at end of notes of targetContainer with properties {body:noteBody}
+            return "success|||" & (id of newNote)
+        end tell
+    on error errMsg number errNum
+        return "error: " & errMsg & " (" & errNum & ")"
+    end try
+end run
+'''
+
+# argv: 账户, 文件夹路径, 标题, 正文文件路径, 备忘录ID（可为空）
+UPDATE_NOTE_SCRIPT = COMMON_HANDLERS + '''
+on run argv
+    set {accountName, folderPath, noteTitle, bodyPath, noteId} to argv
+    try
+        set noteBody to readBody(bodyPath)
+        set targetNote to findNoteById(noteId, folderPath)
+        if targetNote is missing value then
+            set targetContainer to resolveFolder(accountName, folderPath, false)
+            set targetNote to findNoteByName(targetContainer, noteTitle, {})
+            if targetNote is missing value then error "备忘录不存在: " & noteTitle
+        end if
+        tell application "Notes"
+            set body of targetNote to noteBody
+            return "success|||" & (id of targetNote)
+        end tell
+    on error errMsg number errNum
+        return "error: " & errMsg & " (" & errNum & ")"
+    end try
+end run
+'''
+
+# argv: 账户, 文件夹路径, 标题, 追加内容文件路径, 备忘录ID（可为空）
+APPEND_NOTE_SCRIPT = COMMON_HANDLERS + '''
+on run argv
+    set {accountName, folderPath, noteTitle, bodyPath, noteId} to argv
+    try
+        set noteTail to readBody(bodyPath)
+        set targetNote to findNoteById(noteId, folderPath)
+        if targetNote is missing value then
+            set targetContainer to resolveFolder(accountName, folderPath, false)
+            set targetNote to findNoteByName(targetContainer, noteTitle, {})
+            if targetNote is missing value then error "备忘录不存在: " & noteTitle
+        end if
+        tell application "Notes"
+            set body of targetNote to (body of targetNote) & noteTail
+            return "success|||" & (id of targetNote)
+        end tell
+    on error errMsg number errNum
+        return "error: " & errMsg & " (" & errNum & ")"
+    end try
+end run
+'''
+
+# argv: 账户, 文件夹路径, 标题, 正文文件路径, 备忘录ID（可为空）, 已占用ID（换行分隔）, 是否创建文件夹
+UPSERT_NOTE_SCRIPT = COMMON_HANDLERS + '''
+on run argv
+    set {accountName, folderPath, noteTitle, bodyPath, noteId, claimedText, createFolders} to argv
+    try
+        set noteBody to readBody(bodyPath)
+        set targetNote to findNoteById(noteId, folderPath)
+        if targetNote is missing value then
+            set targetContainer to resolveFolder(accountName, folderPath, createFolders is "true")
+            set targetNote to findNoteByName(targetContainer, noteTitle, paragraphs of claimedText)
+            if targetNote is missing value then
+                tell application "Notes"
+                    set newNote to make new note at end of notes of targetContainer with properties {body:noteBody}
+                    return "created|||" & (id of newNote)
+                end tell
+            end if
+        end if
+        tell application "Notes"
+            set body of targetNote to noteBody
+            return "updated|||" & (id of targetNote)
+        end tell
+    on error errMsg number errNum
+        return "error: " & errMsg & " (" & errNum & ")"
+    end try
+end run
+'''
+
+# argv: 账户, 文件夹路径, 标题, 备忘录ID（可为空）
+NOTE_EXISTS_SCRIPT = COMMON_HANDLERS + '''
+on run argv
+    set {accountName, folderPath, noteTitle, noteId} to argv
+    try
+        if findNoteById(noteId, folderPath) is not missing value then return "true"
+        set targetContainer to resolveFolder(accountName, folderPath, false)
+        if findNoteByName(targetContainer, noteTitle, {}) is not missing value then return "true"
+        return "false"
+    on error
+        return "false"
+    end try
+end run
+'''
+
+# argv: 账户, 文件夹路径, 标题, 备忘录ID（可为空）
+DELETE_NOTE_SCRIPT = COMMON_HANDLERS + '''
+on run argv
+    set {accountName, folderPath, noteTitle, noteId} to argv
+    try
+        set targetNote to findNoteById(noteId, folderPath)
+        if targetNote is missing value then
+            set targetContainer to resolveFolder(accountName, folderPath, false)
+            set targetNote to findNoteByName(targetContainer, noteTitle, {})
+            if targetNote is missing value then error "备忘录不存在: " & noteTitle
+        end if
+        tell application "Notes" to delete targetNote
+        return "success"
+    on error errMsg number errNum
+        return "error: " & errMsg & " (" & errNum & ")"
+    end try
+end run
+'''
+
+# argv: 账户, 文件夹路径
+ENSURE_FOLDER_SCRIPT = COMMON_HANDLERS + '''
+on run argv
+    set {accountName, folderPath} to argv
+    try
+        resolveFolder(accountName, folderPath, true)
+        return "success"
+    on error errMsg number errNum
+        return "error: " & errMsg & " (" & errNum & ")"
+    end try
+end run
+'''
+
+# argv: 账户, 文件夹路径
+LIST_NOTES_SCRIPT = COMMON_HANDLERS + '''
+on run argv
+    set {accountName, folderPath} to argv
+    try
+        set targetContainer to resolveFolder(accountName, folderPath, false)
+        tell application "Notes" to set noteNames to name of notes of targetContainer
+    on error
+        return ""
+    end try
+    set AppleScript's text item delimiters to "|||"
+    set noteListString to noteNames as string
+    set AppleScript's text item delimiters to ""
+    return noteListString
+end run
+'''
+
+# argv: 账户, 文件夹路径, 标题, 备忘录ID（可为空）
+NOTE_INFO_SCRIPT = COMMON_HANDLERS + '''
+on run argv
+    set {accountName, folderPath, noteTitle, noteId} to argv
+    try
+        set targetNote to findNoteById(noteId, folderPath)
+        if targetNote is missing value then
+            set targetContainer to resolveFolder(accountName, folderPath, false)
+            set targetNote to findNoteByName(targetContainer, noteTitle, {})
+            if targetNote is missing value then error "备忘录不存在: " & noteTitle
+        end if
+        tell application "Notes"
+            return ((creation date of targetNote) as string) & "|||" & ((modification date of targetNote) as string) & "|||" & (id of targetNote) & "|||" & (body of targetNote)
+        end tell
+    on error errMsg number errNum
+        return "error: " & errMsg & " (" & errNum & ")"
+    end try
+end run
+'''
+
+# 模板名称到源码的映射，名称同时用作编译缓存的文件名
+SCRIPT_TEMPLATES = {
+    'create': CREATE_NOTE_SCRIPT,
+    'update': UPDATE_NOTE_SCRIPT,
+    'append': APPEND_NOTE_SCRIPT,
+    'upsert': UPSERT_NOTE_SCRIPT,
+    'exists': NOTE_EXISTS_SCRIPT,
+    'delete': DELETE_NOTE_SCRIPT,
+    'ensure_folder': ENSURE_FOLDER_SCRIPT,
+    'list': LIST_NOTES_SCRIPT,
+    'info': NOTE_INFO_SCRIPT,
+}
+
+# osacompile只存在于macOS，缓存放在用户缓存目录而不是包目录（包目录可能只读或位于site-packages）
+DEFAULT_CACHE_DIR = Path.home() / 'Library' / 'Caches' / 'mindsync' / 'compiled_scripts'
+
+class CompiledScriptCache:
+    """
+    预编译脚本缓存
+    
+    用osacompile把模板编译为.scpt保存在缓存目录中，文件名带模板源码哈希，
+    模板修改后自动重新编译；无法编译时返回None，调用方退回执行源码
+    """
+    
+    def __init__(self, cache_dir: Union[str, Path] = None, compiler: str = 'osacompile'):
+        """
+        初始化编译缓存
+        
+        Args:
+            cache_dir: 缓存目录，默认为 ~/Library/Caches/mindsync/compiled_scripts
+            compiler: 编译器命令
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+        self.compiler = compiler
+        self._compiled: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def source_hash(source: str) -> str:
+        """模板源码哈希"""
+        return hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]
+    
+    def get_compiled_path(self, name: str) -> Optional[str]:
+        """
+        获取模板的已编译脚本路径，必要时编译
+        
+        Args:
+            name: 模板名称
+            
+        Returns:
+            .scpt文件路径，无法编译时返回None
+        """
+        with self._lock:
+            if name not in self._compiled:
+                self._compiled[name] = self._compile(name)
+            return self._compiled[name]
+    
+    def _compile(self, name: str) -> Optional[str]:
+        source = SCRIPT_TEMPLATES[name]
+        compiled_path = self.cache_dir / f"{name}-{self.source_hash(source)}.scpt"
+        
+        if compiled_path.exists():
+            return str(compiled_path)
+        
+        if shutil.which(self.compiler) is None:
+            logger.debug(f"未找到{self.compiler}，模板 {name} 使用源码执行")
+            return None
+        
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            source_path = compiled_path.with_suffix('.applescript')
+            source_path.write_text(source, encoding='utf-8')
+            subprocess.run(
+                [self.compiler, '-o', str(compiled_path), str(source_path)],
+                capture_output=True,
+                text=True,
+                check=True,
+                timeout=60
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"编译脚本模板失败: {name} - {e}")
+            return None
+        
+        # 清理旧版本模板的编译产物
+        for stale in self.cache_dir.glob(f"{name}-*"):
+            if stale.stem != compiled_path.stem:
+                try:
+                    stale.unlink()
+                except OSError:
+                    pass
+        
+        logger.info(f"🛠️ 已编译脚本模板: {name}")
+        return str(compiled_path)
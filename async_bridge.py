@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+asyncio原生的AppleScript桥接
+基于 asyncio.create_subprocess_exec 执行参数化脚本模板，用信号量限制同时运行的脚本数，
+让文件读取、格式转换和备忘录写入可以交错进行。清单、快照索引和文件夹树的维护
+复用同步桥接的逻辑，两者共享同一份本地状态
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from apple_bridge import AppleScriptBridge
+from applescript_templates import SCRIPT_TEMPLATES
+from concurrency import AdaptiveConcurrencyLimiter
+from metrics import OperationMetrics, timed_operation
+from osascript_pool import ScriptRunnerError
+from resilience import ERROR_TIMEOUT, RETRYABLE_ERRORS, SAFE_RETRY_ERRORS
+
+logger = logging.getLogger(__name__)
+
+class AsyncAppleScriptBridge:
+    """异步AppleScript桥接，包装同步桥接并提供协程版本的写入接口"""
+    
+    def __init__(self, bridge: AppleScriptBridge, max_in_flight: int = 4,
+                 timeout: float = 30, osascript_command: List[str] = None,
+                 limiter: Optional[AdaptiveConcurrencyLimiter] = None):
+        """
+        初始化异步桥接
+        
+        Args:
+            bridge: 同步桥接，提供账户、清单、预编译缓存等状态
+            max_in_flight: 同时运行的脚本数上限
+            timeout: 单个脚本的超时秒数
+            osascript_command: 解释器命令，默认 ["osascript"]
+            limiter: 自适应并发控制器，提供时同时运行的脚本数不超过其当前上限
+                     （max_in_flight 仍是硬上限），每个脚本的耗时和结果回报给控制器
+        """
+        self.bridge = bridge
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.osascript_command = list(osascript_command or ['osascript'])
+        self.limiter = limiter
+        self.in_flight = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._slot_changed: Optional[asyncio.Condition] = None
+    
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        """在首次使用时创建信号量，使其绑定到实际运行的事件循环"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+    
+    @property
+    def metrics(self) -> Optional[OperationMetrics]:
+        """与同步桥接共用的操作统计"""
+        return self.bridge.metrics
+    
+    @property
+    def slot_changed(self) -> asyncio.Condition:
+        """在首次使用时创建条件变量，用于等待自适应上限下的空闲名额"""
+        if self._slot_changed is None:
+            self._slot_changed = asyncio.Condition()
+        return self._slot_changed
+    
+    async def _acquire_slot(self):
+        """等待自适应控制器的当前上限允许再运行一个脚本"""
+        if self.limiter is None:
+            return
+        async with self.slot_changed:
+            await self.slot_changed.wait_for(lambda: self.in_flight < self.limiter.limit)
+    
+    async def _release_slot(self, latency: float, success: bool, timed_out: bool):
+        """回报脚本结果并唤醒等待名额的协程"""
+        if self.limiter is None:
+            return
+        self.limiter.record(latency, success=success, timed_out=timed_out)
+        async with self.slot_changed:
+            self.slot_changed.notify_all()
+    
+    @timed_operation("script")
+    async def execute_applescript(self, script: str = None, args: List[str] = None,
+                                  script_file: str = None, timeout: float = None,
+                                  idempotent: bool = True,
+                                  on_timeout: Callable[[], Awaitable[Optional[str]]] = None) -> Optional[str]:
+        """
+        异步执行AppleScript脚本，可重试的错误按同步桥接的重试器配置重试
+        
+        Args:
+            script: AppleScript代码
+            args: 传给脚本 on run argv 的参数
+            script_file: 已编译脚本文件路径，提供时忽略script
+            timeout: 超时秒数，默认使用初始化参数
+            idempotent: 脚本重复执行是否安全，False时超时不重试
+            on_timeout: 超时后、重试前等待的协程函数，返回非None时作为脚本结果，不再重试
+        
+        Returns:
+            脚本执行结果，失败返回None
+        """
+        args = [str(arg) for arg in (args or [])]
+        retrier = self.bridge.retrier
+        
+        async def run_once():
+            try:
+                return await self._execute_once(script, args, script_file, timeout or self.timeout)
+            except ScriptRunnerError as e:
+                recovered = await on_timeout() if on_timeout is not None and e.kind == ERROR_TIMEOUT else None
+                if recovered is None:
+                    raise
+                logger.warning("⏱️ 脚本执行超时，但写入已生效，不再重试")
+                return recovered
+        
+        try:
+            if retrier is None:
+                return await run_once()
+            # 退避等待在信号量之外进行，不占用并发名额
+            return await retrier.call_async(run_once, self.bridge._describe_error,
+                                            retryable=RETRYABLE_ERRORS if idempotent else SAFE_RETRY_ERRORS)
+        except ScriptRunnerError as e:
+            if e.kind == ERROR_TIMEOUT:
+                logger.error("AppleScript执行超时")
+            else:
+                logger.error(f"AppleScript执行失败（{e.kind}）: {e}")
+            return None
+        except OSError as e:
+            logger.error(f"AppleScript执行异常: {e}")
+            return None
+    
+    async def _execute_once(self, script: Optional[str], args: List[str], script_file: Optional[str],
+                            timeout: float) -> str:
+        """
+        在并发名额内执行一次脚本，同步桥接配置了录制文件时经其录制或回放
+        
+        Raises:
+            ScriptRunnerError: 脚本执行失败或超时
+        """
+        cassette = self.bridge.cassette
+        async with self.semaphore:
+            await self._acquire_slot()
+            self.in_flight += 1
+            start = time.monotonic()
+            success, timed_out = False, False
+            try:
+                if cassette is not None:
+                    output = await cassette.run_async(
+                        script, args, lambda: self._run_process(script, args, script_file, timeout),
+                        script_file=script_file
+                    )
+                else:
+                    output = await self._run_process(script, args, script_file, timeout)
+                self.bridge._raise_script_error(output)
+                success = True
+                return output
+            except ScriptRunnerError as e:
+                timed_out = e.kind == ERROR_TIMEOUT
+                raise
+            finally:
+                self.in_flight -= 1
+                await self._release_slot(time.monotonic() - start, success, timed_out)
+    
+    async def _run_process(self, script: Optional[str], args: List[str], script_file: Optional[str],
+                           timeout: float) -> str:
+        """启动osascript子进程执行脚本"""
+        target = [script_file] if script_file else ['-e', script]
+        process = await asyncio.create_subprocess_exec(
+            *(self.osascript_command + target + args),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise ScriptRunnerError("AppleScript执行超时", timeout=True)
+        
+        if process.returncode != 0:
+            raise ScriptRunnerError(stderr.decode('utf-8', 'replace').strip()
+                                    or f"osascript退出码 {process.returncode}")
+        return stdout.decode('utf-8', 'replace').strip()
+    
+    async def run_template(self, name: str, args: List[str], payload_bytes: int = 0,
+                           **retry_options) -> Optional[str]:
+        """执行参数化脚本模板，有预编译版本时直接运行.scpt；写入大正文时按大小放宽超时"""
+        timeout = self.timeout + payload_bytes / (1024 * 1024) * self.bridge.timeout_per_mb
+        cache = self.bridge.script_cache
+        compiled_path = cache.get_compiled_path(name) if cache else None
+        if compiled_path:
+            return await self.execute_applescript(args=args, script_file=compiled_path, timeout=timeout,
+                                                  **retry_options)
+        return await self.execute_applescript(SCRIPT_TEMPLATES[name], args, timeout=timeout, **retry_options)
+    
+    @timed_operation("exists")
+    async def note_exists(self, title: str, folder: str = None) -> bool:
+        """异步检查备忘录是否存在"""
+        folder = folder or self.bridge.default_folder
+        if self.bridge.snapshot_index is not None:
+            return self.bridge.snapshot_index.has_note(folder, title)
+        
+        result = await self.run_template('exists', [self.bridge.account, self._folder_path(folder), title, ""])
+        return result == "true"
+    
+    async def _confirm_created(self, title: str, folder: str) -> Optional[str]:
+        """创建脚本超时后确认备忘录是否已创建，返回值含义同 AppleScriptBridge._confirm_created"""
+        result = await self.run_template('exists', [self.bridge.account, self._folder_path(folder), title, ""])
+        if not result:
+            return "error: 创建超时且无法确认备忘录是否已创建"
+        return "success|||" if result == "true" else None
+    
+    @timed_operation("folder_create", check_result=True)
+    async def create_folder(self, folder_path: str) -> bool:
+        """异步确保文件夹存在，文件夹树缓存中已有时不执行脚本"""
+        tree = self.bridge.folder_tree
+        if tree is not None and tree.has_folder(folder_path):
+            return True
+        
+        result = await self.run_template('ensure_folder', [self.bridge.account, self._folder_path(folder_path)])
+        if not (result and result.startswith("success")):
+            logger.error(f"❌ 创建文件夹失败: {folder_path} - {result}")
+            return False
+        self.bridge._record_folder_created(folder_path)
+        return True
+    
+    @timed_operation("create", payload="content", check_result=True)
+    async def create_note(self, title: str, content: str, folder: str = None,
+                          source_path: str = None) -> bool:
+        """异步创建备忘录"""
+        folder = folder or self.bridge.default_folder
+        with self.bridge._body_file(content) as body_path:
+            result = await self.run_template(
+                'create',
+                [self.bridge.account, self._folder_path(folder), body_path],
+                payload_bytes=len(content.encode('utf-8')),
+                on_timeout=lambda: self._confirm_created(title, folder)
+            )
+        return self.bridge._finish_create(result, title, folder, source_path)
+    
+    @timed_operation("update", payload="content", check_result=True)
+    async def update_note(self, title: str, content: str, folder: str = None,
+                          source_path: str = None) -> bool:
+        """异步更新备忘录"""
+        folder = folder or self.bridge.default_folder
+        note_id = self.bridge._resolve_note_id(source_path)
+        with self.bridge._body_file(content) as body_path:
+            result = await self.run_template(
+                'update',
+                [self.bridge.account, self._folder_path(folder), title, body_path, note_id or ""],
+                payload_bytes=len(content.encode('utf-8'))
+            )
+        return self.bridge._finish_update(result, title, folder, source_path)
+    
+    @timed_operation("append", payload="content", check_result=True)
+    async def append_note(self, title: str, content: str, folder: str = None,
+                          source_path: str = None) -> bool:
+        """异步在备忘录正文末尾追加内容"""
+        folder = folder or self.bridge.default_folder
+        note_id = self.bridge._resolve_note_id(source_path)
+        with self.bridge._body_file(content) as body_path:
+            result = await self.run_template(
+                'append',
+                [self.bridge.account, self._folder_path(folder), title, body_path, note_id or ""],
+                payload_bytes=len(content.encode('utf-8')),
+                idempotent=False
+            )
+        return self.bridge._finish_append(result, title, folder, source_path)
+    
+    @timed_operation("upsert", payload="content", check_result=True)
+    async def upsert_note(self, title: str, content: str, folder: str = None,
+                          create_folders: bool = True, source_path: str = None) -> Optional[str]:
+        """异步执行存在则更新、不存在则创建"""
+        folder = folder or self.bridge.default_folder
+        folder_path = self._folder_path(folder)
+        note_id = self.bridge._resolve_note_id(source_path)
+        claimed_ids = self.bridge.manifest.claimed_ids(folder_path, title, source_path) \
+            if self.bridge.manifest is not None and source_path else []
+        
+        with self.bridge._body_file(content) as body_path:
+            result = await self.run_template(
+                'upsert',
+                [self.bridge.account, folder_path, title, body_path, note_id or "",
+                 "\n".join(claimed_ids), "true" if create_folders else "false"],
+                payload_bytes=len(content.encode('utf-8'))
+            )
+        return self.bridge._finish_upsert(result, title, folder, source_path)
+    
+    @timed_operation("delete", check_result=True)
+    async def delete_note(self, title: str, folder: str = None, source_path: str = None) -> bool:
+        """异步删除备忘录"""
+        folder = folder or self.bridge.default_folder
+        note_id = self.bridge._resolve_note_id(source_path)
+        result = await self.run_template(
+            'delete',
+            [self.bridge.account, self._folder_path(folder), title, note_id or ""],
+            idempotent=False
+        )
+        
+        if result and result.startswith("success"):
+            logger.info(f"🗑️ 删除备忘录成功: {title}")
+            if self.bridge.snapshot_index is not None:
+                self.bridge.snapshot_index.remove_note(folder, title)
+            if self.bridge.manifest is not None and source_path:
+                self.bridge.manifest.remove(source_path)
+            return True
+        
+        logger.error(f"❌ 删除备忘录失败: {title} - {result}")
+        return False
+    
+    async def apply_op(self, op: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        异步执行单个 apply_batch 格式的操作
+        
+        Args:
+            op: 操作字典，格式见 AppleScriptBridge.apply_batch
+        
+        Returns:
+            操作结果，格式与 apply_batch 的单项结果相同
+        """
+        action = op.get('action')
+        title = op.get('title')
+        folder = op.get('folder') or self.bridge.default_folder
+        content = op.get('content', '')
+        source_path = op.get('source_path')
+        
+        if action == "upsert":
+            status = await self.upsert_note(title, content, folder,
+                                            create_folders=op.get('create_folders', True),
+                                            source_path=source_path)
+        elif action == "create":
+            ok = (not op.get('create_folders', True) or await self.create_folder(folder)) and \
+                await self.create_note(title, content, folder, source_path=source_path)
+            status = "created" if ok else None
+        elif action == "update":
+            ok = await self.update_note(title, content, folder, source_path=source_path)
+            status = "updated" if ok else None
+        elif action == "append":
+            ok = await self.append_note(title, content, folder, source_path=source_path)
+            status = "appended" if ok else None
+        elif action == "delete":
+            ok = await self.delete_note(title, folder, source_path=source_path)
+            status = "deleted" if ok else None
+        else:
+            return self.bridge._batch_result("error", error=f"不支持的操作: {action}")
+        
+        return self.bridge._batch_result(status or "error", error=None if status else "操作失败")
+    
+    @staticmethod
+    def _folder_path(folder: str) -> str:
+        """规范化文件夹路径"""
+        return "/".join(part.strip() for part in folder.split('/') if part.strip())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+正文传递方式基准测试
+比较 inline（正文转义后拼进脚本文本）与 file（固定脚本 + 临时文件 + on run argv）
+两种方式在 1 KB、100 KB、2 MB 正文下的吞吐量
+
+脚本只读取正文并返回长度，不会修改备忘录数据。没有osascript时（例如Linux）
+可以用 --runner 指定实现相同分帧协议的替代解释器，或用 --prepare-only 只测量准备开销
+"""
+
+import argparse
+import shlex
+import shutil
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from apple_bridge import AppleScriptBridge
+from osascript_pool import OsascriptWorkerPool
+
+SIZES = [
+    ("1 KB", 1024),
+    ("100 KB", 100 * 1024),
+    ("2 MB", 2 * 1024 * 1024),
+]
+
+FILE_SCRIPT = '''
+on run argv
+    return length of (read (POSIX file (item 1 of argv)) as «class utf8»)
+end run
+'''
+
+def make_body(size: int) -> str:
+    """生成包含引号和反斜杠的正文，保证inline方式需要真正转义"""
+    line = '【标题】 "quoted" path\\to\\file 正文内容 <br>'
+    repeats = size // len(line.encode('utf-8')) + 1
+    return (line * repeats)[:size]
+
+def run_inline(bridge: AppleScriptBridge, body: str, prepare_only: bool):
+    start = time.perf_counter()
+    script = f'set noteBody to "{bridge._escape_applescript_string(body)}"\nreturn length of noteBody'
+    prepared = time.perf_counter()
+    ok = True
+    if not prepare_only:
+        ok = bridge.execute_applescript(script) is not None
+    return prepared - start, time.perf_counter() - start, ok
+
+def run_file(bridge: AppleScriptBridge, body: str, prepare_only: bool):
+    start = time.perf_counter()
+    with bridge._body_file(body) as body_path:
+        prepared = time.perf_counter()
+        ok = True
+        if not prepare_only:
+            ok = bridge.execute_applescript(FILE_SCRIPT, [body_path]) is not None
+    return prepared - start, time.perf_counter() - start, ok
+
+def benchmark(bridge: AppleScriptBridge, iterations: int, prepare_only: bool):
+    print(f"{'大小':>8} {'方式':>7} {'准备(ms)':>10} {'总计(ms)':>10} {'ops/s':>8} {'MB/s':>8}  状态")
+    for label, size in SIZES:
+        body = make_body(size)
+        for mode, runner in (("inline", run_inline), ("file", run_file)):
+            prepare_total = 0.0
+            elapsed_total = 0.0
+            failures = 0
+            for _ in range(iterations):
+                prepare, elapsed, ok = runner(bridge, body, prepare_only)
+                prepare_total += prepare
+                elapsed_total += elapsed
+                if not ok:
+                    failures += 1
+            
+            ops = iterations / elapsed_total if elapsed_total > 0 else float('inf')
+            throughput = ops * size / (1024 * 1024)
+            status = "ok" if failures == 0 else f"失败 {failures}/{iterations}"
+            print(f"{label:>8} {mode:>7} {prepare_total / iterations * 1000:>10.2f} "
+                  f"{elapsed_total / iterations * 1000:>10.2f} {ops:>8.1f} {throughput:>8.2f}  {status}")
+
+def main():
+    parser = argparse.ArgumentParser(description='正文传递方式基准测试')
+    parser.add_argument('-n', '--iterations', type=int, default=5, help='每种组合的重复次数')
+    parser.add_argument('--runner', help='使用常驻进程池并指定执行器命令（例如替代解释器）')
+    parser.add_argument('--prepare-only', action='store_true', help='只测量转义/写临时文件的准备开销')
+    args = parser.parse_args()
+    
+    pool = None
+    if args.runner:
+        pool = OsascriptWorkerPool(size=1, runner_command=shlex.split(args.runner))
+    
+    prepare_only = args.prepare_only
+    if not prepare_only and pool is None and shutil.which('osascript') is None:
+        print("⚠️ 未找到osascript，只测量准备开销（可用 --runner 指定替代解释器）")
+        prepare_only = True
+    
+    bridge = AppleScriptBridge(worker_pool=pool)
+    try:
+        benchmark(bridge, args.iterations, prepare_only)
+    finally:
+        bridge.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模拟后端上的同步策略对比
+生成一批Markdown文件，在目标文件夹预置了大量备忘录的模拟后端上分别以逐个调用、批量写入、
+批量+自适应并发、批量+并发+常驻进程池四种配置运行 sync_folder，
+输出实际耗时和按延迟模型累计的模拟耗时。--time-scale 0 时只累计模拟耗时，不实际等待
+"""
+
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sync_engine import MDSyncEngine
+
+STRATEGIES = [
+    ("逐个调用", {"batch_writes": {"enabled": False}, "adaptive_concurrency": {"enabled": False}}),
+    ("批量写入", {"batch_writes": {"enabled": True}, "adaptive_concurrency": {"enabled": False}}),
+    ("批量+并发", {"batch_writes": {"enabled": True}, "adaptive_concurrency": {"enabled": True}}),
+    ("批量+并发+进程池", {"batch_writes": {"enabled": True}, "adaptive_concurrency": {"enabled": True},
+                          "worker_pool": {"enabled": True}}),
+]
+
+def make_files(directory: Path, count: int, body_kb: int):
+    """生成待同步的Markdown文件"""
+    paragraph = "模拟同步的正文内容，包含 **粗体** 和 `代码`。\n\n"
+    repeats = max(1, body_kb * 1024 // len(paragraph.encode('utf-8')))
+    for i in range(count):
+        (directory / f"doc_{i:05d}.md").write_text(f"# 文档 {i}\n\n" + paragraph * repeats, encoding='utf-8')
+
+def run_strategy(workdir: Path, docs: Path, overrides: dict, args) -> dict:
+    """用一种配置运行一次 sync_folder"""
+    notes_config = {
+        "backend": "simulated",
+        "use_note_manifest": True,
+        "simulation": {
+            "time_scale": args.time_scale,
+            "seed": args.seed,
+            "preload_notes": args.preload,
+            # Claude规则把 docs/ 下的文件同步到 Claude/docs
+            "preload_folder": "Claude/docs",
+            "stall_probability": args.stall_probability
+        },
+        **overrides
+    }
+    config = {"notes_config": notes_config, "state": {"directory": str(workdir / "state")}}
+    config_path = workdir / "config.json"
+    config_path.write_text(json.dumps(config, ensure_ascii=False), encoding='utf-8')
+    
+    engine = MDSyncEngine(str(config_path))
+    try:
+        start = time.perf_counter()
+        stats = engine.sync_folder(str(docs), recursive=False)
+        stats['wall_seconds'] = time.perf_counter() - start
+    finally:
+        engine.backend.close()
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description='模拟后端上的同步策略对比')
+    parser.add_argument('-n', '--files', type=int, default=200, help='待同步的Markdown文件数')
+    parser.add_argument('--preload', type=int, default=10000, help='目标文件夹中预置的备忘录数')
+    parser.add_argument('--body-kb', type=int, default=4, help='每个文件的大致大小（KB）')
+    parser.add_argument('--time-scale', type=float, default=0.01, help='实际等待时间相对模拟耗时的比例')
+    parser.add_argument('--stall-probability', type=float, default=0.0, help='单次调用卡顿的概率')
+    parser.add_argument('--seed', type=int, default=1, help='延迟模型的随机种子')
+    args = parser.parse_args()
+    
+    logging.disable(logging.INFO)
+    
+    print(f"{'策略':<16} {'实际(s)':>9} {'模拟(s)':>9} {'调用数':>7} {'排队(s)':>9} {'成功':>6}")
+    with tempfile.TemporaryDirectory(prefix="mindsync-bench-") as tmp:
+        docs = Path(tmp) / "docs"
+        docs.mkdir()
+        make_files(docs, args.files, args.body_kb)
+        
+        for index, (label, overrides) in enumerate(STRATEGIES):
+            workdir = Path(tmp) / f"run{index}"
+            workdir.mkdir()
+            stats = run_strategy(workdir, docs, overrides, args)
+            sim = stats.get('simulation', {})
+            print(f"{label:<16} {stats['wall_seconds']:>9.2f} {sim.get('simulated_seconds', 0):>9.1f} "
+                  f"{sim.get('calls', 0):>7} {sim.get('queued_seconds', 0):>9.2f} {stats.get('success_count', 0):>6}")
+
+if __name__ == '__main__':
+    main()
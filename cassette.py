@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+脚本调用的录制与回放
+录制模式下，桥接发出的每个脚本连同参数、输出（或错误）和耗时都追加到JSONL录制文件中；
+回放模式下不再启动osascript，而是按录制的耗时（可按比例缩放）返回录制的输出。
+这样 sync_folder、Unity同步和钩子都可以在没有备忘录应用的机器上做可重复的基准测试
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+import jxa_stream
+from applescript_templates import SCRIPT_TEMPLATES
+from osascript_pool import ScriptRunnerError
+
+logger = logging.getLogger(__name__)
+
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+# 通过环境变量启用录制/回放，供直接构造桥接的脚本（Unity同步、钩子）使用
+ENV_MODE = "MINDSYNC_CASSETTE_MODE"
+ENV_PATH = "MINDSYNC_CASSETTE"
+ENV_TIME_SCALE = "MINDSYNC_CASSETTE_TIME_SCALE"
+
+DEFAULT_CASSETTE_PATH = "cassettes/bridge.jsonl"
+
+# 桥接写入临时文件传递的正文、批量操作，录制时用内容摘要代替每次不同的路径
+_TEMP_FILE_PREFIX = "mindsync-"
+
+def _digest(text: str) -> str:
+    """文本的短摘要"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+def _template_names() -> Dict[str, str]:
+    """脚本源码摘要到名称的映射，录制文件中用名称标识已知脚本"""
+    names = {_digest(source): name for name, source in SCRIPT_TEMPLATES.items()}
+    for attr in dir(jxa_stream):
+        if attr.startswith('JXA_') and attr.endswith('_SCRIPT'):
+            names[_digest(getattr(jxa_stream, attr))] = attr[len('JXA_'):-len('_SCRIPT')].lower()
+    return names
+
+class ScriptCassette:
+    """脚本调用录制文件，线程安全"""
+    
+    def __init__(self, path: Union[str, Path], mode: str = MODE_REPLAY, time_scale: float = 1.0):
+        """
+        初始化录制文件
+        
+        Args:
+            path: JSONL录制文件路径
+            mode: "record" 执行真实脚本并追加记录，"replay" 从文件返回录制的结果
+            time_scale: 回放耗时相对录制耗时的比例，0表示不等待
+        """
+        if mode not in (MODE_RECORD, MODE_REPLAY):
+            raise ValueError(f"不支持的录制模式: {mode}")
+        
+        self.path = Path(path).expanduser()
+        self.mode = mode
+        self.time_scale = max(0.0, time_scale)
+        self._lock = threading.Lock()
+        self._names = _template_names()
+        self._file = None
+        self._exact: Dict[Tuple[str, str, str], Deque[Dict[str, Any]]] = {}
+        self._by_script: Dict[Tuple[str, str], Deque[Dict[str, Any]]] = {}
+        self._last: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        self.misses = 0
+        
+        if mode == MODE_REPLAY:
+            self._load()
+    
+    @classmethod
+    def from_env(cls) -> Optional['ScriptCassette']:
+        """
+        按环境变量创建录制文件
+        
+        Returns:
+            设置了 MINDSYNC_CASSETTE_MODE 时返回录制文件，否则返回None
+        """
+        mode = os.environ.get(ENV_MODE)
+        if not mode:
+            return None
+        return cls(os.environ.get(ENV_PATH, DEFAULT_CASSETTE_PATH), mode,
+                   float(os.environ.get(ENV_TIME_SCALE, "1.0")))
+    
+    def close(self):
+        """关闭录制文件"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+    
+    def _load(self):
+        """读取录制文件并按脚本和参数建立回放队列"""
+        if not self.path.exists():
+            raise FileNotFoundError(f"录制文件不存在: {self.path}")
+        
+        count = 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                entry['used'] = False
+                exact_key = (entry['kind'], entry['script'], json.dumps(entry['args'], ensure_ascii=False))
+                self._exact.setdefault(exact_key, deque()).append(entry)
+                self._by_script.setdefault((entry['kind'], entry['script']), deque()).append(entry)
+                count += 1
+        logger.info(f"📼 已加载 {count} 条脚本录制: {self.path}")
+    
+    def script_key(self, script: Optional[str], script_file: Optional[str] = None) -> str:
+        """
+        脚本在录制文件中的标识：已知模板用名称，其他脚本用源码摘要
+        
+        Args:
+            script: 脚本源码
+            script_file: 已编译脚本路径（文件名形如 "名称-摘要.scpt"）
+        
+        Returns:
+            脚本标识
+        """
+        if script_file:
+            return Path(script_file).stem.rsplit('-', 1)[0]
+        digest = _digest(script or "")
+        return self._names.get(digest, digest)
+    
+    @staticmethod
+    def normalize_args(args: Optional[List[Any]]) -> List[str]:
+        """
+        规范化脚本参数，临时文件路径替换为其内容摘要
+        
+        Args:
+            args: 脚本参数
+        
+        Returns:
+            可在多次运行间比较的参数列表
+        """
+        normalized = []
+        for arg in args or []:
+            arg = str(arg)
+            if os.path.basename(arg).startswith(_TEMP_FILE_PREFIX) and os.path.isfile(arg):
+                try:
+                    with open(arg, 'r', encoding='utf-8') as f:
+                        arg = f"@file:{_digest(f.read())}"
+                except OSError:
+                    pass
+            normalized.append(arg)
+        return normalized
+    
+    def _write(self, entry: Dict[str, Any]):
+        """追加一条录制"""
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+    
+    def _take(self, kind: str, script: str, args: List[str]) -> Dict[str, Any]:
+        """
+        取出下一条匹配的录制：优先脚本和参数都相同的，其次同一脚本的；
+        都已用完时重复使用最后一条
+        
+        Raises:
+            ScriptRunnerError: 录制中没有该脚本
+        """
+        exact_key = (kind, script, json.dumps(args, ensure_ascii=False))
+        with self._lock:
+            for key, queues in ((exact_key, self._exact), ((kind, script), self._by_script)):
+                queue = queues.get(key)
+                while queue:
+                    entry = queue.popleft()
+                    if not entry['used']:
+                        entry['used'] = True
+                        self._last[key] = entry
+                        return entry
+                if key in self._last:
+                    return self._last[key]
+            self.misses += 1
+        raise ScriptRunnerError(f"录制中没有匹配的脚本调用: {script}")
+    
+    def _delay(self, entry: Dict[str, Any]) -> float:
+        """回放一条录制需要等待的秒数"""
+        return entry.get('latency', 0.0) * self.time_scale
+    
+    @staticmethod
+    def _error_entry(error: ScriptRunnerError) -> Dict[str, Any]:
+        """脚本错误的录制格式"""
+        return {'message': str(error), 'code': error.code, 'timeout': error.timeout}
+    
+    @staticmethod
+    def _raise_recorded(entry: Dict[str, Any]):
+        """录制的调用失败时抛出相同的错误"""
+        error = entry.get('error')
+        if error:
+            raise ScriptRunnerError(error['message'], code=error.get('code'), timeout=error.get('timeout', False))
+    
+    def run(self, script: Optional[str], args: List[Any], execute: Callable[[], str],
+            script_file: str = None) -> str:
+        """
+        录制或回放一次AppleScript调用
+        
+        Args:
+            script: 脚本源码
+            args: 脚本参数
+            execute: 真实执行脚本的无参调用（只在录制模式下调用）
+            script_file: 已编译脚本路径
+        
+        Returns:
+            脚本输出
+        
+        Raises:
+            ScriptRunnerError: 脚本执行失败（录制模式）或录制的调用失败、录制中没有该调用（回放模式）
+        """
+        key = self.script_key(script, script_file)
+        args = self.normalize_args(args)
+        
+        if self.mode == MODE_REPLAY:
+            entry = self._take('applescript', key, args)
+            time.sleep(self._delay(entry))
+            self._raise_recorded(entry)
+            return entry.get('response', "")
+        
+        start = time.monotonic()
+        try:
+            response = execute()
+        except ScriptRunnerError as e:
+            self._write({'kind': 'applescript', 'script': key, 'args': args,
+                         'latency': time.monotonic() - start, 'error': self._error_entry(e)})
+            raise
+        self._write({'kind': 'applescript', 'script': key, 'args': args,
+                     'latency': time.monotonic() - start, 'response': response})
+        return response
+    
+    async def run_async(self, script: Optional[str], args: List[Any],
+                        execute: Callable[[], Awaitable[str]], script_file: str = None) -> str:
+        """run 的协程版本，回放等待期间不阻塞事件循环"""
+        key = self.script_key(script, script_file)
+        args = self.normalize_args(args)
+        
+        if self.mode == MODE_REPLAY:
+            entry = self._take('applescript', key, args)
+            await asyncio.sleep(self._delay(entry))
+            self._raise_recorded(entry)
+            return entry.get('response', "")
+        
+        start = time.monotonic()
+        try:
+            response = await execute()
+        except ScriptRunnerError as e:
+            self._write({'kind': 'applescript', 'script': key, 'args': args,
+                         'latency': time.monotonic() - start, 'error': self._error_entry(e)})
+            raise
+        self._write({'kind': 'applescript', 'script': key, 'args': args,
+                     'latency': time.monotonic() - start, 'response': response})
+        return response
+    
+    def stream(self, script: str, args: List[Any],
+               execute: Callable[[], Iterator[Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+        """
+        录制或回放一次JXA流式读取，回放时按录制的到达时间逐条产出记录
+        
+        Args:
+            script: JXA脚本源码
+            args: 脚本参数
+            execute: 真实执行脚本的无参调用，返回记录迭代器（只在录制模式下调用）
+        
+        Yields:
+            记录字典
+        
+        Raises:
+            ScriptRunnerError: 脚本执行失败或录制的调用失败
+        """
+        key = self.script_key(script)
+        args = self.normalize_args(args)
+        
+        if self.mode == MODE_REPLAY:
+            entry = self._take('jxa', key, args)
+            start = time.monotonic()
+            for record, offset in zip(entry.get('records', []), entry.get('offsets', [])):
+                wait = offset * self.time_scale - (time.monotonic() - start)
+                if wait > 0:
+                    time.sleep(wait)
+                yield record
+            remaining = self._delay(entry) - (time.monotonic() - start)
+            if remaining > 0:
+                time.sleep(remaining)
+            self._raise_recorded(entry)
+            return
+        
+        records: List[Dict[str, Any]] = []
+        offsets: List[float] = []
+        error = None
+        start = time.monotonic()
+        try:
+            for record in execute():
+                records.append(record)
+                offsets.append(time.monotonic() - start)
+                yield record
+        except ScriptRunnerError as e:
+            error = self._error_entry(e)
+            raise
+        finally:
+            # 调用方提前停止读取时记录已读到的部分
+            entry = {'kind': 'jxa', 'script': key, 'args': args, 'latency': time.monotonic() - start,
+                     'records': records, 'offsets': offsets}
+            if error:
+                entry['error'] = error
+            self._write(entry)
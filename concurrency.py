@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应并发控制
+备忘录应用同时执行过多脚本时会明显变慢甚至超时，固定的并发数要么太保守要么过载。
+这里用AIMD（加性增、乘性减）策略：p95延迟低于目标时逐步提高并发上限，
+出现超时、错误或延迟超标时按比例降低
+"""
+
+import math
+import threading
+import logging
+from collections import deque
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    计算百分位数（最近邻法）
+    
+    Args:
+        values: 样本
+        fraction: 百分位，0~1
+    
+    Returns:
+        百分位数，没有样本时返回0
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD并发上限控制器，线程安全"""
+    
+    def __init__(self, initial_limit: int = 2, min_limit: int = 1, max_limit: int = 8,
+                 target_p95: float = 5.0, decrease_factor: float = 0.5, window: int = 50):
+        """
+        初始化控制器
+        
+        Args:
+            initial_limit: 初始并发上限
+            min_limit: 并发上限的下限
+            max_limit: 并发上限的上限
+            target_p95: 目标p95延迟（秒）
+            decrease_factor: 出现超时/错误/延迟超标时上限乘以的系数
+            window: 用于计算延迟分布的最近样本数
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.target_p95 = target_p95
+        self.decrease_factor = decrease_factor
+        self._limit = min(self.max_limit, max(self.min_limit, initial_limit))
+        self._latencies = deque(maxlen=window)
+        self._all_latencies: List[float] = []
+        self._since_change = 0
+        self._in_flight = 0
+        self._increases = 0
+        self._decreases = 0
+        self._failures = 0
+        self._cond = threading.Condition()
+    
+    @property
+    def limit(self) -> int:
+        """当前并发上限"""
+        return self._limit
+    
+    @property
+    def in_flight(self) -> int:
+        """当前通过 acquire 占用的并发数"""
+        return self._in_flight
+    
+    def acquire(self):
+        """阻塞直到并发数低于当前上限，然后占用一个名额"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._in_flight < self._limit)
+            self._in_flight += 1
+    
+    def release(self, latency: float, success: bool = True, timed_out: bool = False):
+        """
+        释放名额并记录本次调用结果
+        
+        Args:
+            latency: 调用耗时（秒）
+            success: 是否成功
+            timed_out: 是否超时
+        """
+        with self._cond:
+            self._in_flight -= 1
+        self.record(latency, success, timed_out)
+    
+    def record(self, latency: float, success: bool = True, timed_out: bool = False):
+        """
+        记录一次调用结果并调整并发上限
+        
+        Args:
+            latency: 调用耗时（秒）
+            success: 是否成功
+            timed_out: 是否超时
+        """
+        with self._cond:
+            self._all_latencies.append(latency)
+            if timed_out or not success:
+                self._failures += 1
+                self._decrease("超时" if timed_out else "执行失败")
+            else:
+                self._latencies.append(latency)
+                self._since_change += 1
+                # 每个上限值至少观察一轮（limit个样本）后再调整
+                if self._since_change >= self._limit:
+                    p95 = percentile(list(self._latencies), 0.95)
+                    if p95 > self.target_p95:
+                        self._decrease(f"p95延迟 {p95:.2f}s 超过目标")
+                    elif self._limit < self.max_limit:
+                        self._limit += 1
+                        self._increases += 1
+                        self._since_change = 0
+                        logger.debug(f"并发上限提高到 {self._limit}（p95 {p95:.2f}s）")
+            self._cond.notify_all()
+    
+    def _decrease(self, reason: str):
+        """乘性降低并发上限（调用方持有锁）"""
+        new_limit = max(self.min_limit, int(self._limit * self.decrease_factor))
+        if new_limit < self._limit:
+            self._decreases += 1
+            logger.info(f"⬇️ 并发上限从 {self._limit} 降到 {new_limit}: {reason}")
+        self._limit = new_limit
+        self._since_change = 0
+        # 旧上限下的延迟样本不再代表当前负载
+        self._latencies.clear()
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        获取当前状态，用于同步统计
+        
+        Returns:
+            包含当前上限、调整次数和延迟分布（秒）的字典
+        """
+        with self._cond:
+            latencies = list(self._all_latencies)
+            return {
+                'limit': self._limit,
+                'min_limit': self.min_limit,
+                'max_limit': self.max_limit,
+                'target_p95': self.target_p95,
+                'increases': self._increases,
+                'decreases': self._decreases,
+                'failures': self._failures,
+                'samples': len(latencies),
+                'latency_p50': percentile(latencies, 0.5),
+                'latency_p95': percentile(latencies, 0.95),
+                'latency_max': max(latencies) if latencies else 0.0
+            }
+    
+    def reset_stats(self):
+        """清空累计的统计（保留当前上限）"""
+        with self._cond:
+            self._all_latencies = []
+            self._increases = 0
+            self._decreases = 0
+            self._failures = 0
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON分帧的批量读取协议
+读取类脚本用JavaScript for Automation编写，每条记录输出一行JSON（NDJSON），
+Python侧逐行解析并以生成器返回，列出上万个备忘录或导出正文时内存占用保持有界，
+也不再依赖 "|||" 拼接字符串（标题或正文中出现分隔符时也能正确解析）。
+批量写入脚本同样逐条输出每个操作的结果记录
+"""
+
+import json
+import logging
+import time
+import subprocess
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+from osascript_pool import ScriptRunnerError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JXA_COMMAND = ['osascript', '-l', 'JavaScript']
+
+# 公共函数：输出一条记录、按路径定位文件夹、把备忘录转换为记录
+JXA_COMMON = r'''
+ObjC.import('Foundation');
+
+var stdout = $.NSFileHandle.fileHandleWithStandardOutput;
+
+function emit(record) {
+    stdout.writeData($(JSON.stringify(record) + "\n").dataUsingEncoding($.NSUTF8StringEncoding));
+}
+
+function splitPath(folderPath) {
+    return folderPath.split('/').map(function (part) { return part.trim(); })
+        .filter(function (part) { return part.length > 0; });
+}
+
+function resolveFolder(notesApp, accountName, folderPath) {
+    var container = notesApp.accounts.byName(accountName);
+    splitPath(folderPath).forEach(function (name) {
+        container = container.folders.byName(name);
+    });
+    return container;
+}
+
+function isoDate(value) {
+    return value ? value.toISOString() : null;
+}
+
+function runSafely(body) {
+    try {
+        body();
+    } catch (e) {
+        emit({type: 'error', message: String(e.message || e), code: e.errorNumber || null});
+    }
+}
+'''
+
+# argv: 账户, 是否递归（"true"/"false"）
+JXA_LIST_FOLDERS_SCRIPT = JXA_COMMON + r'''
+function walk(container, prefix, recursive) {
+    var names = container.folders.name();
+    for (var i = 0; i < names.length; i++) {
+        var path = prefix ? prefix + '/' + names[i] : names[i];
+        emit({type: 'folder', path: path, name: names[i]});
+        if (recursive) {
+            walk(container.folders.byName(names[i]), path, recursive);
+        }
+    }
+}
+
+function run(argv) {
+    runSafely(function () {
+        var notesApp = Application('Notes');
+        walk(notesApp.accounts.byName(argv[0]), '', argv[1] === 'true');
+    });
+}
+'''
+
+# argv: 账户
+JXA_COUNT_NOTES_SCRIPT = JXA_COMMON + r'''
+function walk(container, prefix) {
+    var folders = container.folders;
+    var names = folders.name();
+    for (var i = 0; i < names.length; i++) {
+        var folder = folders.byName(names[i]);
+        var path = prefix ? prefix + '/' + names[i] : names[i];
+        // 只发送计数事件，不读取标题
+        emit({type: 'folder', path: path, count: folder.notes.length});
+        walk(folder, path);
+    }
+}
+
+function run(argv) {
+    runSafely(function () {
+        walk(Application('Notes').accounts.byName(argv[0]), '');
+    });
+}
+'''
+
+# argv: 账户, 文件夹路径, 是否包含正文（"true"/"false"）
+JXA_LIST_NOTES_SCRIPT = JXA_COMMON + r'''
+function run(argv) {
+    runSafely(function () {
+        var notesApp = Application('Notes');
+        var folderPath = splitPath(argv[1]).join('/');
+        var notes = resolveFolder(notesApp, argv[0], folderPath).notes;
+        var includeBody = argv[2] === 'true';
+        
+        // 元数据按属性批量获取，每个属性只需一次Apple Event
+        var names = notes.name();
+        var ids = notes.id();
+        var created = notes.creationDate();
+        var modified = notes.modificationDate();
+        
+        for (var i = 0; i < names.length; i++) {
+            var record = {
+                type: 'note',
+                folder: folderPath,
+                name: names[i],
+                id: ids[i],
+                creation_date: isoDate(created[i]),
+                modification_date: isoDate(modified[i])
+            };
+            if (includeBody) {
+                // 正文逐个读取并立即输出，避免一次性持有全部正文
+                record.body = notes.byId(ids[i]).body();
+            }
+            emit(record);
+        }
+    });
+}
+'''
+
+# argv: 账户, 文件夹路径, 标题, 备忘录ID（可为空）
+JXA_NOTE_INFO_SCRIPT = JXA_COMMON + r'''
+function run(argv) {
+    runSafely(function () {
+        var notesApp = Application('Notes');
+        var folderPath = splitPath(argv[1]).join('/');
+        var note = null;
+        
+        if (argv[3]) {
+            try {
+                note = notesApp.notes.byId(argv[3]);
+                var parts = splitPath(folderPath);
+                if (parts.length > 0 && note.container().name() !== parts[parts.length - 1]) {
+                    note = null;
+                }
+            } catch (e) {
+                note = null;
+            }
+        }
+        if (note === null) {
+            var matches = resolveFolder(notesApp, argv[0], folderPath).notes.whose({name: argv[2]})();
+            if (matches.length === 0) {
+                throw new Error('备忘录不存在: ' + argv[2]);
+            }
+            note = matches[0];
+        }
+        
+        emit({
+            type: 'note',
+            folder: folderPath,
+            name: note.name(),
+            id: note.id(),
+            creation_date: isoDate(note.creationDate()),
+            modification_date: isoDate(note.modificationDate()),
+            body: note.body()
+        });
+    });
+}
+'''
+
+# argv: 批量操作文件路径（JSON: account, folder, create_folders, ops）
+# 同一文件夹下的多个创建/更新/upsert/追加/删除操作在一次调用中完成，每个操作输出一条结果记录
+JXA_APPLY_BATCH_SCRIPT = JXA_COMMON + r'''
+function readJson(path) {
+    var text = $.NSString.stringWithContentsOfFileEncodingError(path, $.NSUTF8StringEncoding, null);
+    return JSON.parse(ObjC.unwrap(text));
+}
+
+function ensureFolder(notesApp, accountName, folderPath, createMissing) {
+    var container = notesApp.accounts.byName(accountName);
+    splitPath(folderPath).forEach(function (name) {
+        var child = container.folders.byName(name);
+        if (!child.exists()) {
+            if (!createMissing) {
+                throw new Error('文件夹不存在: ' + name);
+            }
+            container.folders.push(notesApp.Folder({name: name}));
+        }
+        container = container.folders.byName(name);
+    });
+    return container;
+}
+
+function findNote(notesApp, container, op) {
+    if (op.note_id) {
+        try {
+            var byId = notesApp.notes.byId(op.note_id);
+            if (byId.exists() && byId.container().id() === container.id()) {
+                return byId;
+            }
+        } catch (e) {}
+    }
+    var claimed = op.claimed_ids || [];
+    var matches = container.notes.whose({name: op.title})();
+    for (var i = 0; i < matches.length; i++) {
+        if (claimed.indexOf(matches[i].id()) < 0) {
+            return matches[i];
+        }
+    }
+    return null;
+}
+
+function applyOp(notesApp, container, op) {
+    var note = op.action === 'create' ? null : findNote(notesApp, container, op);
+    
+    if (op.action === 'delete') {
+        if (note === null) throw new Error('备忘录不存在: ' + op.title);
+        notesApp.delete(note);
+        return {status: 'deleted', id: null};
+    }
+    if (op.action === 'append') {
+        if (note === null) throw new Error('备忘录不存在: ' + op.title);
+        note.body = note.body() + op.body;
+        return {status: 'appended', id: note.id()};
+    }
+    if (note === null) {
+        if (op.action === 'update') throw new Error('备忘录不存在: ' + op.title);
+        note = notesApp.Note({body: op.body});
+        container.notes.push(note);
+        return {status: 'created', id: note.id()};
+    }
+    note.body = op.body;
+    return {status: 'updated', id: note.id()};
+}
+
+function run(argv) {
+    runSafely(function () {
+        var notesApp = Application('Notes');
+        var batch = readJson(argv[0]);
+        var container = ensureFolder(notesApp, batch.account, batch.folder, batch.create_folders);
+        
+        batch.ops.forEach(function (op) {
+            try {
+                var outcome = applyOp(notesApp, container, op);
+                emit({type: 'result', index: op.index, status: outcome.status, id: outcome.id});
+            } catch (e) {
+                emit({type: 'result', index: op.index, status: 'error',
+                      message: String(e.message || e), code: e.errorNumber || null});
+            }
+        });
+    });
+}
+'''
+
+def stream_records(script: str, args: List[str] = None, command: List[str] = None,
+                   timeout: Optional[float] = None, timeout_per_mb: float = 0.0) -> Iterator[Dict[str, Any]]:
+    """
+    执行JXA脚本并逐条产出其输出的JSON记录
+    
+    Args:
+        script: JXA脚本源码
+        args: 传给 run(argv) 的参数
+        command: 解释器命令，默认 osascript -l JavaScript
+        timeout: 读取过程的基础超时秒数，None表示不限制
+        timeout_per_mb: 每读取1MB输出延长的超时秒数，导出正文等大量输出的读取按已读取的数据量放宽超时
+    
+    Yields:
+        记录字典
+    
+    Raises:
+        ScriptRunnerError: 脚本输出错误记录、进程异常退出或超时
+    """
+    cmd = list(command or DEFAULT_JXA_COMMAND) + ['-e', script] + [str(arg) for arg in (args or [])]
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding='utf-8'
+    )
+    
+    # stderr 在单独的线程中读取，脚本输出大量错误信息时不会因管道写满而卡住
+    stderr_chunks: List[str] = []
+    stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+    stderr_reader.start()
+    
+    timed_out = threading.Event()
+    finished = threading.Event()
+    deadline = [time.monotonic() + timeout] if timeout else None
+    
+    def watch():
+        while not finished.wait(max(0.0, min(1.0, deadline[0] - time.monotonic()))):
+            if time.monotonic() >= deadline[0]:
+                timed_out.set()
+                process.kill()
+                return
+    
+    if deadline:
+        threading.Thread(target=watch, daemon=True).start()
+    
+    try:
+        for line in process.stdout:
+            if deadline and timeout_per_mb:
+                deadline[0] += len(line) / (1024 * 1024) * timeout_per_mb
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.debug(f"忽略无法解析的输出行: {line[:200]}")
+                continue
+            
+            if record.get('type') == 'error':
+                raise ScriptRunnerError(record.get('message', '未知错误'), code=record.get('code'))
+            yield record
+        
+        returncode = process.wait()
+        stderr_reader.join()
+        stderr = "".join(stderr_chunks)
+        if timed_out.is_set():
+            raise ScriptRunnerError("读取脚本执行超时", timeout=True)
+        if returncode != 0:
+            raise ScriptRunnerError(stderr.strip() or f"读取脚本退出码 {returncode}")
+    finally:
+        finished.set()
+        if process.poll() is None:
+            # 调用方提前停止迭代时结束子进程
+            process.kill()
+            process.wait()
+        stderr_reader.join()
+        process.stdout.close()
+        process.stderr.close()
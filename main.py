@@ -6,12 +6,15 @@ MD文档同步工具主入口
 """
 
 import argparse
+import asyncio
+import time
 import sys
 from pathlib import Path
 import json
 from typing import List
 
 from sync_engine import MDSyncEngine
+from sync_plan import SyncPlan
 from rules import (
     UpdateExistingRule,
     CreateNewRule,
@@ -111,6 +114,8 @@ def sync_file_command(args):
         rules_config['modified_since_hours'] = args.modified_since
     
     engine = create_engine_with_rules(args.config, rules_config)
+    if args.force:
+        engine.reset_sync_manifest([args.file])
     
     print(f"🔄 开始同步文件: {Path(args.file).name}")
     success = engine.sync_file(args.file, dry_run=args.dry_run)
@@ -140,9 +145,15 @@ def sync_folder_command(args):
         rules_config['modified_since_hours'] = args.modified_since
     
     engine = create_engine_with_rules(args.config, rules_config)
+    if args.force:
+        pattern = Path(args.folder).rglob if args.recursive else Path(args.folder).glob
+        engine.reset_sync_manifest([str(path) for path in pattern("*.md")])
     
     print(f"📁 开始批量同步文件夹: {args.folder}")
-    stats = engine.sync_folder(args.folder, recursive=args.recursive, dry_run=args.dry_run)
+    if args.concurrent:
+        stats = asyncio.run(engine.async_sync_folder(args.folder, recursive=args.recursive, dry_run=args.dry_run))
+    else:
+        stats = engine.sync_folder(args.folder, recursive=args.recursive, dry_run=args.dry_run)
     
     if 'error' in stats:
         print(f"❌ 同步失败: {stats['error']}")
@@ -187,19 +198,102 @@ def sync_files_command(args):
         rules_config['modified_since_hours'] = args.modified_since
     
     engine = create_engine_with_rules(args.config, rules_config)
+    if args.force:
+        engine.reset_sync_manifest(files)
     
     print(f"📋 开始批量同步 {len(files)} 个文件")
-    stats = engine.sync_files(files, dry_run=args.dry_run)
+    if args.concurrent:
+        stats = asyncio.run(engine.async_sync_files(files, dry_run=args.dry_run))
+    else:
+        stats = engine.sync_files(files, dry_run=args.dry_run)
     
     print("✅ 批量同步完成")
     return True
 
+# 计划中各类变更的显示方式
+PLAN_ACTION_LABELS = {
+    'create': ("📝", "创建"),
+    'update': ("🔄", "更新"),
+    'delete': ("🗑️", "删除"),
+    'upsert': ("🔁", "创建或更新"),
+    'execute': ("⚙️", "直接执行规则"),
+    'skip': ("⏭️", "跳过")
+}
+
+def plan_command(args):
+    """生成同步计划命令"""
+    files = []
+    for path in args.paths:
+        path = Path(path)
+        if path.is_dir():
+            pattern = path.rglob if args.recursive else path.glob
+            files.extend(sorted(str(md_file) for md_file in pattern("*.md")))
+        elif path.exists():
+            files.append(str(path))
+        else:
+            print(f"❌ 路径不存在: {path}")
+            return False
+    
+    rules_config = {'sync_mode': args.mode, 'max_size_mb': args.max_size}
+    engine = create_engine_with_rules(args.config, rules_config)
+    
+    try:
+        plan = engine.build_sync_plan(files, options={'rules': rules_config})
+        plan.save(args.output)
+    finally:
+        engine.close()
+    
+    summary = plan.summary()
+    print(f"📋 同步计划: {summary['files']} 个文件")
+    print("   " + "  ".join(f"{label}: {summary.get(action, 0)}"
+                             for action, (_, label) in PLAN_ACTION_LABELS.items() if summary.get(action)))
+    for entry in plan.files:
+        if entry['status'] == 'missing':
+            print(f"   ❌ 文件不存在: {entry['source_path']}")
+        for change in entry['changes']:
+            if change['action'] == 'skip' and not args.verbose:
+                continue
+            icon, label = PLAN_ACTION_LABELS.get(change['action'], ("•", change['action']))
+            target = f"{change['title']} (文件夹: {change['folder']})" if change['title'] else \
+                Path(entry['source_path']).name
+            reason = f" [{change['reason']}]" if change.get('reason') else ""
+            print(f"   {icon} 会{label}: {target}{reason}")
+    
+    print(f"✅ 计划已保存到 {args.output}，使用 apply 命令执行")
+    return True
+
+def apply_command(args):
+    """执行同步计划命令"""
+    try:
+        plan = SyncPlan.load(args.plan)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ 读取计划失败: {e}")
+        return False
+    
+    engine = create_engine_with_rules(args.config, plan.options.get('rules'))
+    
+    try:
+        print(f"🚀 开始执行同步计划: {args.plan}（{len(plan.files)} 个文件）")
+        stats = engine.apply_sync_plan(plan)
+    finally:
+        engine.close()
+    
+    if 'error' in stats:
+        print(f"❌ 执行失败: {stats['error']}")
+        return False
+    
+    print(f"✅ 计划执行完成: 成功 {stats['success_count']}，失败 {stats['failure_count']}，"
+          f"跳过 {stats['skipped_count']}")
+    if stats['stale_count']:
+        print(f"⚠️ {stats['stale_count']} 个文件在规划后被修改，未执行，请重新生成计划")
+    return stats['failure_count'] == 0
+
 def info_command(args):
     """显示信息命令"""
     engine = create_engine_with_rules(args.config)
     
     print("📊 备忘录信息:")
-    info = engine.get_notes_info()
+    info = engine.get_notes_info(refresh=args.refresh)
     
     if 'error' in info:
         print(f"❌ 获取信息失败: {info['error']}")
@@ -208,6 +302,9 @@ def info_command(args):
     print(f"   账户: {info['account']}")
     print(f"   文件夹数: {info['total_folders']}")
     print(f"   备忘录总数: {info['total_notes']}")
+    if 'cached_at' in info:
+        age = int(time.time() - info['cached_at'])
+        print(f"   （{age} 秒前的缓存结果，使用 --refresh 重新统计）")
     print(f"   各文件夹备忘录数量:")
     
     for folder, count in info['folders'].items():
@@ -221,6 +318,21 @@ def info_command(args):
     
     return True
 
+def export_command(args):
+    """导出备忘录命令"""
+    engine = create_engine_with_rules(args.config)
+    
+    try:
+        count = engine.export_notes(args.output, args.folder)
+    except Exception as e:
+        print(f"❌ 导出失败: {e}")
+        return False
+    finally:
+        engine.close()
+    
+    print(f"✅ 已导出 {count} 个备忘录到 {args.output}")
+    return True
+
 def config_command(args):
     """配置命令"""
     config_path = args.config or "config.json"
@@ -284,7 +396,10 @@ def main():
   %(prog)s sync-file document.md                    # 同步单个文件
   %(prog)s sync-folder ~/Documents --recursive      # 递归同步文件夹
   %(prog)s sync-files file1.md file2.md            # 同步多个文件
+  %(prog)s plan ~/Documents -r -o plan.json        # 生成同步计划（不写入备忘录）
+  %(prog)s apply plan.json                          # 执行同步计划
   %(prog)s info                                     # 显示备忘录信息
+  %(prog)s export backup.jsonl -f Claude/MyProject  # 导出备忘录及正文
   %(prog)s config --init                           # 初始化配置文件
         """
     )
@@ -305,6 +420,7 @@ def main():
     file_parser.add_argument('--mode', choices=['update', 'create_only', 'force_create'], 
                            default='update', help='同步模式 (默认: update)')
     file_parser.add_argument('--max-size', type=float, metavar='MB', help='最大文件大小限制(MB)')
+    file_parser.add_argument('--force', action='store_true', help='忽略同步清单，即使没有变化也重新写入')
     
     # sync-folder 子命令
     folder_parser = subparsers.add_parser('sync-folder', help='同步文件夹')
@@ -316,6 +432,8 @@ def main():
     folder_parser.add_argument('--mode', choices=['update', 'create_only', 'force_create'], 
                              default='update', help='同步模式 (默认: update)')
     folder_parser.add_argument('--max-size', type=float, metavar='MB', help='最大文件大小限制(MB)')
+    folder_parser.add_argument('--concurrent', action='store_true', help='异步并发同步（读取转换与写入交错执行）')
+    folder_parser.add_argument('--force', action='store_true', help='忽略同步清单，即使没有变化也重新写入')
     
     # sync-files 子命令
     files_parser = subparsers.add_parser('sync-files', help='同步多个文件')
@@ -327,9 +445,30 @@ def main():
     files_parser.add_argument('--mode', choices=['update', 'create_only', 'force_create'], 
                             default='update', help='同步模式 (默认: update)')
     files_parser.add_argument('--max-size', type=float, metavar='MB', help='最大文件大小限制(MB)')
+    files_parser.add_argument('--concurrent', action='store_true', help='异步并发同步（读取转换与写入交错执行）')
+    files_parser.add_argument('--force', action='store_true', help='忽略同步清单，即使没有变化也重新写入')
+    
+    # plan 子命令
+    plan_parser = subparsers.add_parser('plan', help='生成同步计划（只读取本地状态和一次备忘录快照）')
+    plan_parser.add_argument('paths', nargs='+', help='要规划的MD文件或文件夹')
+    plan_parser.add_argument('-r', '--recursive', action='store_true', help='递归处理子目录')
+    plan_parser.add_argument('-o', '--output', default='plan.json', help='计划文件路径 (默认: plan.json)')
+    plan_parser.add_argument('--mode', choices=['update', 'create_only', 'force_create'],
+                             default='update', help='同步模式 (默认: update)')
+    plan_parser.add_argument('--max-size', type=float, metavar='MB', help='最大文件大小限制(MB)')
+    
+    # apply 子命令
+    apply_parser = subparsers.add_parser('apply', help='执行同步计划')
+    apply_parser.add_argument('plan', help='plan 命令生成的计划文件')
     
     # info 子命令
     info_parser = subparsers.add_parser('info', help='显示备忘录和规则信息')
+    info_parser.add_argument('--refresh', action='store_true', help='忽略缓存重新统计备忘录数量')
+    
+    # export 子命令
+    export_parser = subparsers.add_parser('export', help='导出备忘录（含正文）为JSON Lines文件')
+    export_parser.add_argument('output', help='输出文件路径')
+    export_parser.add_argument('-f', '--folder', help='要导出的文件夹 (默认: default_folder)')
     
     # config 子命令
     config_parser = subparsers.add_parser('config', help='配置管理')
@@ -360,8 +499,14 @@ def main():
             success = sync_folder_command(args)
         elif args.command == 'sync-files':
             success = sync_files_command(args)
+        elif args.command == 'plan':
+            success = plan_command(args)
+        elif args.command == 'apply':
+            success = apply_command(args)
         elif args.command == 'info':
             success = info_command(args)
+        elif args.command == 'export':
+            success = export_command(args)
         elif args.command == 'config':
             success = config_command(args)
         else:
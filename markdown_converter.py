@@ -8,6 +8,9 @@ Markdown到Apple备忘录格式转换器
 import re
 from typing import List
 
+# 转换输出格式变化时递增，同步清单中按旧版本转换的记录随之失效
+CONVERTER_VERSION = 1
+
 class MarkdownToNotesConverter:
     """Markdown到备忘录格式转换器"""
     
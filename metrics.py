@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+桥接操作的计数与延迟直方图
+按操作（exists、create、update、folder_check、list 等）统计调用次数、失败次数、
+正文字节数和耗时分布，用于找出同步时间花在哪里。嵌套操作（如 upsert 内部的
+folder_check）各自计时，耗时是包含子操作的墙钟时间
+"""
+
+import time
+import inspect
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+# 直方图各桶的上界（秒）
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+
+class _OperationStats:
+    """单个操作的累计统计（调用方持有锁）"""
+    
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.payload_bytes = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+    
+    def add(self, seconds: float, payload_bytes: int, failed: bool):
+        """累加一次调用"""
+        self.count += 1
+        self.errors += 1 if failed else 0
+        self.payload_bytes += payload_bytes
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+    
+    def quantile(self, fraction: float) -> float:
+        """由直方图估计分位数（取所在桶的上界，最后一桶取最大值）"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return min(LATENCY_BUCKETS[i], self.max_seconds) if i < len(LATENCY_BUCKETS) else self.max_seconds
+        return self.max_seconds
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为统计字典，直方图只包含非空的桶"""
+        labels = [f"<={bound:g}s" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]:g}s"]
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'payload_bytes': self.payload_bytes,
+            'total_seconds': self.total_seconds,
+            'mean_seconds': self.total_seconds / self.count if self.count else 0.0,
+            'p50_seconds': self.quantile(0.5),
+            'p95_seconds': self.quantile(0.95),
+            'max_seconds': self.max_seconds,
+            'histogram': {label: count for label, count in zip(labels, self.buckets) if count}
+        }
+
+class OperationMetrics:
+    """按操作名累计的计数器和延迟直方图，线程安全"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ops: Dict[str, _OperationStats] = {}
+    
+    def record(self, name: str, seconds: float, payload_bytes: int = 0, failed: bool = False):
+        """
+        记录一次操作
+        
+        Args:
+            name: 操作名
+            seconds: 耗时（秒）
+            payload_bytes: 传递的正文字节数
+            failed: 是否失败
+        """
+        with self._lock:
+            stats = self._ops.get(name)
+            if stats is None:
+                stats = self._ops[name] = _OperationStats()
+            stats.add(seconds, payload_bytes, failed)
+    
+    @contextmanager
+    def track(self, name: str, payload_bytes: int = 0):
+        """
+        计时一段代码，抛出异常时记为失败
+        
+        Args:
+            name: 操作名
+            payload_bytes: 传递的正文字节数
+        """
+        start = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self.record(name, time.perf_counter() - start, payload_bytes, failed)
+    
+    def snapshot(self, wall_seconds: float = None) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各操作的统计
+        
+        Args:
+            wall_seconds: 本次同步的总耗时，提供时每个操作附带 wall_share（耗时占比）
+        
+        Returns:
+            操作名到统计字典的映射，按总耗时降序
+        """
+        with self._lock:
+            result = {name: stats.to_dict() for name, stats in self._ops.items()}
+        if wall_seconds:
+            for stats in result.values():
+                stats['wall_share'] = stats['total_seconds'] / wall_seconds
+        return dict(sorted(result.items(), key=lambda item: item[1]['total_seconds'], reverse=True))
+    
+    def reset(self):
+        """清空统计"""
+        with self._lock:
+            self._ops = {}
+
+def _payload_size(value: Any) -> int:
+    """正文参数的字节数，操作列表按各操作正文累加"""
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    if isinstance(value, list):
+        return sum(len(op.get('content', '').encode('utf-8')) for op in value if isinstance(op, dict))
+    return 0
+
+def timed_operation(name: str, payload: Optional[str] = None, check_result: bool = False) -> Callable:
+    """
+    方法装饰器：调用对象的 metrics 属性不为None时记录该方法的耗时
+    
+    Args:
+        name: 操作名
+        payload: 作为正文统计字节数的参数名（str 或 apply_batch 格式的操作列表）
+        check_result: 返回False或None时是否记为失败（写入类操作）
+    
+    Returns:
+        装饰器，支持普通方法、生成器方法（计时到遍历结束）和协程方法
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+        params: List[str] = list(signature.parameters)
+        payload_index = params.index(payload) if payload in params else None
+        
+        def payload_bytes(args: tuple, kwargs: Dict[str, Any]) -> int:
+            if payload_index is None:
+                return 0
+            if payload in kwargs:
+                return _payload_size(kwargs[payload])
+            return _payload_size(args[payload_index]) if len(args) > payload_index else 0
+        
+        def failed(result: Any) -> bool:
+            return check_result and (result is False or result is None)
+        
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(self, *args, **kwargs):
+                metrics = getattr(self, 'metrics', None)
+                if metrics is None:
+                    yield from func(self, *args, **kwargs)
+                    return
+                start = time.perf_counter()
+                error = True
+                try:
+                    yield from func(self, *args, **kwargs)
+                    error = False
+                except GeneratorExit:
+                    # 调用方提前停止遍历不算失败
+                    error = False
+                    raise
+                finally:
+                    metrics.record(name, time.perf_counter() - start,
+                                   payload_bytes((self,) + args, kwargs), error)
+            return generator_wrapper
+        
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(self, *args, **kwargs):
+                metrics = getattr(self, 'metrics', None)
+                if metrics is None:
+                    return await func(self, *args, **kwargs)
+                start = time.perf_counter()
+                result, error = None, True
+                try:
+                    result = await func(self, *args, **kwargs)
+                    error = False
+                    return result
+                finally:
+                    metrics.record(name, time.perf_counter() - start,
+                                   payload_bytes((self,) + args, kwargs), error or failed(result))
+            return async_wrapper
+        
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            metrics = getattr(self, 'metrics', None)
+            if metrics is None:
+                return func(self, *args, **kwargs)
+            start = time.perf_counter()
+            result, error = None, True
+            try:
+                result = func(self, *args, **kwargs)
+                error = False
+                return result
+            finally:
+                metrics.record(name, time.perf_counter() - start,
+                               payload_bytes((self,) + args, kwargs), error or failed(result))
+        return wrapper
+    return decorator
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+只追加内容的增量更新
+日志、变更记录这类文档只会在末尾增长，每次都整体改写正文的开销与文档大小成正比。
+这里在清单中记录最后写入的正文摘要和长度，新正文的前缀与之完全相同时只发送新增的尾部，
+用追加操作写入；前缀有变化（或追加失败）时退回整体改写
+"""
+
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional, Set
+
+from note_manifest import NoteManifest
+from notes_index import normalize_folder_path
+
+logger = logging.getLogger(__name__)
+
+def body_hash(content: str) -> str:
+    """正文摘要"""
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+class DeltaPlanner:
+    """把只在末尾增长的正文的写入操作改为追加操作"""
+    
+    def __init__(self, manifest: NoteManifest, min_prefix_chars: int = 0):
+        """
+        初始化增量规划器
+        
+        Args:
+            manifest: 备忘录清单，记录最后写入的正文摘要和长度
+            min_prefix_chars: 已写入的正文至少有多少字符时才改为追加，较短的正文直接整体改写
+        """
+        self.manifest = manifest
+        self.min_prefix_chars = min_prefix_chars
+        # 已规划追加、尚未提交结果的源文件，同一批次再次出现时整体改写
+        self._pending: Set[str] = set()
+        # 流水线的转换线程会并发调用 plan/commit
+        self._lock = threading.Lock()
+    
+    def plan(self, op: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        为写入操作附加正文摘要，新正文是上次正文的严格扩展时改为追加操作
+        
+        Args:
+            op: apply_batch 格式的操作
+        
+        Returns:
+            待执行的操作。追加操作的 content 只包含新增的尾部，fallback 为整体改写的原操作；
+            写入类操作带有 delta 字段，执行后需要把结果交给 commit 记录
+        """
+        source_path = op.get('source_path')
+        content = op.get('content', '')
+        if op.get('action') not in ('create', 'update', 'upsert') or not source_path or op.get('part'):
+            return op
+        
+        op = dict(op, delta={'source_path': source_path, 'hash': body_hash(content), 'length': len(content)})
+        if op['action'] == 'create':
+            return op
+        
+        record = self.manifest.get(source_path)
+        if not record or not record.get('body_hash') or not record.get('note_id'):
+            return op
+        
+        length = record['body_length'] or 0
+        folder = normalize_folder_path(op.get('folder') or "")
+        if (length < self.min_prefix_chars or len(content) <= length
+                or record['title'] != op.get('title') or (folder and record['folder'] != folder)):
+            return op
+        if body_hash(content[:length]) != record['body_hash']:
+            return op
+        
+        with self._lock:
+            if source_path in self._pending:
+                return op
+            self._pending.add(source_path)
+        tail = content[length:]
+        logger.info(f"➕ 只追加新增内容: {op.get('title')}（{len(tail)}/{len(content)} 字符）")
+        return dict(op, action='append', content=tail, fallback=op)
+    
+    @staticmethod
+    def fallback(op: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        追加失败时改为执行的整体改写操作
+        
+        Args:
+            op: plan 返回的操作
+        
+        Returns:
+            整体改写的操作，不是追加操作时返回None
+        """
+        return op.get('fallback') if op.get('action') == 'append' else None
+    
+    def commit(self, op: Dict[str, Any], result: Dict[str, Any]):
+        """
+        写入成功后记录正文摘要和长度
+        
+        Args:
+            op: plan 返回的操作
+            result: apply_batch 格式的执行结果
+        """
+        delta = op.get('delta')
+        if delta is None:
+            return
+        with self._lock:
+            self._pending.discard(delta['source_path'])
+        if not result.get('success'):
+            return
+        self.manifest.record_body(delta['source_path'], delta['hash'], delta['length'])
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地备忘录清单
+以源文件路径为键记录备忘录在备忘录应用中的ID，使后续更新、删除可以按ID直接定位，
+同名文件也不会互相覆盖
+"""
+
+import sqlite3
+import threading
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+class NoteManifest:
+    """基于SQLite的备忘录清单"""
+    
+    def __init__(self, db_path: Union[str, Path]):
+        """
+        初始化清单
+        
+        Args:
+            db_path: SQLite文件路径，使用 ":memory:" 表示仅保存在内存中
+        """
+        self.db_path = str(db_path)
+        if self.db_path != ":memory:":
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._create_schema()
+    
+    def _create_schema(self):
+        """创建数据表"""
+        with self._lock, self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS notes (
+                    source_path TEXT PRIMARY KEY,
+                    note_id TEXT,
+                    title TEXT NOT NULL,
+                    folder TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            ''')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_notes_folder_title ON notes (folder, title)'
+            )
+            # 旧版本清单没有最后写入正文的摘要和长度
+            columns = {row['name'] for row in self._conn.execute('PRAGMA table_info(notes)')}
+            if 'body_hash' not in columns:
+                self._conn.execute('ALTER TABLE notes ADD COLUMN body_hash TEXT')
+            if 'body_length' not in columns:
+                self._conn.execute('ALTER TABLE notes ADD COLUMN body_length INTEGER')
+            # 超大文件拆分后各部分的标题与内容摘要
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS note_parts (
+                    source_path TEXT NOT NULL,
+                    part_index INTEGER NOT NULL,
+                    title TEXT NOT NULL,
+                    folder TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (source_path, part_index)
+                )
+            ''')
+    
+    def get(self, source_path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+        """
+        获取源文件对应的清单记录
+        
+        Args:
+            source_path: 源文件路径
+        
+        Returns:
+            记录字典，不存在返回None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT * FROM notes WHERE source_path = ?',
+                (self._key(source_path),)
+            ).fetchone()
+        return dict(row) if row else None
+    
+    def get_note_id(self, source_path: Union[str, Path]) -> Optional[str]:
+        """获取源文件对应的备忘录ID"""
+        record = self.get(source_path)
+        return record.get('note_id') if record else None
+    
+    def claimed_ids(self, folder: str, title: str,
+                    exclude_source: Union[str, Path] = None) -> List[str]:
+        """
+        获取同一文件夹下同名备忘录中已被其他源文件占用的ID
+        
+        Args:
+            folder: 文件夹路径
+            title: 备忘录标题
+            exclude_source: 排除的源文件路径（通常是当前文件）
+        
+        Returns:
+            备忘录ID列表
+        """
+        exclude_key = self._key(exclude_source) if exclude_source else ''
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT note_id FROM notes WHERE folder = ? AND title = ? '
+                'AND source_path != ? AND note_id IS NOT NULL',
+                (folder, title, exclude_key)
+            ).fetchall()
+        return [row['note_id'] for row in rows]
+    
+    def record(self, source_path: Union[str, Path], note_id: Optional[str],
+               title: str, folder: str):
+        """
+        记录或更新源文件与备忘录的对应关系
+        
+        Args:
+            source_path: 源文件路径
+            note_id: 备忘录ID
+            title: 备忘录标题
+            folder: 文件夹路径
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT INTO notes (source_path, note_id, title, folder, updated_at) '
+                'VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(source_path) DO UPDATE SET '
+                # 每次写入后正文摘要失效，由写入方通过 record_body 重新记录
+                'body_hash = NULL, body_length = NULL, '
+                'note_id = excluded.note_id, title = excluded.title, '
+                'folder = excluded.folder, updated_at = excluded.updated_at',
+                (self._key(source_path), note_id, title, folder, datetime.now().isoformat())
+            )
+    
+    def record_body(self, source_path: Union[str, Path], body_hash: str, body_length: int):
+        """
+        记录最后一次写入备忘录的正文摘要和长度，用于判断新正文是否只在末尾追加了内容
+        
+        Args:
+            source_path: 源文件路径（须已有清单记录）
+            body_hash: 正文摘要
+            body_length: 正文字符数
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE notes SET body_hash = ?, body_length = ? WHERE source_path = ?',
+                (body_hash, body_length, self._key(source_path))
+            )
+    
+    def remove(self, source_path: Union[str, Path]):
+        """删除源文件对应的清单记录"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'DELETE FROM notes WHERE source_path = ?',
+                (self._key(source_path),)
+            )
+    
+    def get_parts(self, source_path: Union[str, Path]) -> Dict[int, Dict[str, Any]]:
+        """
+        获取源文件拆分后各部分的记录
+        
+        Args:
+            source_path: 源文件路径
+        
+        Returns:
+            部分序号（从1开始）到记录字典（title、folder、content_hash）的映射，未拆分过返回空字典
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT part_index, title, folder, content_hash FROM note_parts WHERE source_path = ?',
+                (self._key(source_path),)
+            ).fetchall()
+        return {row['part_index']: dict(row) for row in rows}
+    
+    def record_part(self, source_path: Union[str, Path], index: int, title: str,
+                    folder: str, content_hash: str):
+        """
+        记录拆分后某一部分的标题与内容摘要
+        
+        Args:
+            source_path: 源文件路径
+            index: 部分序号，从1开始
+            title: 该部分的备忘录标题
+            folder: 文件夹路径
+            content_hash: 该部分正文的摘要
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT INTO note_parts (source_path, part_index, title, folder, content_hash, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(source_path, part_index) DO UPDATE SET '
+                'title = excluded.title, folder = excluded.folder, '
+                'content_hash = excluded.content_hash, updated_at = excluded.updated_at',
+                (self._key(source_path), index, title, folder, content_hash, datetime.now().isoformat())
+            )
+    
+    def remove_part(self, source_path: Union[str, Path], index: int):
+        """删除拆分后某一部分的记录"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'DELETE FROM note_parts WHERE source_path = ? AND part_index = ?',
+                (self._key(source_path), index)
+            )
+    
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+    
+    def _key(self, source_path: Union[str, Path]) -> str:
+        """统一源文件路径格式作为主键"""
+        return str(Path(source_path).expanduser().absolute())
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+超大备忘录拆分
+几MB的Markdown整体写入一条备忘录时写入慢、手机上打开也慢。这里在标题边界处把
+正文切成不超过大小预算的若干部分，分别写入 "标题 (1/N)" 形式的备忘录；
+每个部分的内容摘要记录在清单中，重新同步时只改写内容变化的部分
+"""
+
+import re
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from note_manifest import NoteManifest
+
+logger = logging.getLogger(__name__)
+
+# 行首的Markdown标题，或转换器输出的标题标记（【】、■、▶）
+HEADING_PATTERN = re.compile(r'^(#{1,6}\s|【|■ |▶ )')
+
+# 部分标题行与正文之间预留的字节数
+_HEADER_RESERVE = 64
+
+def _size(text: str) -> int:
+    """文本的UTF-8字节数"""
+    return len(text.encode('utf-8'))
+
+def _hard_split(line: str, max_bytes: int) -> List[str]:
+    """把超出预算的单行按字符切开"""
+    pieces = []
+    current = []
+    current_bytes = 0
+    for char in line:
+        char_bytes = _size(char)
+        if current and current_bytes + char_bytes > max_bytes:
+            pieces.append("".join(current))
+            current, current_bytes = [], 0
+        current.append(char)
+        current_bytes += char_bytes
+    if current:
+        pieces.append("".join(current))
+    return pieces
+
+def _section_units(lines: List[str], max_bytes: int, separator: str) -> List[str]:
+    """把一个章节切成不超过预算的片段，优先保持整章，其次按行，最后按字符"""
+    text = separator.join(lines)
+    if _size(text) <= max_bytes:
+        return [text]
+    
+    units = []
+    buffer: List[str] = []
+    buffer_bytes = 0
+    separator_bytes = _size(separator)
+    for line in lines:
+        line_bytes = _size(line)
+        if line_bytes > max_bytes:
+            if buffer:
+                units.append(separator.join(buffer))
+                buffer, buffer_bytes = [], 0
+            units.extend(_hard_split(line, max_bytes))
+            continue
+        extra = line_bytes + (separator_bytes if buffer else 0)
+        if buffer and buffer_bytes + extra > max_bytes:
+            units.append(separator.join(buffer))
+            buffer, buffer_bytes, extra = [], 0, line_bytes
+        buffer.append(line)
+        buffer_bytes += extra
+    if buffer:
+        units.append(separator.join(buffer))
+    return units
+
+def split_content(content: str, max_bytes: int, separator: str = None) -> List[str]:
+    """
+    在标题边界处把正文切成不超过预算的若干部分
+    
+    Args:
+        content: 备忘录正文（Markdown或转换后的<br>分行文本）
+        max_bytes: 每部分的最大UTF-8字节数
+        separator: 行分隔符，默认正文含 <br> 时用 <br>，否则用换行
+    
+    Returns:
+        各部分正文，未超出预算时只有一项
+    """
+    if _size(content) <= max_bytes:
+        return [content]
+    
+    separator = separator or ('<br>' if '<br>' in content else '\n')
+    separator_bytes = _size(separator)
+    
+    # 按标题把行分成章节
+    sections: List[List[str]] = []
+    current: List[str] = []
+    for line in content.split(separator):
+        if current and HEADING_PATTERN.match(line):
+            sections.append(current)
+            current = []
+        current.append(line)
+    sections.append(current)
+    
+    # 贪心地把章节片段装入各部分，新部分尽量从标题处开始
+    parts = []
+    part: List[str] = []
+    part_bytes = 0
+    for section in sections:
+        for unit in _section_units(section, max_bytes, separator):
+            unit_bytes = _size(unit)
+            if part and part_bytes + separator_bytes + unit_bytes > max_bytes:
+                parts.append(separator.join(part))
+                part, part_bytes = [], 0
+            part_bytes += unit_bytes + (separator_bytes if part else 0)
+            part.append(unit)
+    if part:
+        parts.append(separator.join(part))
+    return parts
+
+def part_title(title: str, index: int, count: int) -> str:
+    """第index部分（从1开始）的备忘录标题"""
+    return f"{title} ({index}/{count})"
+
+def part_source_key(source_path: str, index: int) -> str:
+    """第index部分在清单中使用的源路径键"""
+    return f"{source_path}#part{index}"
+
+class NoteSplitter:
+    """把写入操作中的超大正文拆分为多条备忘录，并跳过内容未变化的部分"""
+    
+    def __init__(self, max_part_bytes: int = 100000, manifest: Optional[NoteManifest] = None):
+        """
+        初始化拆分器
+        
+        Args:
+            max_part_bytes: 单条备忘录正文的最大UTF-8字节数
+            manifest: 备忘录清单，用于记录各部分的内容摘要；None时每次改写全部部分
+        """
+        self.max_part_bytes = max_part_bytes
+        self.manifest = manifest
+    
+    def needs_split(self, content_bytes: int, source_path: str = None) -> bool:
+        """
+        判断是否需要经过拆分流程：正文超出预算，或该源文件之前被拆分过（需要清理旧部分）
+        
+        Args:
+            content_bytes: 转换后写入备忘录的正文字节数
+            source_path: 源文件路径
+        
+        Returns:
+            需要时返回True
+        """
+        if content_bytes > self.max_part_bytes:
+            return True
+        return bool(self.manifest is not None and source_path and self.manifest.get_parts(source_path))
+    
+    def plan(self, op: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        把一个写入操作展开为分部分的操作
+        
+        Args:
+            op: apply_batch 格式的操作
+        
+        Returns:
+            (待执行的操作列表, 是否全部部分都未变化) 元组。拆分后的操作带有 part 字段，
+            执行后需要把结果交给 commit 记录；清理旧备忘录的删除操作带有 cleanup 标记
+        """
+        action = op.get('action')
+        content = op.get('content', '')
+        source_path = op.get('source_path')
+        tracked = self.manifest is not None and source_path and action == 'upsert'
+        stored = self.manifest.get_parts(source_path) if tracked else {}
+        
+        if action not in ('create', 'upsert') or _size(content) <= self.max_part_bytes:
+            # 之前拆分过、现在不再超限时删除旧的各部分
+            return self._delete_parts(op, stored, 1) + [op], False
+        
+        separator = '<br>' if '<br>' in content else '\n'
+        title = op['title']
+        folder = op.get('folder') or ""
+        chunks = split_content(content, max(1, self.max_part_bytes - _size(title) - _HEADER_RESERVE), separator)
+        count = len(chunks)
+        
+        ops = []
+        if tracked and not stored:
+            # 之前作为单条备忘录同步过，拆分后删除原备忘录
+            record = self.manifest.get(source_path)
+            if record is not None:
+                ops.append({
+                    'action': 'delete',
+                    'title': record['title'],
+                    'folder': record['folder'],
+                    'source_path': source_path,
+                    'cleanup': True
+                })
+        
+        changed = False
+        for index, chunk in enumerate(chunks, start=1):
+            title_i = part_title(title, index, count)
+            # 备忘录以正文首行作为标题，每部分都以部分标题开头
+            body = f"{title_i}{separator}{separator}{chunk}"
+            digest = hashlib.sha1(f"{folder}\0{body}".encode('utf-8')).hexdigest()
+            previous = stored.get(index)
+            if previous and previous['title'] == title_i and previous['content_hash'] == digest:
+                continue
+            
+            changed = True
+            part_op = dict(op, title=title_i, content=body)
+            if source_path:
+                part_op['source_path'] = part_source_key(source_path, index)
+            if tracked:
+                part_op['part'] = {'source_path': source_path, 'index': index, 'title': title_i,
+                                   'folder': folder, 'content_hash': digest}
+            ops.append(part_op)
+        
+        ops.extend(self._delete_parts(op, stored, count + 1))
+        if not changed:
+            logger.info(f"⏭️ 各部分内容未变化: {title}")
+        else:
+            logger.info(f"✂️ 拆分为 {count} 部分: {title}")
+        return ops, not changed
+    
+    def commit(self, op: Dict[str, Any], result: Dict[str, Any]):
+        """
+        记录拆分操作的执行结果
+        
+        Args:
+            op: plan 返回的操作
+            result: apply_batch 格式的执行结果
+        """
+        part = op.get('part')
+        if part is None or self.manifest is None or not result.get('success'):
+            return
+        
+        if op['action'] == 'delete':
+            self.manifest.remove_part(part['source_path'], part['index'])
+        else:
+            self.manifest.record_part(part['source_path'], part['index'], part['title'],
+                                      part['folder'], part['content_hash'])
+    
+    @staticmethod
+    def _delete_parts(op: Dict[str, Any], stored: Dict[int, Dict[str, Any]],
+                      first_index: int) -> List[Dict[str, Any]]:
+        """生成删除第first_index部分及之后旧部分的操作"""
+        source_path = op.get('source_path')
+        return [{
+            'action': 'delete',
+            'title': previous['title'],
+            'folder': previous['folder'],
+            'source_path': part_source_key(source_path, index),
+            'part': {'source_path': source_path, 'index': index},
+            'cleanup': True
+        } for index, previous in sorted(stored.items()) if index >= first_index]
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+备忘录后端接口
+同步引擎和规则只依赖这里定义的接口，AppleScriptBridge 对接真实的备忘录应用，
+其他实现（如本地SQLite文件）可以在没有Mac的环境中用于基准测试、CI和大规模同步实验
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional
+
+from notes_index import NotesIndex
+
+class NotesBackend(ABC):
+    """备忘录后端抽象基类"""
+    
+    def __init__(self, account: str = "iCloud", default_folder: str = "Notes"):
+        """
+        初始化后端
+        
+        Args:
+            account: 备忘录账户名
+            default_folder: 默认文件夹路径
+        """
+        self.account = account
+        self.default_folder = default_folder
+        # 批量同步期间加载的快照索引，None表示未加载
+        self.snapshot_index: Optional[NotesIndex] = None
+    
+    def close(self):
+        """释放后端持有的资源"""
+        pass
+    
+    @abstractmethod
+    def note_exists(self, title: str, folder: str = None) -> bool:
+        """
+        检查备忘录是否存在
+        
+        Args:
+            title: 备忘录标题
+            folder: 文件夹路径，默认使用default_folder
+        
+        Returns:
+            存在返回True，否则返回False
+        """
+        pass
+    
+    @abstractmethod
+    def create_note(self, title: str, content: str, folder: str = None,
+                    source_path: str = None) -> bool:
+        """
+        在已存在的文件夹中创建新备忘录
+        
+        Args:
+            title: 备忘录标题
+            content: 备忘录内容
+            folder: 文件夹路径，默认使用default_folder
+            source_path: 源文件路径，用于记录备忘录ID
+        
+        Returns:
+            创建成功返回True，否则返回False
+        """
+        pass
+    
+    @abstractmethod
+    def update_note(self, title: str, content: str, folder: str = None,
+                    source_path: str = None) -> bool:
+        """
+        更新已存在的备忘录
+        
+        Args:
+            title: 备忘录标题
+            content: 新的备忘录内容
+            folder: 文件夹路径，默认使用default_folder
+            source_path: 源文件路径，记录过ID时按ID定位
+        
+        Returns:
+            更新成功返回True，否则返回False
+        """
+        pass
+    
+    @abstractmethod
+    def delete_note(self, title: str, folder: str = None, source_path: str = None) -> bool:
+        """
+        删除备忘录
+        
+        Args:
+            title: 备忘录标题
+            folder: 文件夹路径，默认使用default_folder
+            source_path: 源文件路径，记录过ID时按ID定位
+        
+        Returns:
+            删除成功返回True，否则返回False
+        """
+        pass
+    
+    @abstractmethod
+    def get_folders(self) -> List[str]:
+        """
+        获取全部文件夹路径（包含嵌套文件夹，如 "Claude/ProjectName"）
+        
+        Returns:
+            文件夹路径列表
+        """
+        pass
+    
+    @abstractmethod
+    def create_folder(self, folder_path: str) -> bool:
+        """
+        确保文件夹存在，逐级创建缺失的文件夹
+        
+        Args:
+            folder_path: "/" 分隔的文件夹路径
+        
+        Returns:
+            文件夹存在或创建成功返回True，否则返回False
+        """
+        pass
+    
+    @abstractmethod
+    def get_existing_notes(self, folder: str = None) -> List[str]:
+        """
+        获取文件夹中的备忘录标题列表
+        
+        Args:
+            folder: 文件夹路径，默认使用default_folder
+        
+        Returns:
+            备忘录标题列表
+        """
+        pass
+    
+    @abstractmethod
+    def get_note_info(self, title: str, folder: str = None,
+                      source_path: str = None) -> Optional[Dict[str, Any]]:
+        """
+        获取备忘录详细信息
+        
+        Args:
+            title: 备忘录标题
+            folder: 文件夹路径，默认使用default_folder
+            source_path: 源文件路径，记录过ID时按ID定位
+        
+        Returns:
+            包含 creation_date、modification_date、id、body、title 的字典，不存在返回None
+        """
+        pass
+    
+    def get_note_metadata(self, title: str, folder: str = None,
+                          source_path: str = None) -> Optional[Dict[str, Any]]:
+        """
+        获取备忘录元数据（不含正文），默认实现基于 get_note_info
+        
+        Args:
+            title: 备忘录标题
+            folder: 文件夹路径，默认使用default_folder
+            source_path: 源文件路径，记录过ID时按ID定位
+        
+        Returns:
+            包含 creation_date、modification_date、id、title 的字典，不存在返回None
+        """
+        info = self.get_note_info(title, folder, source_path=source_path)
+        if info is None:
+            return None
+        info.pop('body', None)
+        return info
+    
+    def count_notes_by_folder(self) -> Optional[Dict[str, int]]:
+        """
+        统计每个文件夹（含嵌套文件夹）中的备忘录数量，默认实现逐个文件夹列出标题，
+        支持聚合查询的后端应覆盖此方法
+        
+        Returns:
+            文件夹路径到备忘录数量的映射，失败返回None
+        """
+        return {folder: len(self.get_existing_notes(folder)) for folder in self.get_folders()}
+    
+    def append_note(self, title: str, content: str, folder: str = None,
+                    source_path: str = None) -> bool:
+        """
+        在已存在的备忘录正文末尾追加内容，默认实现读取正文后整体改写
+        
+        Args:
+            title: 备忘录标题
+            content: 追加的内容
+            folder: 文件夹路径，默认使用default_folder
+            source_path: 源文件路径，记录过ID时按ID定位
+        
+        Returns:
+            追加成功返回True，否则返回False
+        """
+        info = self.get_note_info(title, folder, source_path=source_path)
+        if info is None:
+            return False
+        return self.update_note(title, info.get('body', '') + content, folder, source_path=source_path)
+    
+    def upsert_note(self, title: str, content: str, folder: str = None,
+                    create_folders: bool = True, source_path: str = None) -> Optional[str]:
+        """
+        存在则更新，不存在则创建
+        
+        Args:
+            title: 备忘录标题
+            content: 备忘录内容
+            folder: 文件夹路径，默认使用default_folder
+            create_folders: 文件夹不存在时是否创建
+            source_path: 源文件路径
+        
+        Returns:
+            "created" 或 "updated"，失败返回None
+        """
+        folder = folder or self.default_folder
+        if create_folders and not self.create_folder(folder):
+            return None
+        
+        if self.note_exists(title, folder):
+            return "updated" if self.update_note(title, content, folder, source_path=source_path) else None
+        return "created" if self.create_note(title, content, folder, source_path=source_path) else None
+    
+    def apply_batch(self, ops: List[Dict[str, Any]], max_batch_size: int = None,
+                    max_batch_bytes: int = None) -> List[Dict[str, Any]]:
+        """
+        批量执行创建/更新/upsert/追加/删除操作，默认实现逐个执行
+        
+        Args:
+            ops: 操作列表，格式见 AppleScriptBridge.apply_batch
+            max_batch_size: 单次调用的最大操作数（默认实现忽略）
+            max_batch_bytes: 单次调用的最大正文字节数（默认实现忽略）
+        
+        Returns:
+            与ops一一对应的结果列表
+        """
+        return self.apply_each(ops)
+    
+    def apply_each(self, ops: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        逐个调用 upsert_note、create_note 等单项操作执行操作列表。
+        只有少量操作时（如同步单个文件）比批量脚本省去启动和编译整个批量脚本的开销
+        
+        Args:
+            ops: 操作列表，格式见 AppleScriptBridge.apply_batch
+        
+        Returns:
+            与ops一一对应的结果列表
+        """
+        results = []
+        for op in ops:
+            action = op.get('action')
+            title = op.get('title')
+            folder = op.get('folder') or self.default_folder
+            content = op.get('content', '')
+            source_path = op.get('source_path')
+            
+            if action == "upsert":
+                status = self.upsert_note(title, content, folder,
+                                          create_folders=op.get('create_folders', True),
+                                          source_path=source_path)
+            elif action == "create":
+                ok = (not op.get('create_folders', True) or self.create_folder(folder)) and \
+                    self.create_note(title, content, folder, source_path=source_path)
+                status = "created" if ok else None
+            elif action == "update":
+                status = "updated" if self.update_note(title, content, folder, source_path=source_path) else None
+            elif action == "append":
+                status = "appended" if self.append_note(title, content, folder, source_path=source_path) else None
+            elif action == "delete":
+                status = "deleted" if self.delete_note(title, folder, source_path=source_path) else None
+            else:
+                results.append(self._batch_result("error", error=f"不支持的操作: {action}"))
+                continue
+            
+            results.append(self._batch_result(status or "error", error=None if status else "操作失败"))
+        return results
+    
+    def iter_notes(self, folder: str = None, include_body: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        遍历文件夹中的备忘录，默认实现基于 get_existing_notes 与 get_note_info
+        
+        Args:
+            folder: 文件夹路径，默认使用default_folder
+            include_body: 是否包含正文
+        
+        Yields:
+            备忘录记录，包含 folder、name、id、creation_date、modification_date，
+            include_body 时还包含 body
+        """
+        folder = folder or self.default_folder
+        for title in self.get_existing_notes(folder):
+            info = self.get_note_info(title, folder) or {}
+            record = {
+                'folder': folder,
+                'name': title,
+                'id': info.get('id'),
+                'creation_date': info.get('creation_date'),
+                'modification_date': info.get('modification_date')
+            }
+            if include_body:
+                record['body'] = info.get('body', '')
+            yield record
+    
+    def load_snapshot(self) -> Optional[NotesIndex]:
+        """
+        加载全量快照索引，不支持快照的后端返回None
+        
+        Returns:
+            快照索引
+        """
+        return None
+    
+    def invalidate_snapshot(self):
+        """丢弃已加载的快照索引"""
+        self.snapshot_index = None
+    
+    @staticmethod
+    def _batch_result(status: str, note_id: str = None, error: str = None) -> Dict[str, Any]:
+        """构造单个批量操作的结果"""
+        return {
+            'success': status != "error",
+            'status': status,
+            'note_id': note_id,
+            'error': error
+        }
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+备忘录快照索引
+保存一次性导出的文件夹树和备忘录元数据，按 (文件夹路径, 标题) 建立内存索引，
+批量同步时用来代替逐个文件的存在性查询；文件夹树也可以单独缓存，
+让文件夹存在性检查不再需要脚本往返
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+def normalize_folder_path(folder: str) -> str:
+    """
+    规范化文件夹路径，去掉多余的分隔符和空白
+    
+    Args:
+        folder: 文件夹路径，如 "Claude/ProjectName"
+    
+    Returns:
+        规范化后的路径
+    """
+    return "/".join(part.strip() for part in (folder or "").split('/') if part.strip())
+
+class FolderTree:
+    """嵌套文件夹树缓存，以规范化的完整路径保存每一级文件夹"""
+    
+    def __init__(self, folders: List[str] = None):
+        """
+        初始化文件夹树
+        
+        Args:
+            folders: 初始文件夹路径列表
+        """
+        self._folders = set()
+        for folder in folders or []:
+            self.add_folder(folder)
+    
+    def __len__(self) -> int:
+        return len(self._folders)
+    
+    def __contains__(self, folder: str) -> bool:
+        return self.has_folder(folder)
+    
+    def add_folder(self, folder: str):
+        """记录文件夹（同时记录其所有上级文件夹）"""
+        parts = normalize_folder_path(folder).split('/')
+        for i in range(1, len(parts) + 1):
+            path = "/".join(parts[:i])
+            if path:
+                self._folders.add(path)
+    
+    def remove_folder(self, folder: str):
+        """移除文件夹及其所有子文件夹"""
+        folder = normalize_folder_path(folder)
+        prefix = folder + '/'
+        self._folders = {path for path in self._folders
+                         if path != folder and not path.startswith(prefix)}
+    
+    def has_folder(self, folder: str) -> bool:
+        """文件夹是否存在（空路径代表账户根）"""
+        folder = normalize_folder_path(folder)
+        return not folder or folder in self._folders
+    
+    def missing_levels(self, folder: str) -> List[str]:
+        """
+        获取路径中尚不存在的各级文件夹
+        
+        Args:
+            folder: 文件夹路径
+        
+        Returns:
+            按层级从浅到深排列的缺失文件夹路径
+        """
+        parts = normalize_folder_path(folder).split('/')
+        levels = ["/".join(parts[:i]) for i in range(1, len(parts) + 1) if parts[i - 1]]
+        return [path for path in levels if path not in self._folders]
+    
+    def get_folders(self) -> List[str]:
+        """获取所有文件夹路径（包含嵌套文件夹）"""
+        return sorted(self._folders)
+    
+    def get_children(self, folder: str = "") -> List[str]:
+        """获取指定文件夹的直接子文件夹路径，空路径表示顶层文件夹"""
+        folder = normalize_folder_path(folder)
+        depth = folder.count('/') + 1 if folder else 0
+        prefix = folder + '/' if folder else ''
+        return sorted(path for path in self._folders
+                      if path.startswith(prefix) and path.count('/') == depth)
+
+class NotesIndex:
+    """备忘录快照索引"""
+    
+    def __init__(self, account: str):
+        """
+        初始化索引
+        
+        Args:
+            account: 快照所属的备忘录账户
+        """
+        self.account = account
+        self.created_at = datetime.now()
+        self.folder_tree = FolderTree()
+        self._notes: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._notes)
+    
+    def add_folder(self, folder: str):
+        """记录文件夹（同时记录其所有上级文件夹）"""
+        self.folder_tree.add_folder(folder)
+    
+    def add_note(self, folder: str, title: str, note_id: Optional[str] = None,
+                 modification_date: Optional[str] = None):
+        """
+        记录备忘录
+        
+        Args:
+            folder: 文件夹路径
+            title: 备忘录标题
+            note_id: 备忘录ID（本地写入后可能未知）
+            modification_date: 修改时间字符串
+        """
+        folder = normalize_folder_path(folder)
+        if folder:
+            self.add_folder(folder)
+        self._notes[(folder, title)] = {
+            'id': note_id,
+            'title': title,
+            'folder': folder,
+            'modification_date': modification_date
+        }
+    
+    def remove_note(self, folder: str, title: str):
+        """从索引中移除备忘录"""
+        self._notes.pop((normalize_folder_path(folder), title), None)
+    
+    def has_folder(self, folder: str) -> bool:
+        """文件夹是否存在（空路径代表账户根）"""
+        return self.folder_tree.has_folder(folder)
+    
+    def has_note(self, folder: str, title: str) -> bool:
+        """指定文件夹中是否存在该标题的备忘录"""
+        return (normalize_folder_path(folder), title) in self._notes
+    
+    def get_note(self, folder: str, title: str) -> Optional[Dict[str, Any]]:
+        """获取备忘录元数据"""
+        note = self._notes.get((normalize_folder_path(folder), title))
+        return dict(note) if note else None
+    
+    def get_folders(self) -> List[str]:
+        """获取所有文件夹路径（包含嵌套文件夹）"""
+        return self.folder_tree.get_folders()
+    
+    def get_notes(self, folder: str) -> List[str]:
+        """获取指定文件夹下的备忘录标题"""
+        folder = normalize_folder_path(folder)
+        return [title for (note_folder, title) in self._notes if note_folder == folder]
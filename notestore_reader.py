@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+备忘录数据库只读查询
+备忘录应用把数据保存在 NoteStore.sqlite 中。文件夹列表、标题查找和修改时间这类纯读取
+操作直接以只读方式（mode=ro）查询该数据库，比通过脚本驱动备忘录应用快几个数量级；
+写入仍然通过AppleScript桥接完成。读取此文件需要给终端授予"完全磁盘访问权限"
+"""
+
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from notes_index import NotesIndex, FolderTree, normalize_folder_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NOTESTORE_PATH = "~/Library/Group Containers/group.com.apple.notes/NoteStore.sqlite"
+
+# Core Data时间戳的起点
+_CORE_DATA_EPOCH = datetime(2001, 1, 1, tzinfo=timezone.utc)
+
+# 废纸篓文件夹的 ZFOLDERTYPE
+_TRASH_FOLDER_TYPE = 1
+
+class NoteStoreError(Exception):
+    """数据库不可用或结构与预期不符"""
+    pass
+
+def _iso_date(value: Optional[float]) -> Optional[str]:
+    """把Core Data时间戳转换为与JXA读取结果相同格式的ISO时间字符串"""
+    if value is None:
+        return None
+    moment = _CORE_DATA_EPOCH + timedelta(seconds=value)
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.') + f"{moment.microsecond // 1000:03d}Z"
+
+class NoteStoreReader:
+    """NoteStore.sqlite 只读查询，线程安全"""
+    
+    def __init__(self, db_path: Union[str, Path] = None, account: str = "iCloud"):
+        """
+        初始化查询器，数据库在首次查询时打开
+        
+        Args:
+            db_path: NoteStore.sqlite 路径，默认使用当前用户的备忘录数据库
+            account: 备忘录账户名
+        """
+        self.db_path = Path(db_path or DEFAULT_NOTESTORE_PATH).expanduser()
+        self.account = account
+        self._conn: Optional[sqlite3.Connection] = None
+        self._schema: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+    
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+    
+    def _connect(self) -> sqlite3.Connection:
+        """以只读方式打开数据库并识别表结构（调用方持有锁）"""
+        if self._conn is not None:
+            return self._conn
+        if not self.db_path.exists():
+            raise NoteStoreError(f"备忘录数据库不存在: {self.db_path}")
+        
+        conn = sqlite3.connect(f"{self.db_path.as_uri()}?mode=ro", uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        try:
+            self._schema = self._detect_schema(conn)
+        except (sqlite3.Error, NoteStoreError):
+            conn.close()
+            raise
+        self._conn = conn
+        return conn
+    
+    def _detect_schema(self, conn: sqlite3.Connection) -> Dict[str, Any]:
+        """识别实体编号和各版本备忘录中名称不同的列"""
+        entities = {row['Z_NAME']: row['Z_ENT'] for row in conn.execute('SELECT Z_ENT, Z_NAME FROM Z_PRIMARYKEY')}
+        for name in ('ICNote', 'ICFolder', 'ICAccount'):
+            if name not in entities:
+                raise NoteStoreError(f"数据库中缺少实体: {name}")
+        
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(ZICCLOUDSYNCINGOBJECT)')}
+        for column in ('ZTITLE1', 'ZTITLE2', 'ZFOLDER', 'ZPARENT', 'ZOWNER', 'ZNAME', 'ZMODIFICATIONDATE1'):
+            if column not in columns:
+                raise NoteStoreError(f"数据库中缺少列: {column}")
+        
+        # 较新的系统把创建时间存在 ZCREATIONDATE3
+        creation_columns = [column for column in ('ZCREATIONDATE3', 'ZCREATIONDATE1') if column in columns]
+        store_uuid = conn.execute("SELECT Z_UUID FROM Z_METADATA").fetchone()
+        
+        return {
+            'note': entities['ICNote'],
+            'folder': entities['ICFolder'],
+            'account': entities['ICAccount'],
+            'creation_date': (f"COALESCE({', '.join(creation_columns)})" if len(creation_columns) > 1
+                              else (creation_columns[0] if creation_columns else "NULL")),
+            'deleted': "COALESCE(ZMARKEDFORDELETION, 0) = 1" if 'ZMARKEDFORDELETION' in columns else "0",
+            'trash': (f"COALESCE(ZFOLDERTYPE, 0) = {_TRASH_FOLDER_TYPE}"
+                      if 'ZFOLDERTYPE' in columns else "0"),
+            'store_uuid': store_uuid[0] if store_uuid else None
+        }
+    
+    def _query(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        """执行查询，sql中的 {note}、{folder} 等占位符替换为识别出的实体和列"""
+        with self._lock:
+            conn = self._connect()
+            return conn.execute(sql.format(**self._schema), params).fetchall()
+    
+    def _account_pk(self) -> int:
+        """账户在数据库中的主键"""
+        rows = self._query(
+            'SELECT Z_PK FROM ZICCLOUDSYNCINGOBJECT WHERE Z_ENT = {account} AND ZNAME = ?',
+            (self.account,)
+        )
+        if not rows:
+            raise NoteStoreError(f"备忘录数据库中没有账户: {self.account}")
+        return rows[0]['Z_PK']
+    
+    def _folder_paths(self) -> Dict[int, str]:
+        """账户下所有文件夹（不含废纸篓和已删除的）的主键到嵌套路径的映射"""
+        rows = self._query(
+            'SELECT Z_PK, ZTITLE2, ZPARENT FROM ZICCLOUDSYNCINGOBJECT '
+            'WHERE Z_ENT = {folder} AND ZOWNER = ? AND NOT ({deleted}) AND NOT ({trash})',
+            (self._account_pk(),)
+        )
+        folders = {row['Z_PK']: (row['ZTITLE2'] or "", row['ZPARENT']) for row in rows}
+        
+        paths: Dict[int, str] = {}
+        
+        def resolve(pk: int) -> Optional[str]:
+            if pk in paths:
+                return paths[pk]
+            name, parent = folders[pk]
+            if parent is None or parent == pk:
+                path = name
+            elif parent in folders:
+                parent_path = resolve(parent)
+                path = f"{parent_path}/{name}" if parent_path is not None else None
+            else:
+                # 上级文件夹已删除或位于废纸篓中
+                path = None
+            paths[pk] = path
+            return path
+        
+        for pk in folders:
+            resolve(pk)
+        return {pk: path for pk, path in paths.items() if path}
+    
+    def _folder_pk(self, folder: str) -> Optional[int]:
+        """按嵌套路径查找文件夹主键"""
+        folder = normalize_folder_path(folder)
+        for pk, path in self._folder_paths().items():
+            if path == folder:
+                return pk
+        return None
+    
+    def _note_record(self, row: sqlite3.Row, folder: str) -> Dict[str, Any]:
+        """把查询结果转换为与 iter_notes 相同格式的记录"""
+        return {
+            'folder': folder,
+            'name': row['ZTITLE1'],
+            'id': self.note_id(row['Z_PK']),
+            'creation_date': _iso_date(row['creation_date']),
+            'modification_date': _iso_date(row['ZMODIFICATIONDATE1'])
+        }
+    
+    def note_id(self, pk: int) -> str:
+        """按AppleScript返回的格式构造备忘录ID"""
+        with self._lock:
+            self._connect()
+            store_uuid = self._schema['store_uuid']
+        return f"x-coredata://{store_uuid}/ICNote/p{pk}"
+    
+    def get_folders(self) -> List[str]:
+        """
+        获取全部文件夹路径
+        
+        Returns:
+            文件夹路径列表（包含嵌套文件夹）
+        """
+        return sorted(self._folder_paths().values())
+    
+    def folder_tree(self) -> FolderTree:
+        """获取完整的嵌套文件夹树"""
+        return FolderTree(self.get_folders())
+    
+    def iter_notes(self, folder: str) -> Iterator[Dict[str, Any]]:
+        """
+        遍历文件夹中的备忘录（不含正文，正文以压缩格式存储，仍需通过桥接读取）
+        
+        Args:
+            folder: 文件夹路径
+        
+        Yields:
+            备忘录记录，包含 folder、name、id、creation_date、modification_date
+        """
+        folder_pk = self._folder_pk(folder)
+        if folder_pk is None:
+            return
+        rows = self._query(
+            'SELECT Z_PK, ZTITLE1, {creation_date} AS creation_date, ZMODIFICATIONDATE1 '
+            'FROM ZICCLOUDSYNCINGOBJECT WHERE Z_ENT = {note} AND ZFOLDER = ? AND NOT ({deleted})',
+            (folder_pk,)
+        )
+        folder = normalize_folder_path(folder)
+        for row in rows:
+            yield self._note_record(row, folder)
+    
+    def get_notes(self, folder: str) -> List[str]:
+        """获取文件夹中的备忘录标题"""
+        return [record['name'] for record in self.iter_notes(folder)]
+    
+    def count_notes_by_folder(self) -> Dict[str, int]:
+        """
+        用一次分组查询统计每个文件夹（含嵌套文件夹）中的备忘录数量
+        
+        Returns:
+            文件夹路径到备忘录数量的映射，按路径排序，空文件夹计为0
+        """
+        folder_paths = self._folder_paths()
+        counts = {path: 0 for path in folder_paths.values()}
+        rows = self._query(
+            'SELECT ZFOLDER, COUNT(*) AS note_count FROM ZICCLOUDSYNCINGOBJECT '
+            'WHERE Z_ENT = {note} AND NOT ({deleted}) GROUP BY ZFOLDER'
+        )
+        for row in rows:
+            folder = folder_paths.get(row['ZFOLDER'])
+            if folder is not None:
+                counts[folder] = row['note_count']
+        return dict(sorted(counts.items()))
+    
+    def get_note(self, title: str, folder: str, note_id: str = None) -> Optional[Dict[str, Any]]:
+        """
+        查找备忘录元数据，提供ID时优先按ID定位
+        
+        Args:
+            title: 备忘录标题
+            folder: 文件夹路径
+            note_id: 备忘录ID（如 x-coredata://.../ICNote/p123）
+        
+        Returns:
+            备忘录记录（不含正文），不存在返回None
+        """
+        folder_pk = self._folder_pk(folder)
+        if folder_pk is None:
+            return None
+        
+        select = ('SELECT Z_PK, ZTITLE1, {creation_date} AS creation_date, ZMODIFICATIONDATE1 '
+                  'FROM ZICCLOUDSYNCINGOBJECT WHERE Z_ENT = {note} AND ZFOLDER = ? AND NOT ({deleted}) ')
+        rows = []
+        if note_id and '/ICNote/p' in note_id:
+            try:
+                pk = int(note_id.rsplit('/p', 1)[1])
+            except ValueError:
+                pk = None
+            if pk is not None:
+                rows = self._query(select + 'AND Z_PK = ?', (folder_pk, pk))
+        if not rows:
+            rows = self._query(select + 'AND ZTITLE1 = ? LIMIT 1', (folder_pk, title))
+        return self._note_record(rows[0], normalize_folder_path(folder)) if rows else None
+    
+    def note_exists(self, title: str, folder: str) -> bool:
+        """指定文件夹中是否存在该标题的备忘录"""
+        return self.get_note(title, folder) is not None
+    
+    def load_index(self) -> NotesIndex:
+        """
+        用少量查询建立完整的快照索引
+        
+        Returns:
+            快照索引
+        """
+        folder_paths = self._folder_paths()
+        index = NotesIndex(self.account)
+        for path in folder_paths.values():
+            index.add_folder(path)
+        
+        rows = self._query(
+            'SELECT Z_PK, ZTITLE1, ZFOLDER, ZMODIFICATIONDATE1 FROM ZICCLOUDSYNCINGOBJECT '
+            'WHERE Z_ENT = {note} AND NOT ({deleted})'
+        )
+        for row in rows:
+            folder = folder_paths.get(row['ZFOLDER'])
+            if folder is None:
+                # 其他账户、废纸篓或已删除文件夹中的备忘录
+                continue
+            index.add_note(folder, row['ZTITLE1'] or "", note_id=self.note_id(row['Z_PK']),
+                           modification_date=_iso_date(row['ZMODIFICATIONDATE1']))
+        return index
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+osascript常驻进程池
+维护少量长期运行的脚本执行进程，通过stdin/stdout上的分帧协议提交脚本，
+避免每次调用都重新启动osascript进程
+"""
+
+import json
+import logging
+import os
+import select
+import subprocess
+import threading
+import time
+import queue
+from typing import List, Optional, Dict, Any
+
+from resilience import classify_error
+
+logger = logging.getLogger(__name__)
+
+# 默认的JXA执行器：循环读取请求帧，用StandardAdditions的run script执行AppleScript文本，
+# 再把结果写回一帧。帧格式为 "<字节数>\n<UTF-8 JSON>"，请求和响应相同。
+DEFAULT_RUNNER_SCRIPT = r'''
+ObjC.import('Foundation');
+function run() {
+    var stdin = $.NSFileHandle.fileHandleWithStandardInput;
+    var stdout = $.NSFileHandle.fileHandleWithStandardOutput;
+    var app = Application.currentApplication();
+    app.includeStandardAdditions = true;
+    
+    function readHeader() {
+        var chars = [];
+        while (true) {
+            var d = stdin.readDataOfLength(1);
+            if (d.length == 0) return null;
+            var c = $.NSString.alloc.initWithDataEncoding(d, $.NSASCIIStringEncoding).js;
+            if (c === '\n') return chars.join('');
+            chars.push(c);
+        }
+    }
+    function readFrame() {
+        var header = readHeader();
+        if (header === null) return null;
+        var data = stdin.readDataOfLength(parseInt(header, 10));
+        return JSON.parse($.NSString.alloc.initWithDataEncoding(data, $.NSUTF8StringEncoding).js);
+    }
+    function writeFrame(obj) {
+        var body = $(JSON.stringify(obj)).dataUsingEncoding($.NSUTF8StringEncoding);
+        stdout.writeData($(String(body.length) + '\n').dataUsingEncoding($.NSUTF8StringEncoding));
+        stdout.writeData(body);
+    }
+    
+    while (true) {
+        var req = readFrame();
+        if (req === null) break;
+        if (req.op === 'ping') {
+            writeFrame({ok: true, result: 'pong'});
+            continue;
+        }
+        try {
+            var source = req.file ? Path(req.file) : req.script;
+            var result = app.runScript(source, {withParameters: req.args || [], in: 'AppleScript'});
+            writeFrame({ok: true, result: (result === undefined || result === null) ? '' : String(result)});
+        } catch (e) {
+            writeFrame({ok: false, error: String(e.message || e), code: e.errorNumber || null});
+        }
+    }
+}
+'''
+
+DEFAULT_RUNNER_COMMAND = ['osascript', '-l', 'JavaScript', '-e', DEFAULT_RUNNER_SCRIPT]
+
+
+class ScriptRunnerError(Exception):
+    """脚本执行器错误（进程异常、超时或脚本返回错误）"""
+    
+    def __init__(self, message: str, code: Optional[int] = None, timeout: bool = False):
+        super().__init__(message)
+        self.code = code
+        self.timeout = timeout
+    
+    @property
+    def kind(self) -> str:
+        """错误类别（超时、应用未运行、对象不存在、无权限等），见 resilience.classify_error"""
+        return classify_error(str(self), self.code, self.timeout)
+
+
+class OsascriptWorker:
+    """单个常驻脚本执行进程"""
+    
+    def __init__(self, command: List[str]):
+        """
+        初始化执行进程
+        
+        Args:
+            command: 启动执行器的命令行
+        """
+        self.command = command
+        self.process: Optional[subprocess.Popen] = None
+        self.started_at = 0.0
+        self.last_used = 0.0
+        self.requests_served = 0
+        self._buffer = b""
+    
+    def start(self):
+        """启动执行进程"""
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=0
+        )
+        self.started_at = time.monotonic()
+        self.last_used = self.started_at
+        self.requests_served = 0
+        self._buffer = b""
+        logger.debug(f"启动脚本执行进程: pid={self.process.pid}")
+    
+    @property
+    def alive(self) -> bool:
+        """进程是否仍在运行"""
+        return self.process is not None and self.process.poll() is None
+    
+    def request(self, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """
+        发送一帧请求并等待响应
+        
+        Args:
+            payload: 请求内容
+            timeout: 等待响应的超时秒数
+        
+        Returns:
+            响应字典
+        """
+        if not self.alive:
+            raise ScriptRunnerError("脚本执行进程未运行")
+        
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        try:
+            self.process.stdin.write(f"{len(body)}\n".encode('ascii') + body)
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise ScriptRunnerError(f"写入请求失败: {e}")
+        
+        deadline = time.monotonic() + timeout
+        header = self._read_until_newline(deadline)
+        try:
+            length = int(header)
+        except ValueError:
+            raise ScriptRunnerError(f"无效的响应帧头: {header!r}")
+        data = self._read_exact(length, deadline)
+        
+        self.requests_served += 1
+        self.last_used = time.monotonic()
+        
+        try:
+            return json.loads(data.decode('utf-8'))
+        except ValueError as e:
+            raise ScriptRunnerError(f"无效的响应内容: {e}")
+    
+    def _fill(self, deadline: float):
+        """在截止时间前从stdout读取更多数据"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise ScriptRunnerError("脚本执行超时", timeout=True)
+        
+        fd = self.process.stdout.fileno()
+        ready, _, _ = select.select([fd], [], [], remaining)
+        if not ready:
+            raise ScriptRunnerError("脚本执行超时", timeout=True)
+        
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            raise ScriptRunnerError("脚本执行进程意外退出")
+        self._buffer += chunk
+    
+    def _read_until_newline(self, deadline: float) -> str:
+        while b"\n" not in self._buffer:
+            self._fill(deadline)
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line.decode('ascii').strip()
+    
+    def _read_exact(self, length: int, deadline: float) -> bytes:
+        while len(self._buffer) < length:
+            self._fill(deadline)
+        data, self._buffer = self._buffer[:length], self._buffer[length:]
+        return data
+    
+    def close(self):
+        """关闭执行进程"""
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        logger.debug(f"关闭脚本执行进程: pid={self.process.pid}")
+        self.process = None
+
+
+class OsascriptWorkerPool:
+    """常驻脚本执行进程池，带健康检查和定期回收"""
+    
+    def __init__(self,
+                 size: int = 2,
+                 runner_command: Optional[List[str]] = None,
+                 request_timeout: float = 30,
+                 max_requests_per_worker: int = 500,
+                 max_worker_age: float = 600,
+                 health_check_interval: float = 60):
+        """
+        初始化进程池
+        
+        Args:
+            size: 最大进程数
+            runner_command: 执行器命令行，默认使用osascript运行JXA执行器；
+                            可替换为任何实现相同分帧协议的解释器（例如在Linux上测试）
+            request_timeout: 单个请求的默认超时秒数
+            max_requests_per_worker: 单个进程处理多少请求后回收
+            max_worker_age: 单个进程最长存活秒数，超过后回收
+            health_check_interval: 进程空闲超过该秒数后，复用前先发送ping检查
+        """
+        self.size = max(1, size)
+        self.runner_command = list(runner_command or DEFAULT_RUNNER_COMMAND)
+        self.request_timeout = request_timeout
+        self.max_requests_per_worker = max_requests_per_worker
+        self.max_worker_age = max_worker_age
+        self.health_check_interval = health_check_interval
+        
+        self._idle: "queue.LifoQueue[OsascriptWorker]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._spawned = 0
+        self._closed = False
+    
+    def run_script(self, script: str = None, args: List[str] = None,
+                   timeout: float = None, script_file: str = None) -> str:
+        """
+        在池中的进程上执行AppleScript
+        
+        Args:
+            script: AppleScript源码
+            args: 传给脚本run处理器的参数
+            timeout: 超时秒数，默认使用request_timeout
+            script_file: 已编译脚本文件路径（与script二选一）
+        
+        Returns:
+            脚本返回值字符串
+        """
+        payload: Dict[str, Any] = {'op': 'run', 'args': list(args or [])}
+        if script_file:
+            payload['file'] = str(script_file)
+        else:
+            payload['script'] = script
+        
+        worker = self._acquire()
+        try:
+            response = worker.request(payload, timeout or self.request_timeout)
+        except ScriptRunnerError:
+            # 进程状态未知（可能卡在半帧上），直接丢弃
+            self._discard(worker)
+            raise
+        self._release(worker)
+        
+        if not response.get('ok'):
+            raise ScriptRunnerError(response.get('error', '未知错误'), code=response.get('code'))
+        return str(response.get('result', '')).strip()
+    
+    def _acquire(self) -> OsascriptWorker:
+        """取出一个健康的空闲进程，必要时启动新进程"""
+        if self._closed:
+            raise ScriptRunnerError("进程池已关闭")
+        
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                worker = self._spawn_or_wait()
+            
+            if self._is_healthy(worker):
+                return worker
+            self._discard(worker)
+    
+    def _spawn_or_wait(self) -> OsascriptWorker:
+        while True:
+            with self._lock:
+                can_spawn = self._spawned < self.size
+                if can_spawn:
+                    self._spawned += 1
+            if can_spawn:
+                break
+            # 定期醒来重新检查，避免被丢弃的进程让等待者永远阻塞
+            try:
+                return self._idle.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        
+        worker = OsascriptWorker(self.runner_command)
+        try:
+            worker.start()
+        except OSError as e:
+            with self._lock:
+                self._spawned -= 1
+            raise ScriptRunnerError(f"启动脚本执行进程失败: {e}")
+        return worker
+    
+    def _is_healthy(self, worker: OsascriptWorker) -> bool:
+        """检查进程是否可以继续使用"""
+        if not worker.alive:
+            return False
+        
+        now = time.monotonic()
+        if worker.requests_served >= self.max_requests_per_worker:
+            logger.debug("脚本执行进程达到请求上限，回收")
+            return False
+        if now - worker.started_at >= self.max_worker_age:
+            logger.debug("脚本执行进程达到存活上限，回收")
+            return False
+        
+        if now - worker.last_used >= self.health_check_interval and worker.requests_served > 0:
+            try:
+                response = worker.request({'op': 'ping'}, timeout=5)
+                return bool(response.get('ok'))
+            except ScriptRunnerError as e:
+                logger.warning(f"脚本执行进程健康检查失败: {e}")
+                return False
+        
+        return True
+    
+    def _release(self, worker: OsascriptWorker):
+        if self._closed:
+            self._discard(worker)
+        else:
+            self._idle.put(worker)
+    
+    def _discard(self, worker: OsascriptWorker):
+        worker.close()
+        with self._lock:
+            self._spawned -= 1
+    
+    def close(self):
+        """关闭所有进程"""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(worker)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
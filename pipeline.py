@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分级线程流水线
+批量同步拆成若干级：前面的各级（签名比较、读取与转换）各用一组工作线程，
+最后一级由调用线程独占执行（写入备忘录后端）。各级之间用有界队列连接，
+下游处理不过来时上游自动阻塞（背压），CPU处理与备忘录的慢速I/O得以重叠
+"""
+
+import queue
+import logging
+import threading
+from typing import Any, Callable, Iterable, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 队列结束标记
+_DONE = object()
+
+# 阻塞在队列上的线程检查停止信号的间隔（秒）
+_POLL_SECONDS = 0.1
+
+class StagedPipeline:
+    """由有界队列串联的多级线程流水线"""
+    
+    def __init__(self, queue_size: int = 64):
+        """
+        初始化流水线
+        
+        Args:
+            queue_size: 各级之间队列的容量
+        """
+        self.queue_size = max(1, queue_size)
+        self._stages: List[Tuple[str, Callable[[Any], Iterable[Any]], int]] = []
+        self._stop = threading.Event()
+        self.errors: List[Tuple[str, Any, Exception]] = []
+        self._errors_lock = threading.Lock()
+    
+    def add_stage(self, name: str, func: Callable[[Any], Iterable[Any]], workers: int = 1) -> 'StagedPipeline':
+        """
+        添加一级由工作线程执行的处理
+        
+        Args:
+            name: 级名称（用于日志和错误记录）
+            func: 处理单个输入的函数，返回交给下一级的输出（可以为空或多个）
+            workers: 工作线程数
+        
+        Returns:
+            流水线本身，便于链式调用
+        """
+        self._stages.append((name, func, max(1, workers)))
+        return self
+    
+    def run(self, source: Iterable[Any], sink: Callable[[Iterator[List[Any]]], None], max_batch: int = 1):
+        """
+        运行流水线，返回时所有线程都已结束
+        
+        Args:
+            source: 第一级的输入，由单独的线程遍历
+            sink: 最后一级，在调用线程中执行；参数是最后一级队列的批次迭代器，
+                  每批至少一项、至多 max_batch 项（队列中已有的项一次取出）
+            max_batch: 每批的最大项数
+        
+        Raises:
+            sink 抛出的异常（其他线程随之停止）
+        """
+        self._stop.clear()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self._stages) + 1)]
+        threads = [threading.Thread(target=self._feed, args=(source, queues[0], self._workers(0)),
+                                    name="pipeline-source", daemon=True)]
+        
+        for index, (name, func, workers) in enumerate(self._stages):
+            remaining = [workers]
+            lock = threading.Lock()
+            for worker in range(workers):
+                threads.append(threading.Thread(
+                    target=self._work,
+                    args=(name, func, queues[index], queues[index + 1], self._workers(index + 1), remaining, lock),
+                    name=f"pipeline-{name}-{worker}", daemon=True
+                ))
+        
+        for thread in threads:
+            thread.start()
+        try:
+            sink(self._batches(queues[-1], max_batch))
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+    
+    def _workers(self, index: int) -> int:
+        """第index级的工作线程数，最后一级（sink）只有一个消费者"""
+        return self._stages[index][2] if index < len(self._stages) else 1
+    
+    def _put(self, target: queue.Queue, item: Any) -> bool:
+        """放入队列，队列满时阻塞；流水线停止时放弃并返回False"""
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def _get(self, source: queue.Queue) -> Any:
+        """从队列取出一项；流水线停止时返回结束标记"""
+        while not self._stop.is_set():
+            try:
+                return source.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+        return _DONE
+    
+    def _record_error(self, stage: str, item: Any, error: Exception):
+        """记录处理单个输入时的异常，流水线继续处理其他输入"""
+        logger.error(f"❌ 流水线 {stage} 处理失败: {item} - {error}")
+        with self._errors_lock:
+            self.errors.append((stage, item, error))
+    
+    def _feed(self, source: Iterable[Any], target: queue.Queue, consumers: int):
+        """遍历输入放入第一级队列，结束后为每个消费者放入结束标记"""
+        try:
+            for item in source:
+                if not self._put(target, item):
+                    return
+        except Exception as e:
+            self._record_error("source", None, e)
+        for _ in range(consumers):
+            self._put(target, _DONE)
+    
+    def _work(self, name: str, func: Callable[[Any], Iterable[Any]], source: queue.Queue,
+              target: queue.Queue, consumers: int, remaining: List[int], lock: threading.Lock):
+        """工作线程：处理输入直到结束标记，同级最后一个结束的线程向下一级传递结束标记"""
+        while True:
+            item = self._get(source)
+            if item is _DONE:
+                break
+            try:
+                outputs = func(item)
+            except Exception as e:
+                self._record_error(name, item, e)
+                continue
+            for output in outputs or ():
+                if not self._put(target, output):
+                    return
+        
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            for _ in range(consumers):
+                self._put(target, _DONE)
+    
+    def _batches(self, source: queue.Queue, max_batch: int) -> Iterator[List[Any]]:
+        """最后一级的批次：阻塞等待第一项，再取出队列中已有的项"""
+        while True:
+            item = self._get(source)
+            if item is _DONE:
+                return
+            batch = [item]
+            while len(batch) < max_batch:
+                try:
+                    item = source.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    yield batch
+                    return
+                batch.append(item)
+            yield batch
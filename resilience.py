@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+脚本执行的错误分类、重试与熔断
+备忘录在同步iCloud时经常短暂无响应，单次超时就把文件记为失败会导致大批量同步后
+需要整体重跑。这里把AppleScript错误分为超时、应用未运行、对象不存在、无权限等类别，
+可重试的错误按带抖动的指数退避重试；连续失败达到阈值时熔断器打开，
+后续调用暂停等待而不是每30秒再撞一次卡住的备忘录进程
+"""
+
+import re
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# 错误类别
+ERROR_TIMEOUT = "timeout"
+ERROR_APP_NOT_RUNNING = "app_not_running"
+ERROR_NOT_FOUND = "not_found"
+ERROR_PERMISSION = "permission"
+ERROR_OTHER = "other"
+
+# AppleScript错误码到类别的映射
+ERROR_CODES = {
+    -1712: ERROR_TIMEOUT,          # errAETimeout: Apple Event超时
+    -600: ERROR_APP_NOT_RUNNING,   # procNotFound: 应用未运行
+    -609: ERROR_APP_NOT_RUNNING,   # connectionInvalid: 应用在调用过程中退出
+    -1728: ERROR_NOT_FOUND,        # errAENoSuchObject: 对象不存在
+    -1743: ERROR_PERMISSION,       # errAEEventNotPermitted: 未授权自动化
+}
+
+RETRYABLE_ERRORS = (ERROR_TIMEOUT, ERROR_APP_NOT_RUNNING)
+# 脚本未送达备忘录的错误：非幂等写入（创建/追加/删除）也可安全重试；超时时写入可能已完成，不在此列
+SAFE_RETRY_ERRORS = (ERROR_APP_NOT_RUNNING,)
+
+# 错误信息末尾的错误码，如 osascript 的 "execution error: ... (-1728)"
+_ERROR_CODE_PATTERN = re.compile(r'\((-\d+)\)\s*$')
+
+def parse_error_code(message: str) -> Optional[int]:
+    """
+    解析错误信息末尾括号中的AppleScript错误码
+    
+    Args:
+        message: 错误信息，如 "execution error: ... (-1728)" 或脚本返回的 "error: ... (-1712)"
+    
+    Returns:
+        错误码，没有时返回None
+    """
+    match = _ERROR_CODE_PATTERN.search(message or "")
+    return int(match.group(1)) if match else None
+
+def classify_error(message: str, code: Optional[int] = None, timeout: bool = False) -> str:
+    """
+    对脚本错误分类
+    
+    Args:
+        message: 错误信息（osascript的stderr或执行器返回的错误）
+        code: 错误码，未知时从message末尾解析
+        timeout: 是否为本地超时
+    
+    Returns:
+        错误类别
+    """
+    if timeout:
+        return ERROR_TIMEOUT
+    if code is None:
+        code = parse_error_code(message)
+    try:
+        return ERROR_CODES.get(int(code), ERROR_OTHER) if code is not None else ERROR_OTHER
+    except (TypeError, ValueError):
+        return ERROR_OTHER
+
+class CircuitBreaker:
+    """
+    熔断器，线程安全
+    
+    连续失败达到阈值后打开，打开期间调用方等待；冷却时间过后进入半开状态，
+    只放行一个试探调用，成功则关闭，失败则重新打开
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        初始化熔断器
+        
+        Args:
+            failure_threshold: 打开熔断器所需的连续失败次数
+            reset_timeout: 打开后到允许试探调用的冷却秒数
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_progress = False
+        self._open_count = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        """当前状态"""
+        return self._state
+    
+    @property
+    def open_count(self) -> int:
+        """熔断器打开的次数"""
+        return self._open_count
+    
+    def wait_time(self) -> float:
+        """
+        检查是否可以发起调用
+        
+        Returns:
+            0表示可以立即调用（半开状态下同时占用试探名额），否则为建议等待的秒数
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return 0.0
+            if self._state == self.OPEN:
+                remaining = self._opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    return remaining
+                self._state = self.HALF_OPEN
+                self._trial_in_progress = False
+            if self._trial_in_progress:
+                # 等待试探调用的结果
+                return min(1.0, self.reset_timeout)
+            self._trial_in_progress = True
+            return 0.0
+    
+    def record_success(self):
+        """记录一次成功调用"""
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("✅ 备忘录恢复响应，熔断器关闭")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_progress = False
+    
+    def record_failure(self):
+        """记录一次可重试类错误（超时、应用未运行）"""
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._open_count += 1
+                    logger.warning(f"⏸️ 备忘录连续 {self._failures} 次无响应，"
+                                   f"暂停 {self.reset_timeout:g} 秒后再试")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_progress = False
+
+class ScriptRetrier:
+    """按错误类别重试脚本调用，并通过熔断器在备忘录卡住时暂停调用"""
+    
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        """
+        初始化重试器
+        
+        Args:
+            max_attempts: 单次调用的最大尝试次数（含首次）
+            base_delay: 退避基准秒数，第n次重试前最多等待 base_delay * 2^n 秒
+            max_delay: 单次退避的最大秒数
+            breaker: 熔断器，None表示不熔断
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+    
+    def backoff_delay(self, attempt: int) -> float:
+        """
+        计算第attempt次重试前的等待时间（full jitter）
+        
+        Args:
+            attempt: 已失败的次数，从1开始
+        
+        Returns:
+            等待秒数
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+    
+    def call(self, func: Callable[[], T], describe: Callable[[Exception], Optional[str]],
+             retryable: Tuple[str, ...] = RETRYABLE_ERRORS) -> T:
+        """
+        执行调用，可重试的错误按退避策略重试
+        
+        Args:
+            func: 无参调用
+            describe: 对func抛出的异常返回错误类别，返回None表示不处理该异常（直接抛出）
+            retryable: 允许重试的错误类别，非幂等调用传 SAFE_RETRY_ERRORS
+        
+        Returns:
+            func的返回值
+        
+        Raises:
+            func最后一次抛出的异常
+        """
+        attempt = 0
+        while True:
+            self._wait_for_breaker()
+            attempt += 1
+            try:
+                result = func()
+            except Exception as e:
+                kind = describe(e)
+                if kind is None:
+                    # 与备忘录响应无关的错误，不计入熔断但释放可能占用的试探名额
+                    self._on_success()
+                    raise
+                if not self._should_retry(kind, attempt, retryable):
+                    raise
+                time.sleep(self.backoff_delay(attempt))
+                continue
+            self._on_success()
+            return result
+    
+    async def call_async(self, func: Callable[[], Awaitable[T]],
+                         describe: Callable[[Exception], Optional[str]],
+                         retryable: Tuple[str, ...] = RETRYABLE_ERRORS) -> T:
+        """call 的协程版本，等待期间不阻塞事件循环"""
+        attempt = 0
+        while True:
+            await self._wait_for_breaker_async()
+            attempt += 1
+            try:
+                result = await func()
+            except Exception as e:
+                kind = describe(e)
+                if kind is None:
+                    # 与备忘录响应无关的错误，不计入熔断但释放可能占用的试探名额
+                    self._on_success()
+                    raise
+                if not self._should_retry(kind, attempt, retryable):
+                    raise
+                await asyncio.sleep(self.backoff_delay(attempt))
+                continue
+            self._on_success()
+            return result
+    
+    def _wait_for_breaker(self):
+        """熔断器打开时暂停，直到允许调用"""
+        if self.breaker is None:
+            return
+        while True:
+            delay = self.breaker.wait_time()
+            if delay <= 0:
+                return
+            with self._stats_lock:
+                self._paused_seconds += delay
+            time.sleep(delay)
+    
+    async def _wait_for_breaker_async(self):
+        """熔断器打开时暂停（协程版本）"""
+        if self.breaker is None:
+            return
+        while True:
+            delay = self.breaker.wait_time()
+            if delay <= 0:
+                return
+            with self._stats_lock:
+                self._paused_seconds += delay
+            await asyncio.sleep(delay)
+    
+    def _should_retry(self, kind: str, attempt: int,
+                      retryable_kinds: Tuple[str, ...] = RETRYABLE_ERRORS) -> bool:
+        """记录一次失败并判断是否重试"""
+        stalled = kind in RETRYABLE_ERRORS
+        retryable = kind in retryable_kinds
+        with self._stats_lock:
+            self._errors[kind] = self._errors.get(kind, 0) + 1
+            if retryable and attempt < self.max_attempts:
+                self._retries += 1
+        
+        if self.breaker is not None:
+            if stalled:
+                self.breaker.record_failure()
+            else:
+                # 备忘录有响应（只是请求本身失败），不计入熔断
+                self.breaker.record_success()
+        
+        if kind == ERROR_PERMISSION:
+            logger.error("🔒 没有控制备忘录的权限，请在 系统设置 > 隐私与安全性 > 自动化 中允许终端控制备忘录")
+        if retryable and attempt < self.max_attempts:
+            logger.warning(f"🔁 脚本执行失败（{kind}），第 {attempt} 次重试")
+            return True
+        return False
+    
+    def _on_success(self):
+        """记录一次成功调用"""
+        if self.breaker is not None:
+            self.breaker.record_success()
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        获取累计统计，用于同步统计
+        
+        Returns:
+            包含重试次数、各类错误次数、熔断次数和暂停秒数的字典
+        """
+        with self._stats_lock:
+            return {
+                'retries': self._retries,
+                'errors': dict(self._errors),
+                'breaker_state': self.breaker.state if self.breaker else None,
+                'breaker_opened': self.breaker.open_count - self._open_count_base if self.breaker else 0,
+                'paused_seconds': self._paused_seconds
+            }
+    
+    def reset_stats(self):
+        """清空累计的统计"""
+        with self._stats_lock:
+            self._retries = 0
+            self._errors: Dict[str, int] = {}
+            self._paused_seconds = 0.0
+            self._open_count_base = self.breaker.open_count if self.breaker else 0
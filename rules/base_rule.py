@@ -15,6 +15,9 @@ logger = logging.getLogger(__name__)
 class SyncRule(ABC):
     """同步规则基类"""
     
+    # execute 是否读取备忘录（存在性检查等）；批量同步时只有推迟执行的规则需要读取时才加载快照
+    reads_notes = True
+    
     def __init__(self, name: str, priority: int = 0, enabled: bool = True):
         """
         初始化同步规则
@@ -64,6 +67,32 @@ class SyncRule(ABC):
         """
         pass
     
+    def build_operation(self, md_file: Path, config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        生成可批量执行的写入操作，供批量同步时合并为少量脚本调用
+        
+        Args:
+            md_file: MD文件路径
+            config: 配置字典
+            
+        Returns:
+            AppleScriptBridge.apply_batch 接受的操作字典；返回None时改为调用execute
+        """
+        return None
+    
+    def supports_batch(self) -> bool:
+        """
+        判断 build_operation 是否可以代替 execute：子类只重写了 execute、沿用父类的 build_operation 时，
+        批量生成的操作会绕过重写的 execute，这种规则始终直接调用 execute
+        
+        Returns:
+            build_operation 与 execute 定义在同一个类或更下层的子类中时返回True
+        """
+        mro = type(self).__mro__
+        execute_owner = next(klass for klass in mro if 'execute' in vars(klass))
+        build_owner = next(klass for klass in mro if 'build_operation' in vars(klass))
+        return issubclass(build_owner, execute_owner)
+    
     def get_title(self, md_file: Path, config: Dict[str, Any]) -> str:
         """
         获取备忘录标题
@@ -6,7 +6,7 @@
 """
 
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .base_rule import SyncRule
 
 class UpdateExistingRule(SyncRule):
@@ -23,6 +23,19 @@ class UpdateExistingRule(SyncRule):
         # 检查是否启用自动更新
         return config.get('sync_rules', {}).get('auto_update', True)
     
+    def build_operation(self, md_file: Path, config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """批量同步时生成upsert操作，被忽略或超限的文件交给execute处理"""
+        if self.should_ignore_file(md_file, config) or not self.check_file_size(md_file, config):
+            return None
+        
+        return {
+            'action': 'upsert',
+            'title': self.get_title(md_file, config),
+            'content': self.get_content(md_file, config),
+            'folder': self.get_folder(md_file, config),
+            'source_path': str(md_file)
+        }
+    
     def execute(self, md_file: Path, apple_bridge, config: Dict[str, Any]) -> bool:
         """执行更新或创建操作"""
         if self.should_ignore_file(md_file, config):
@@ -36,19 +49,13 @@ class UpdateExistingRule(SyncRule):
         content = self.get_content(md_file, config)
         folder = self.get_folder(md_file, config)
         
-        # 检查备忘录是否已存在
-        if apple_bridge.note_exists(title, folder):
-            # 更新现有备忘录
-            success = apple_bridge.update_note(title, content, folder)
-            if success:
-                self.logger.info(f"🔄 更新备忘录: {title}")
-            return success
-        else:
-            # 创建新备忘录
-            success = apple_bridge.create_note(title, content, folder)
-            if success:
-                self.logger.info(f"📝 创建备忘录: {title}")
-            return success
+        # 一次往返完成存在性检查与更新/创建
+        result = apple_bridge.upsert_note(title, content, folder, source_path=str(md_file))
+        if result == "updated":
+            self.logger.info(f"🔄 更新备忘录: {title}")
+        elif result == "created":
+            self.logger.info(f"📝 创建备忘录: {title}")
+        return result is not None
 
 class CreateNewRule(SyncRule):
     """仅创建新备忘录规则（不更新已存在的）"""
@@ -75,7 +82,7 @@ class CreateNewRule(SyncRule):
         
         # 只有当备忘录不存在时才创建
         if not apple_bridge.note_exists(title, folder):
-            success = apple_bridge.create_note(title, content, folder)
+            success = apple_bridge.create_note(title, content, folder, source_path=str(md_file))
             if success:
                 self.logger.info(f"📝 创建新备忘录: {title}")
             return success
@@ -93,6 +100,20 @@ class ForceCreateRule(SyncRule):
         """总是应用此规则"""
         return self.enabled
     
+    def build_operation(self, md_file: Path, config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """批量同步时生成创建操作，被忽略或超限的文件交给execute处理"""
+        if self.should_ignore_file(md_file, config) or not self.check_file_size(md_file, config):
+            return None
+        
+        return {
+            'action': 'create',
+            'title': self.get_title(md_file, config),
+            'content': self.get_content(md_file, config),
+            'folder': self.get_folder(md_file, config),
+            'source_path': str(md_file),
+            'create_folders': False
+        }
+    
     def execute(self, md_file: Path, apple_bridge, config: Dict[str, Any]) -> bool:
         """强制创建新备忘录"""
         if self.should_ignore_file(md_file, config):
@@ -115,6 +136,8 @@ class ForceCreateRule(SyncRule):
 class FileTypeRule(SyncRule):
     """文件类型过滤规则"""
     
+    reads_notes = False
+    
     def __init__(self, allowed_extensions: list = None, priority: int = 90):
         super().__init__("文件类型过滤", priority)
         self.allowed_extensions = allowed_extensions or ['.md', '.markdown', '.txt']
@@ -150,7 +173,7 @@ class BackupRule(SyncRule):
         
         # 如果备忘录存在，先备份
         if apple_bridge.note_exists(title, folder):
-            note_info = apple_bridge.get_note_info(title, folder)
+            note_info = apple_bridge.get_note_info(title, folder, source_path=str(md_file))
             if note_info:
                 from datetime import datetime
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -190,7 +213,14 @@ class DryRunRule(SyncRule):
         title = self.get_title(md_file, config)
         folder = self.get_folder(md_file, config)
         
-        if apple_bridge.note_exists(title, folder):
+        # 批量同步时优先使用已加载的快照索引，避免逐个文件发送存在性脚本
+        index = getattr(apple_bridge, 'snapshot_index', None)
+        if index is not None:
+            exists = index.has_note(folder, title)
+        else:
+            exists = apple_bridge.note_exists(title, folder)
+        
+        if exists:
             print(f"🔄 [DRY RUN] 会更新备忘录: {title} (文件夹: {folder})")
         else:
             print(f"📝 [DRY RUN] 会创建备忘录: {title} (文件夹: {folder})")
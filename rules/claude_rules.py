@@ -6,7 +6,7 @@ Claude专用同步规则
 """
 
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import re
 from .base_rule import SyncRule
 from utils import get_project_name_from_path, get_claude_folder_path
@@ -103,6 +103,8 @@ class ClaudeProjectMappingRule(SyncRule):
 class ClaudeTitleRule(SyncRule):
     """Claude文档标题规则"""
     
+    reads_notes = False
+    
     def __init__(self, priority: int = 85):
         super().__init__("Claude文档标题规则", priority)
     
@@ -125,6 +127,8 @@ class ClaudeTitleRule(SyncRule):
 class ClaudeContentRule(SyncRule):
     """Claude文档内容增强规则"""
     
+    reads_notes = False
+    
     def __init__(self, priority: int = 85):
         super().__init__("Claude内容增强", priority)
     
@@ -197,6 +201,21 @@ class ClaudeAutoSyncRule(SyncRule):
         
         return True
     
+    def build_operation(self, md_file: Path, config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        批量同步时生成操作：自动更新时为upsert，否则总是创建，目标文件夹不存在时自动创建
+        """
+        auto_update = config.get('sync_rules', {}).get('auto_update', True)
+        
+        return {
+            'action': 'upsert' if auto_update else 'create',
+            'title': ClaudeTitleRule().get_title(md_file, config),
+            'content': ClaudeContentRule().get_content(md_file, config),
+            'folder': ClaudeProjectMappingRule().get_folder(md_file, config),
+            'source_path': str(md_file),
+            'create_folders': True
+        }
+    
     def execute(self, md_file: Path, apple_bridge, config: Dict[str, Any]) -> bool:
         """
         执行Claude完整同步流程
@@ -205,17 +224,10 @@ class ClaudeAutoSyncRule(SyncRule):
         3. 执行同步
         """
         try:
-            # 1. 获取目标文件夹并确保存在
+            # 1. 获取目标文件夹
             folder_mapping_rule = ClaudeProjectMappingRule()
             folder_name = folder_mapping_rule.get_folder(md_file, config)
             
-            # 检查嵌套文件夹是否存在并创建
-            folder_parts = [part.strip() for part in folder_name.split('/') if part.strip()]
-            if not apple_bridge._folder_exists_at_path(folder_parts):
-                if not apple_bridge.create_folder(folder_name):
-                    self.logger.error(f"❌ 创建文件夹失败: {folder_name}")
-                    return False
-            
             # 2. 生成标题
             title_rule = ClaudeTitleRule()
             title = title_rule.get_title(md_file, config)
@@ -227,16 +239,23 @@ class ClaudeAutoSyncRule(SyncRule):
             # 4. 执行同步
             auto_update = config.get('sync_rules', {}).get('auto_update', True)
             
-            if auto_update and apple_bridge.note_exists(title, folder_name):
-                # 更新已存在的备忘录
-                success = apple_bridge.update_note(title, content, folder_name)
-                if success:
+            if auto_update:
+                # 文件夹确保、查找与更新/创建在一次脚本调用中完成
+                result = apple_bridge.upsert_note(title, content, folder_name, source_path=str(md_file))
+                if result == "updated":
                     self.logger.info(f"🔄 更新Claude文档: {title}")
-            else:
-                # 创建新备忘录
-                success = apple_bridge.create_note(title, content, folder_name)
-                if success:
+                elif result == "created":
                     self.logger.info(f"📝 创建Claude文档: {title}")
+                return result is not None
+            
+            # 不自动更新时总是创建新备忘录
+            if not apple_bridge.create_folder(folder_name):
+                self.logger.error(f"❌ 创建文件夹失败: {folder_name}")
+                return False
+            
+            success = apple_bridge.create_note(title, content, folder_name, source_path=str(md_file))
+            if success:
+                self.logger.info(f"📝 创建Claude文档: {title}")
             
             return success
             
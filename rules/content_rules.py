@@ -13,6 +13,8 @@ from .base_rule import SyncRule
 class TitlePrefixRule(SyncRule):
     """标题前缀规则"""
     
+    reads_notes = False
+    
     def __init__(self, prefix_map: Dict[str, str] = None, priority: int = 85):
         """
         Args:
@@ -54,6 +56,8 @@ class TitlePrefixRule(SyncRule):
 class ContentFilterRule(SyncRule):
     """内容过滤规则"""
     
+    reads_notes = False
+    
     def __init__(self, 
                  required_patterns: List[str] = None,
                  excluded_patterns: List[str] = None,
@@ -102,6 +106,8 @@ class ContentFilterRule(SyncRule):
 class SizeLimitRule(SyncRule):
     """文件大小限制规则"""
     
+    reads_notes = False
+    
     def __init__(self, max_size_mb: float = None, min_size_bytes: int = 10, priority: int = 90):
         """
         Args:
@@ -146,6 +152,8 @@ class SizeLimitRule(SyncRule):
 class FolderMappingRule(SyncRule):
     """智能文件夹映射规则"""
     
+    reads_notes = False
+    
     def __init__(self, priority: int = 85):
         super().__init__("智能文件夹映射", priority)
     
@@ -211,6 +219,8 @@ class FolderMappingRule(SyncRule):
 class HeaderExtractorRule(SyncRule):
     """从Markdown标题提取备忘录标题规则"""
     
+    reads_notes = False
+    
     def __init__(self, priority: int = 85):
         super().__init__("从内容提取标题", priority)
     
@@ -257,6 +267,8 @@ class HeaderExtractorRule(SyncRule):
 class MetadataRule(SyncRule):
     """Markdown元数据处理规则"""
     
+    reads_notes = False
+    
     def __init__(self, priority: int = 85):
         super().__init__("元数据处理", priority)
     
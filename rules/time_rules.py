@@ -140,6 +140,8 @@ class CreatedSinceRule(SyncRule):
 class NotModifiedRecentlyRule(SyncRule):
     """排除最近修改的文件规则（用于避免频繁同步）"""
     
+    reads_notes = False
+    
     def __init__(self, exclude_minutes: int = 5, priority: int = 85):
         """
         Args:
@@ -176,6 +178,8 @@ class NotModifiedRecentlyRule(SyncRule):
 class WeekdayOnlyRule(SyncRule):
     """仅工作日同步规则"""
     
+    reads_notes = False
+    
     def __init__(self, priority: int = 75):
         super().__init__("仅工作日同步", priority)
     
@@ -200,6 +204,8 @@ class WeekdayOnlyRule(SyncRule):
 class BusinessHoursRule(SyncRule):
     """仅工作时间同步规则"""
     
+    reads_notes = False
+    
     def __init__(self, start_hour: int = 9, end_hour: int = 18, priority: int = 75):
         """
         Args:
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模拟延迟的备忘录后端
+状态保存在内存中（复用SQLite后端的定位规则），每次调用按可配置的延迟模型等待：
+固定的调用开销、按正文KB计的开销、与文件夹中备忘录数成正比的查找开销以及偶发的卡顿。
+用于在1万~10万条备忘录的规模下评估批量写入、常驻进程池和并发策略，而不需要真实的Mac
+"""
+
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlite_backend import SQLiteNotesBackend
+from notes_index import NotesIndex, normalize_folder_path
+from note_manifest import NoteManifest
+from concurrency import AdaptiveConcurrencyLimiter
+
+logger = logging.getLogger(__name__)
+
+class LatencyModel:
+    """脚本调用的延迟模型"""
+    
+    def __init__(self, call_seconds: float = 0.2, call_jitter: float = 0.3,
+                 spawn_seconds: float = 0.05, per_kb_seconds: float = 0.002,
+                 per_note_seconds: float = 0.0005, stall_probability: float = 0.0,
+                 stall_seconds: float = 10.0, seed: Optional[int] = None):
+        """
+        初始化延迟模型
+        
+        Args:
+            call_seconds: 备忘录处理一次调用的固定开销（对数正态分布的中位数）
+            call_jitter: 固定开销的对数正态分布sigma，0表示不抖动
+            spawn_seconds: 启动osascript进程的开销，不占用备忘录应用，可并行
+            per_kb_seconds: 正文每KB的开销
+            per_note_seconds: 按标题查找时文件夹中每条备忘录的开销
+            stall_probability: 单次调用出现卡顿的概率
+            stall_seconds: 卡顿的额外秒数
+            seed: 随机种子，固定后每次模拟的延迟序列相同
+        """
+        self.call_seconds = call_seconds
+        self.call_jitter = call_jitter
+        self.spawn_seconds = spawn_seconds
+        self.per_kb_seconds = per_kb_seconds
+        self.per_note_seconds = per_note_seconds
+        self.stall_probability = stall_probability
+        self.stall_seconds = stall_seconds
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def sample(self, payload_bytes: int = 0, notes_scanned: int = 0) -> Tuple[float, bool]:
+        """
+        采样一次调用在备忘录应用中的耗时
+        
+        Args:
+            payload_bytes: 传递的正文字节数
+            notes_scanned: 查找时需要遍历的备忘录数
+        
+        Returns:
+            (耗时秒数, 是否出现卡顿) 元组
+        """
+        with self._lock:
+            jitter = self._random.lognormvariate(0, self.call_jitter) if self.call_jitter > 0 else 1.0
+            stalled = self.stall_probability > 0 and self._random.random() < self.stall_probability
+        seconds = (self.call_seconds * jitter
+                   + payload_bytes / 1024 * self.per_kb_seconds
+                   + notes_scanned * self.per_note_seconds
+                   + (self.stall_seconds if stalled else 0.0))
+        return seconds, stalled
+
+class SimulatedNotesBackend(SQLiteNotesBackend):
+    """按延迟模型模拟耗时的内存备忘录后端，线程安全"""
+    
+    def __init__(self, account: str = "iCloud", default_folder: str = "Notes",
+                 manifest: Optional[NoteManifest] = None,
+                 latency: Optional[LatencyModel] = None,
+                 time_scale: float = 1.0, serialize: bool = True,
+                 max_batch_size: int = 50, max_batch_bytes: int = 4 * 1024 * 1024,
+                 concurrency: Optional[AdaptiveConcurrencyLimiter] = None):
+        """
+        初始化模拟后端
+        
+        Args:
+            account: 备忘录账户名
+            default_folder: 默认文件夹路径（初始化时自动创建）
+            manifest: 源文件到备忘录ID的清单
+            latency: 延迟模型，默认使用 LatencyModel 的默认参数
+            time_scale: 实际等待时间相对模型耗时的比例，0表示只累计模拟耗时而不等待
+            serialize: 是否像真实的备忘录应用一样一次只处理一个调用
+            max_batch_size: apply_batch 单次调用包含的最大操作数
+            max_batch_bytes: apply_batch 单次调用的最大正文字节数
+            concurrency: 自适应并发控制器，提供时 apply_batch 的各组调用并发执行
+        """
+        self.latency = latency or LatencyModel()
+        self.time_scale = max(0.0, time_scale)
+        self.serialize = serialize
+        self.max_batch_size = max_batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.concurrency = concurrency
+        self._app_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        self.reset_stats()
+        
+        with self._uncharged():
+            super().__init__(":memory:", account=account, default_folder=default_folder, manifest=manifest)
+    
+    @contextmanager
+    def _uncharged(self):
+        """在当前线程内暂停计费，用于批量调用内部和初始化"""
+        self._local.depth = getattr(self._local, 'depth', 0) + 1
+        try:
+            yield
+        finally:
+            self._local.depth -= 1
+    
+    def _charge(self, payload_bytes: int = 0, notes_scanned: int = 0):
+        """
+        按延迟模型模拟一次脚本调用的耗时
+        
+        Args:
+            payload_bytes: 传递的正文字节数
+            notes_scanned: 查找时需要遍历的备忘录数
+        """
+        if getattr(self._local, 'depth', 0):
+            return
+        
+        spawn = self.latency.spawn_seconds
+        if spawn and self.time_scale:
+            time.sleep(spawn * self.time_scale)
+        
+        app, stalled = self.latency.sample(payload_bytes, notes_scanned)
+        if self.serialize:
+            # 备忘录应用逐个处理Apple Event，并发调用在这里排队
+            wait_start = time.monotonic()
+            with self._app_lock:
+                queued = time.monotonic() - wait_start
+                if self.time_scale:
+                    time.sleep(app * self.time_scale)
+        else:
+            queued = 0.0
+            if self.time_scale:
+                time.sleep(app * self.time_scale)
+        
+        with self._stats_lock:
+            self._calls += 1
+            self._simulated_seconds += spawn + app
+            self._queued_seconds += queued
+            self._payload_bytes += payload_bytes
+            self._notes_scanned += notes_scanned
+            if stalled:
+                self._stalls += 1
+    
+    def _folder_size(self, folder: str) -> int:
+        """文件夹中的备忘录数（按标题查找的开销与之成正比）"""
+        with self._lock:
+            folder_pk = self._folder_pk(folder or self.default_folder)
+            if folder_pk is None:
+                return 0
+            return self._conn.execute('SELECT COUNT(*) FROM notes WHERE folder_pk = ?',
+                                      (folder_pk,)).fetchone()[0]
+    
+    def _total_notes(self) -> int:
+        """全部备忘录数"""
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM notes').fetchone()[0]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取累计的模拟统计
+        
+        Returns:
+            包含调用次数、模拟耗时（秒）、排队耗时、正文字节数、遍历备忘录数和卡顿次数的字典
+        """
+        with self._stats_lock:
+            return {
+                'calls': self._calls,
+                'simulated_seconds': self._simulated_seconds,
+                'queued_seconds': self._queued_seconds,
+                'payload_bytes': self._payload_bytes,
+                'notes_scanned': self._notes_scanned,
+                'stalls': self._stalls
+            }
+    
+    def reset_stats(self):
+        """清空累计的统计"""
+        with self._stats_lock:
+            self._calls = 0
+            self._simulated_seconds = 0.0
+            self._queued_seconds = 0.0
+            self._payload_bytes = 0
+            self._notes_scanned = 0
+            self._stalls = 0
+    
+    def populate(self, folder: str, count: int, body_bytes: int = 1024, title_prefix: str = "预置备忘录"):
+        """
+        不计耗时地预置大量备忘录，用于模拟大账户
+        
+        Args:
+            folder: 文件夹路径
+            count: 备忘录数
+            body_bytes: 每条正文的字节数
+            title_prefix: 标题前缀，标题形如 "预置备忘录 1"
+        """
+        body = "x" * body_bytes
+        with self._lock, self._conn:
+            folder_pk = self._ensure_folder(folder)
+            for i in range(1, count + 1):
+                self._insert_note(folder_pk, f"{title_prefix} {i}", body)
+        logger.info(f"已预置 {count} 条备忘录: {folder}")
+    
+    def note_exists(self, title: str, folder: str = None) -> bool:
+        """检查备忘录是否存在，加载了快照时不产生调用"""
+        folder = folder or self.default_folder
+        if self.snapshot_index is not None:
+            return self.snapshot_index.has_note(folder, title)
+        self._charge(notes_scanned=self._folder_size(folder))
+        return super().note_exists(title, folder)
+    
+    def create_note(self, title: str, content: str, folder: str = None,
+                    source_path: str = None) -> bool:
+        """创建备忘录"""
+        self._charge(payload_bytes=len(content.encode('utf-8')))
+        ok = super().create_note(title, content, folder, source_path=source_path)
+        if ok:
+            self._index_note(title, folder, source_path)
+        return ok
+    
+    def update_note(self, title: str, content: str, folder: str = None,
+                    source_path: str = None) -> bool:
+        """更新备忘录，未记录ID时按标题遍历文件夹"""
+        self._charge(payload_bytes=len(content.encode('utf-8')),
+                     notes_scanned=self._lookup_cost(folder, source_path))
+        return super().update_note(title, content, folder, source_path=source_path)
+    
+    def append_note(self, title: str, content: str, folder: str = None,
+                    source_path: str = None) -> bool:
+        """追加内容，只有追加的部分计入正文开销"""
+        self._charge(payload_bytes=len(content.encode('utf-8')),
+                     notes_scanned=self._lookup_cost(folder, source_path))
+        return super().append_note(title, content, folder, source_path=source_path)
+    
+    def upsert_note(self, title: str, content: str, folder: str = None,
+                    create_folders: bool = True, source_path: str = None) -> Optional[str]:
+        """存在则更新，不存在则创建"""
+        self._charge(payload_bytes=len(content.encode('utf-8')),
+                     notes_scanned=self._lookup_cost(folder, source_path))
+        status = super().upsert_note(title, content, folder, create_folders=create_folders,
+                                     source_path=source_path)
+        if status == "created":
+            self._index_note(title, folder, source_path)
+        return status
+    
+    def delete_note(self, title: str, folder: str = None, source_path: str = None) -> bool:
+        """删除备忘录"""
+        self._charge(notes_scanned=self._lookup_cost(folder, source_path))
+        ok = super().delete_note(title, folder, source_path=source_path)
+        if ok and self.snapshot_index is not None:
+            self.snapshot_index.remove_note(folder or self.default_folder, title)
+        return ok
+    
+    def get_folders(self) -> List[str]:
+        """获取全部文件夹路径"""
+        self._charge()
+        return super().get_folders()
+    
+    def create_folder(self, folder_path: str) -> bool:
+        """确保文件夹存在，加载了快照且文件夹已存在时不产生调用"""
+        if self.snapshot_index is not None and self.snapshot_index.has_folder(folder_path):
+            return True
+        self._charge()
+        ok = super().create_folder(folder_path)
+        if ok and self.snapshot_index is not None:
+            self.snapshot_index.add_folder(folder_path)
+        return ok
+    
+    def get_existing_notes(self, folder: str = None) -> List[str]:
+        """获取文件夹中的备忘录标题列表"""
+        self._charge(notes_scanned=self._folder_size(folder))
+        return super().get_existing_notes(folder)
+    
+    def count_notes_by_folder(self) -> Optional[Dict[str, int]]:
+        """一次调用统计各文件夹的备忘录数量，按文件夹数计入遍历开销"""
+        with self._uncharged():
+            counts = super().count_notes_by_folder()
+        self._charge(notes_scanned=len(counts))
+        return counts
+    
+    def get_note_info(self, title: str, folder: str = None,
+                      source_path: str = None) -> Optional[Dict[str, Any]]:
+        """获取备忘录详细信息，正文大小计入耗时"""
+        with self._uncharged():
+            info = super().get_note_info(title, folder, source_path=source_path)
+        body_bytes = len(info['body'].encode('utf-8')) if info else 0
+        self._charge(payload_bytes=body_bytes, notes_scanned=self._lookup_cost(folder, source_path))
+        return info
+    
+    def iter_notes(self, folder: str = None, include_body: bool = False,
+                   page_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """遍历文件夹中的备忘录，按一次流式读取计费"""
+        self._charge(notes_scanned=self._folder_size(folder))
+        yield from super().iter_notes(folder, include_body=include_body, page_size=page_size)
+    
+    def load_snapshot(self) -> Optional[NotesIndex]:
+        """
+        一次调用加载全量快照索引，耗时与备忘录总数成正比
+        
+        Returns:
+            快照索引
+        """
+        self._charge(notes_scanned=self._total_notes())
+        index = NotesIndex(self.account)
+        with self._lock:
+            for row in self._conn.execute(
+                "SELECT path FROM folders WHERE account = ? AND path != ''", (self.account,)
+            ):
+                index.add_folder(row['path'])
+            for row in self._conn.execute(
+                'SELECT notes.id, notes.title, notes.modification_date, folders.path FROM notes '
+                'JOIN folders ON notes.folder_pk = folders.pk WHERE folders.account = ?',
+                (self.account,)
+            ):
+                index.add_note(row['path'], row['title'], note_id=row['id'],
+                               modification_date=row['modification_date'])
+        self.snapshot_index = index
+        logger.info(f"📸 已加载模拟快照: {len(index)} 条备忘录")
+        return index
+    
+    def apply_batch(self, ops: List[Dict[str, Any]], max_batch_size: int = None,
+                    max_batch_bytes: int = None) -> List[Dict[str, Any]]:
+        """
+        批量执行操作，每组操作按一次脚本调用计费；配置了并发控制器时各组并发执行
+        
+        Args:
+            ops: 操作列表，格式见 AppleScriptBridge.apply_batch
+            max_batch_size: 单次调用的最大操作数，默认使用初始化参数
+            max_batch_bytes: 单次调用的最大正文字节数，默认使用初始化参数
+        
+        Returns:
+            与ops一一对应的结果列表
+        """
+        max_batch_size = max_batch_size or self.max_batch_size
+        max_batch_bytes = max_batch_bytes or self.max_batch_bytes
+        
+        chunks: List[List[int]] = []
+        chunk_bytes = 0
+        for index, op in enumerate(ops):
+            op_bytes = len(op.get('content', '').encode('utf-8'))
+            if not chunks or len(chunks[-1]) >= max_batch_size or \
+                    (chunks[-1] and chunk_bytes + op_bytes > max_batch_bytes):
+                chunks.append([])
+                chunk_bytes = 0
+            chunks[-1].append(index)
+            chunk_bytes += op_bytes
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(ops)
+        
+        def run_chunk(indices: List[int]):
+            chunk_ops = [ops[i] for i in indices]
+            start = time.monotonic()
+            if self.concurrency is not None:
+                self.concurrency.acquire()
+            try:
+                self._charge(
+                    payload_bytes=sum(len(op.get('content', '').encode('utf-8')) for op in chunk_ops),
+                    notes_scanned=sum(self._lookup_cost(op.get('folder'), op.get('source_path'))
+                                      for op in chunk_ops if op.get('action') != 'create')
+                )
+                with self._uncharged():
+                    chunk_results = super(SimulatedNotesBackend, self).apply_batch(chunk_ops)
+            finally:
+                if self.concurrency is not None:
+                    self.concurrency.release(time.monotonic() - start)
+            for i, result in zip(indices, chunk_results):
+                results[i] = result
+        
+        if self.concurrency is None or len(chunks) < 2:
+            for indices in chunks:
+                run_chunk(indices)
+        else:
+            with ThreadPoolExecutor(max_workers=self.concurrency.max_limit) as executor:
+                list(executor.map(run_chunk, chunks))
+        return results
+    
+    def _lookup_cost(self, folder: Optional[str], source_path: Optional[str]) -> int:
+        """定位备忘录需要遍历的备忘录数：清单中有ID时按ID直接定位，否则遍历文件夹"""
+        if self._resolve_note_id(source_path):
+            return 1
+        return self._folder_size(folder)
+    
+    def _index_note(self, title: str, folder: Optional[str], source_path: Optional[str]):
+        """把新建的备忘录加入已加载的快照"""
+        if self.snapshot_index is not None:
+            self.snapshot_index.add_note(normalize_folder_path(folder or self.default_folder), title,
+                                         note_id=self._resolve_note_id(source_path))
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite备忘录后端
+用本地SQLite文件模拟备忘录应用：支持嵌套文件夹、备忘录ID、创建/修改时间，
+同名备忘录的定位规则与AppleScript桥接一致。适合在没有Mac的环境中做基准测试、
+CI以及大规模同步实验
+"""
+
+import sqlite3
+import threading
+import logging
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from notes_backend import NotesBackend
+from notes_index import normalize_folder_path
+from note_manifest import NoteManifest
+
+logger = logging.getLogger(__name__)
+
+class SQLiteNotesBackend(NotesBackend):
+    """基于SQLite文件的备忘录后端"""
+    
+    def __init__(self, db_path: Union[str, Path], account: str = "iCloud",
+                 default_folder: str = "Notes", manifest: Optional[NoteManifest] = None):
+        """
+        初始化SQLite后端
+        
+        Args:
+            db_path: SQLite文件路径，使用 ":memory:" 表示仅保存在内存中
+            account: 备忘录账户名
+            default_folder: 默认文件夹路径（初始化时自动创建）
+            manifest: 源文件到备忘录ID的清单，为None时只能按标题定位备忘录
+        """
+        super().__init__(account, default_folder)
+        self.db_path = str(db_path)
+        if self.db_path != ":memory:":
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        
+        self.manifest = manifest
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA foreign_keys = ON')
+        self._create_schema()
+        self._store_id = self._get_store_id()
+        self.create_folder(default_folder)
+    
+    def _create_schema(self):
+        """创建数据表"""
+        with self._lock, self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                )
+            ''')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS folders (
+                    pk INTEGER PRIMARY KEY AUTOINCREMENT,
+                    account TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    parent_pk INTEGER REFERENCES folders (pk) ON DELETE CASCADE,
+                    UNIQUE (account, path)
+                )
+            ''')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS notes (
+                    pk INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id TEXT UNIQUE,
+                    folder_pk INTEGER NOT NULL REFERENCES folders (pk) ON DELETE CASCADE,
+                    title TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    creation_date TEXT NOT NULL,
+                    modification_date TEXT NOT NULL
+                )
+            ''')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_notes_folder_title ON notes (folder_pk, title)'
+            )
+    
+    def _get_store_id(self) -> str:
+        """获取（必要时生成）数据库的存储ID，用于构造备忘录ID"""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'store_id'").fetchone()
+            if row:
+                return row['value']
+            store_id = str(uuid.uuid4()).upper()
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('store_id', ?)", (store_id,))
+            return store_id
+    
+    def close(self):
+        """关闭数据库连接和清单"""
+        with self._lock:
+            self._conn.close()
+        if self.manifest is not None:
+            self.manifest.close()
+    
+    def note_exists(self, title: str, folder: str = None) -> bool:
+        """检查备忘录是否存在"""
+        with self._lock:
+            folder_pk = self._folder_pk(folder or self.default_folder)
+            if folder_pk is None:
+                return False
+            return self._find_note(folder_pk, title) is not None
+    
+    def create_note(self, title: str, content: str, folder: str = None,
+                    source_path: str = None) -> bool:
+        """在已存在的文件夹中创建新备忘录"""
+        folder = folder or self.default_folder
+        with self._lock, self._conn:
+            folder_pk = self._folder_pk(folder)
+            if folder_pk is None:
+                logger.error(f"❌ 创建备忘录失败: {title} - 文件夹不存在: {folder}")
+                return False
+            note_id = self._insert_note(folder_pk, title, content)
+        
+        logger.info(f"✅ 创建备忘录成功: {title}")
+        self._record_manifest(source_path, note_id, title, folder)
+        return True
+    
+    def update_note(self, title: str, content: str, folder: str = None,
+                    source_path: str = None) -> bool:
+        """更新已存在的备忘录"""
+        folder = folder or self.default_folder
+        with self._lock, self._conn:
+            folder_pk = self._folder_pk(folder)
+            note = self._find_note(folder_pk, title, self._resolve_note_id(source_path)) \
+                if folder_pk is not None else None
+            if note is None:
+                logger.error(f"❌ 更新备忘录失败: {title} - 备忘录不存在")
+                return False
+            self._update_body(note['pk'], content)
+        
+        logger.info(f"🔄 更新备忘录成功: {title}")
+        self._record_manifest(source_path, note['id'], title, folder)
+        return True
+    
+    def append_note(self, title: str, content: str, folder: str = None,
+                    source_path: str = None) -> bool:
+        """在正文末尾追加内容"""
+        folder = folder or self.default_folder
+        with self._lock, self._conn:
+            folder_pk = self._folder_pk(folder)
+            note = self._find_note(folder_pk, title, self._resolve_note_id(source_path)) \
+                if folder_pk is not None else None
+            if note is None:
+                logger.error(f"❌ 追加备忘录失败: {title} - 备忘录不存在")
+                return False
+            self._conn.execute(
+                'UPDATE notes SET body = body || ?, modification_date = ? WHERE pk = ?',
+                (content, datetime.now().isoformat(), note['pk'])
+            )
+        
+        logger.info(f"➕ 追加备忘录成功: {title}")
+        self._record_manifest(source_path, note['id'], title, folder)
+        return True
+    
+    def upsert_note(self, title: str, content: str, folder: str = None,
+                    create_folders: bool = True, source_path: str = None) -> Optional[str]:
+        """在一个事务中完成文件夹确保、查找与更新/创建"""
+        folder = folder or self.default_folder
+        with self._lock, self._conn:
+            folder_pk = self._ensure_folder(folder) if create_folders else self._folder_pk(folder)
+            if folder_pk is None:
+                logger.error(f"❌ 同步备忘录失败: {title} - 文件夹不存在: {folder}")
+                return None
+            
+            claimed = self.manifest.claimed_ids(normalize_folder_path(folder), title, source_path) \
+                if self.manifest is not None else []
+            note = self._find_note(folder_pk, title, self._resolve_note_id(source_path), claimed)
+            if note is None:
+                note_id = self._insert_note(folder_pk, title, content)
+                status = "created"
+            else:
+                self._update_body(note['pk'], content)
+                note_id = note['id']
+                status = "updated"
+        
+        icon = "✅" if status == "created" else "🔄"
+        logger.info(f"{icon} 同步备忘录成功({status}): {title}")
+        self._record_manifest(source_path, note_id, title, folder)
+        return status
+    
+    def delete_note(self, title: str, folder: str = None, source_path: str = None) -> bool:
+        """删除备忘录"""
+        folder = folder or self.default_folder
+        with self._lock, self._conn:
+            folder_pk = self._folder_pk(folder)
+            note = self._find_note(folder_pk, title, self._resolve_note_id(source_path)) \
+                if folder_pk is not None else None
+            if note is None:
+                logger.error(f"❌ 删除备忘录失败: {title} - 备忘录不存在")
+                return False
+            self._conn.execute('DELETE FROM notes WHERE pk = ?', (note['pk'],))
+        
+        logger.info(f"🗑️ 删除备忘录成功: {title}")
+        if self.manifest is not None and source_path:
+            self.manifest.remove(source_path)
+        return True
+    
+    def get_folders(self) -> List[str]:
+        """获取全部文件夹路径（包含嵌套文件夹）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM folders WHERE account = ? AND path != '' ORDER BY path",
+                (self.account,)
+            ).fetchall()
+        return [row['path'] for row in rows]
+    
+    def create_folder(self, folder_path: str) -> bool:
+        """逐级创建缺失的文件夹"""
+        if not normalize_folder_path(folder_path):
+            logger.error("文件夹路径为空")
+            return False
+        
+        with self._lock, self._conn:
+            self._ensure_folder(folder_path)
+        return True
+    
+    def get_existing_notes(self, folder: str = None) -> List[str]:
+        """获取文件夹中的备忘录标题列表"""
+        with self._lock:
+            folder_pk = self._folder_pk(folder or self.default_folder)
+            if folder_pk is None:
+                return []
+            rows = self._conn.execute(
+                'SELECT title FROM notes WHERE folder_pk = ? ORDER BY pk',
+                (folder_pk,)
+            ).fetchall()
+        return [row['title'] for row in rows]
+    
+    def count_notes_by_folder(self) -> Optional[Dict[str, int]]:
+        """用一次分组查询统计每个文件夹中的备忘录数量"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT folders.path, COUNT(notes.pk) AS note_count FROM folders '
+                'LEFT JOIN notes ON notes.folder_pk = folders.pk '
+                "WHERE folders.account = ? AND folders.path != '' "
+                'GROUP BY folders.pk ORDER BY folders.path',
+                (self.account,)
+            ).fetchall()
+        return {row['path']: row['note_count'] for row in rows}
+    
+    def get_note_info(self, title: str, folder: str = None,
+                      source_path: str = None) -> Optional[Dict[str, Any]]:
+        """获取备忘录详细信息"""
+        with self._lock:
+            folder_pk = self._folder_pk(folder or self.default_folder)
+            if folder_pk is None:
+                return None
+            note = self._find_note(folder_pk, title, self._resolve_note_id(source_path))
+        
+        if note is None:
+            return None
+        return {
+            'creation_date': note['creation_date'],
+            'modification_date': note['modification_date'],
+            'id': note['id'],
+            'body': note['body'],
+            'title': title
+        }
+    
+    def iter_notes(self, folder: str = None, include_body: bool = False,
+                   page_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """分页遍历文件夹中的备忘录，内存占用与备忘录总数无关"""
+        folder = normalize_folder_path(folder or self.default_folder)
+        columns = 'pk, id, title, creation_date, modification_date' + (', body' if include_body else '')
+        
+        with self._lock:
+            folder_pk = self._folder_pk(folder)
+        if folder_pk is None:
+            return
+        
+        last_pk = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f'SELECT {columns} FROM notes WHERE folder_pk = ? AND pk > ? ORDER BY pk LIMIT ?',
+                    (folder_pk, last_pk, page_size)
+                ).fetchall()
+            if not rows:
+                return
+            
+            for row in rows:
+                record = {
+                    'folder': folder,
+                    'name': row['title'],
+                    'id': row['id'],
+                    'creation_date': row['creation_date'],
+                    'modification_date': row['modification_date']
+                }
+                if include_body:
+                    record['body'] = row['body']
+                yield record
+            last_pk = rows[-1]['pk']
+    
+    def _folder_pk(self, folder: str) -> Optional[int]:
+        """查找文件夹主键，不存在返回None"""
+        row = self._conn.execute(
+            'SELECT pk FROM folders WHERE account = ? AND path = ?',
+            (self.account, normalize_folder_path(folder))
+        ).fetchone()
+        return row['pk'] if row else None
+    
+    def _ensure_folder(self, folder: str) -> int:
+        """逐级确保文件夹存在，返回最深一级的主键（调用方负责事务）"""
+        parts = normalize_folder_path(folder).split('/') if normalize_folder_path(folder) else []
+        parent_pk = self._root_pk()
+        for i, name in enumerate(parts):
+            path = "/".join(parts[:i + 1])
+            self._conn.execute(
+                'INSERT OR IGNORE INTO folders (account, path, name, parent_pk) VALUES (?, ?, ?, ?)',
+                (self.account, path, name, parent_pk)
+            )
+            parent_pk = self._folder_pk(path)
+        return parent_pk
+    
+    def _root_pk(self) -> int:
+        """账户根（空路径）对应的文件夹主键"""
+        self._conn.execute(
+            "INSERT OR IGNORE INTO folders (account, path, name, parent_pk) VALUES (?, '', ?, NULL)",
+            (self.account, self.account)
+        )
+        return self._folder_pk('')
+    
+    def _find_note(self, folder_pk: int, title: str, note_id: Optional[str] = None,
+                   claimed_ids: List[str] = None) -> Optional[sqlite3.Row]:
+        """
+        按ID（须位于该文件夹）或标题查找备忘录，按标题查找时跳过已被其他源文件占用的ID
+        """
+        if note_id:
+            row = self._conn.execute(
+                'SELECT * FROM notes WHERE id = ? AND folder_pk = ?',
+                (note_id, folder_pk)
+            ).fetchone()
+            if row:
+                return row
+        
+        claimed = set(claimed_ids or [])
+        for row in self._conn.execute(
+            'SELECT * FROM notes WHERE folder_pk = ? AND title = ? ORDER BY pk',
+            (folder_pk, title)
+        ):
+            if row['id'] not in claimed:
+                return row
+        return None
+    
+    def _insert_note(self, folder_pk: int, title: str, content: str) -> str:
+        """插入备忘录并生成与备忘录应用格式相同的ID（调用方负责事务）"""
+        now = datetime.now().isoformat()
+        cursor = self._conn.execute(
+            'INSERT INTO notes (folder_pk, title, body, creation_date, modification_date) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (folder_pk, title, content, now, now)
+        )
+        note_id = f"x-coredata://{self._store_id}/ICNote/p{cursor.lastrowid}"
+        self._conn.execute('UPDATE notes SET id = ? WHERE pk = ?', (note_id, cursor.lastrowid))
+        return note_id
+    
+    def _update_body(self, note_pk: int, content: str):
+        """更新正文和修改时间（调用方负责事务）"""
+        self._conn.execute(
+            'UPDATE notes SET body = ?, modification_date = ? WHERE pk = ?',
+            (content, datetime.now().isoformat(), note_pk)
+        )
+    
+    def _resolve_note_id(self, source_path: str = None) -> Optional[str]:
+        """从清单中查找源文件对应的备忘录ID"""
+        if self.manifest is None or not source_path:
+            return None
+        return self.manifest.get_note_id(source_path)
+    
+    def _record_manifest(self, source_path: Optional[str], note_id: str, title: str, folder: str):
+        """写入成功后记录源文件与备忘录ID的对应关系"""
+        if self.manifest is not None and source_path:
+            self.manifest.record(source_path, note_id, title, normalize_folder_path(folder))
@@ -5,14 +5,42 @@ MD文档同步引擎
 核心同步逻辑，管理规则和执行同步
 """
 
+import os
+import stat
+import asyncio
 import json
+import time
+import threading
 import logging
 import logging.handlers
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator
 from datetime import datetime
 
 from apple_bridge import AppleScriptBridge
+from async_bridge import AsyncAppleScriptBridge
+from notes_backend import NotesBackend
+from sqlite_backend import SQLiteNotesBackend
+from simulated_backend import SimulatedNotesBackend, LatencyModel
+from osascript_pool import OsascriptWorkerPool
+from note_manifest import NoteManifest
+from applescript_templates import CompiledScriptCache
+from concurrency import AdaptiveConcurrencyLimiter
+from resilience import ScriptRetrier, CircuitBreaker
+from note_splitter import NoteSplitter
+from note_delta import DeltaPlanner, body_hash
+from sync_manifest import SyncManifest, stat_signature
+from notes_index import NotesIndex, normalize_folder_path
+from markdown_converter import CONVERTER_VERSION
+from utils import generate_file_hash
+from notestore_reader import NoteStoreReader, DEFAULT_NOTESTORE_PATH
+from cassette import ScriptCassette, MODE_REPLAY, DEFAULT_CASSETTE_PATH
+from metrics import OperationMetrics
+from pipeline import StagedPipeline
+from sync_plan import (
+    SyncPlan, ACTION_CREATE, ACTION_UPDATE, ACTION_SKIP, ACTION_EXECUTE,
+    STATUS_PENDING, STATUS_UNCHANGED, STATUS_MISSING
+)
 from rules import (
     SyncRule, 
     UpdateExistingRule,
@@ -23,6 +51,9 @@ from rules import (
     ClaudeAutoSyncRule
 )
 
+# 流水线中每组签名比较的文件数
+_PIPELINE_CHUNK_SIZE = 256
+
 class MDSyncEngine:
     """MD文档同步引擎"""
     
@@ -40,12 +71,18 @@ class MDSyncEngine:
         self.setup_logging()
         self.logger = logging.getLogger(__name__)
         
-        # 初始化AppleScript桥接
+        # 初始化备忘录后端
         notes_config = self.config.get('notes_config', {})
-        self.apple_bridge = AppleScriptBridge(
-            account=notes_config.get('account', 'iCloud'),
-            default_folder=notes_config.get('default_folder', 'Notes')
-        )
+        self.concurrency_limiter = self._create_concurrency_limiter(notes_config)
+        self.script_retrier = self._create_script_retrier(notes_config)
+        self.operation_metrics = OperationMetrics() if notes_config.get('metrics', True) else None
+        self.backend = self._create_backend(notes_config)
+        self.note_splitter = self._create_note_splitter(notes_config)
+        self.delta_planner = self._create_delta_planner(notes_config)
+        self.sync_manifest = self._create_sync_manifest(notes_config)
+        # 本次批量同步中因正文未变化而省去的写入数
+        self._unchanged_writes = 0
+        self._unchanged_lock = threading.Lock()
         
         # 初始化规则列表
         self.rules: List[SyncRule] = []
@@ -86,12 +123,108 @@ class MDSyncEngine:
                 }
             },
             "notes_config": {
+                "backend": "applescript",
+                "sqlite_path": "notes.db",
+                "simulation": {
+                    "time_scale": 1.0,
+                    "serialize": True,
+                    "seed": None,
+                    "call_seconds": 0.2,
+                    "call_jitter": 0.3,
+                    "spawn_seconds": 0.05,
+                    "per_kb_seconds": 0.002,
+                    "per_note_seconds": 0.0005,
+                    "stall_probability": 0.0,
+                    "stall_seconds": 10.0,
+                    "preload_notes": 0,
+                    "preload_folder": None,
+                    "preload_body_bytes": 1024
+                },
                 "account": "iCloud",
                 "default_folder": "Notes",
                 "title_prefix": "",
                 "title_suffix": "",
                 "add_timestamp": False,
-                "add_source_path": True
+                "add_source_path": True,
+                "snapshot_threshold": 5,
+                "use_note_manifest": True,
+                "body_transport": "inline",
+                "precompiled_scripts": False,
+                "read_protocol": "text",
+                "cache_folders": True,
+                "metrics": True,
+                "info_cache": {
+                    "enabled": False,
+                    "ttl_seconds": 300
+                },
+                "script_timeout": 30,
+                "timeout_per_mb": 10,
+                "read_store": {
+                    "enabled": False,
+                    "path": DEFAULT_NOTESTORE_PATH
+                },
+                "cassette": {
+                    "mode": None,
+                    "path": DEFAULT_CASSETTE_PATH,
+                    "time_scale": 1.0
+                },
+                "split_notes": {
+                    "enabled": True,
+                    "max_part_bytes": 100000
+                },
+                "delta_updates": {
+                    "enabled": True,
+                    "min_prefix_chars": 0
+                },
+                "sync_manifest": {
+                    "enabled": True,
+                    "rehash_interval_hours": 0
+                },
+                "pipeline": {
+                    "enabled": True,
+                    "stat_workers": 4,
+                    "convert_workers": 4,
+                    "queue_size": 256
+                },
+                "async": {
+                    "max_in_flight": 4,
+                    "max_pending_files": 16,
+                    "script_timeout": 30
+                },
+                "adaptive_concurrency": {
+                    "enabled": True,
+                    "initial_limit": 2,
+                    "min_limit": 1,
+                    "max_limit": 8,
+                    "target_p95_seconds": 5.0,
+                    "decrease_factor": 0.5,
+                    "window": 50
+                },
+                "retry": {
+                    "enabled": True,
+                    "max_attempts": 3,
+                    "base_delay_seconds": 0.5,
+                    "max_delay_seconds": 8.0,
+                    "breaker_failure_threshold": 5,
+                    "breaker_reset_seconds": 30
+                },
+                "batch_writes": {
+                    "enabled": True,
+                    "max_batch_size": 50,
+                    "max_payload_bytes": 4194304
+                },
+                "worker_pool": {
+                    "enabled": False,
+                    "size": 2,
+                    "runner_command": None,
+                    "request_timeout": 30,
+                    "max_requests_per_worker": 500,
+                    "max_worker_age_seconds": 600,
+                    "health_check_interval": 60
+                }
+            },
+            "state": {
+                "directory": ".mindsync"
             },
             "logging": {
                 "level": "INFO",
@@ -102,6 +235,406 @@ class MDSyncEngine:
             }
         }
     
+    @property
+    def apple_bridge(self) -> NotesBackend:
+        """兼容旧属性名，返回当前备忘录后端"""
+        return self.backend
+    
+    def _create_backend(self, notes_config: Dict[str, Any]) -> NotesBackend:
+        """
+        根据 notes_config.backend 创建备忘录后端
+        
+        Args:
+            notes_config: notes_config 配置
+            
+        Returns:
+            "applescript"（默认）返回AppleScript桥接，"sqlite" 返回本地SQLite后端，
+            "simulated" 返回按 notes_config.simulation 模拟延迟的内存后端
+        """
+        backend = notes_config.get('backend', 'applescript')
+        account = notes_config.get('account', 'iCloud')
+        default_folder = notes_config.get('default_folder', 'Notes')
+        
+        if backend == 'sqlite':
+            db_path = Path(notes_config.get('sqlite_path', 'notes.db')).expanduser()
+            if not db_path.is_absolute():
+                db_path = self.get_state_dir() / db_path
+            self.logger.info(f"使用SQLite备忘录后端: {db_path}")
+            return SQLiteNotesBackend(
+                db_path,
+                account=account,
+                default_folder=default_folder,
+                manifest=self._create_note_manifest(notes_config)
+            )
+        
+        if backend == 'simulated':
+            return self._create_simulated_backend(notes_config)
+        
+        if backend != 'applescript':
+            raise ValueError(f"不支持的备忘录后端: {backend}")
+        
+        cassette = self._create_cassette(notes_config)
+        replaying = cassette is not None and cassette.mode == MODE_REPLAY
+        
+        # 预编译模板会让所有操作改走模板并经临时文件传递正文，需要显式启用；编译结果放在状态目录
+        script_cache = None
+        if notes_config.get('precompiled_scripts', False):
+            script_cache = CompiledScriptCache(self.get_state_dir() / 'compiled_scripts')
+        
+        return AppleScriptBridge(
+            account=account,
+            default_folder=default_folder,
+            worker_pool=self._create_worker_pool(notes_config.get('worker_pool', {})),
+            manifest=self._create_note_manifest(notes_config),
+            body_transport=notes_config.get('body_transport', 'inline'),
+            script_cache=script_cache,
+            read_protocol=notes_config.get('read_protocol', 'text'),
+            max_batch_size=notes_config.get('batch_writes', {}).get('max_batch_size', 50),
+            max_batch_bytes=notes_config.get('batch_writes', {}).get('max_payload_bytes', 4 * 1024 * 1024),
+            cache_folders=notes_config.get('cache_folders', True),
+            concurrency=self.concurrency_limiter,
+            retrier=self.script_retrier,
+            script_timeout=notes_config.get('script_timeout', 30),
+            timeout_per_mb=notes_config.get('timeout_per_mb', 10),
+            # 回放时所有读取都来自录制文件，不查询本机的备忘录数据库
+            read_store=None if replaying else self._create_read_store(notes_config),
+            cassette=cassette,
+            metrics=self.operation_metrics
+        )
+    
+    def _create_simulated_backend(self, notes_config: Dict[str, Any]) -> SimulatedNotesBackend:
+        """
+        根据 notes_config.simulation 创建模拟延迟的内存后端
+        
+        Args:
+            notes_config: notes_config 配置
+            
+        Returns:
+            模拟后端实例
+        """
+        sim_config = notes_config.get('simulation', {})
+        # 常驻进程池省去了每次调用启动osascript的开销
+        pooled = notes_config.get('worker_pool', {}).get('enabled', False)
+        latency = LatencyModel(
+            call_seconds=sim_config.get('call_seconds', 0.2),
+            call_jitter=sim_config.get('call_jitter', 0.3),
+            spawn_seconds=0.0 if pooled else sim_config.get('spawn_seconds', 0.05),
+            per_kb_seconds=sim_config.get('per_kb_seconds', 0.002),
+            per_note_seconds=sim_config.get('per_note_seconds', 0.0005),
+            stall_probability=sim_config.get('stall_probability', 0.0),
+            stall_seconds=sim_config.get('stall_seconds', 10.0),
+            seed=sim_config.get('seed')
+        )
+        backend = SimulatedNotesBackend(
+            account=notes_config.get('account', 'iCloud'),
+            default_folder=notes_config.get('default_folder', 'Notes'),
+            manifest=self._create_note_manifest(notes_config),
+            latency=latency,
+            time_scale=sim_config.get('time_scale', 1.0),
+            serialize=sim_config.get('serialize', True),
+            max_batch_size=notes_config.get('batch_writes', {}).get('max_batch_size', 50),
+            max_batch_bytes=notes_config.get('batch_writes', {}).get('max_payload_bytes', 4 * 1024 * 1024),
+            concurrency=self.concurrency_limiter
+        )
+        
+        preload = sim_config.get('preload_notes', 0)
+        if preload:
+            backend.populate(sim_config.get('preload_folder') or backend.default_folder, preload,
+                             sim_config.get('preload_body_bytes', 1024))
+        self.logger.info("使用模拟延迟的备忘录后端")
+        return backend
+    
+    def _create_cassette(self, notes_config: Dict[str, Any]) -> Optional[ScriptCassette]:
+        """
+        根据 notes_config.cassette 创建脚本录制文件
+        
+        Args:
+            notes_config: notes_config 配置
+            
+        Returns:
+            mode 为 "record" 或 "replay" 时返回录制文件，否则按环境变量创建（未设置时为None）
+        """
+        cassette_config = notes_config.get('cassette', {})
+        mode = cassette_config.get('mode')
+        if not mode:
+            return ScriptCassette.from_env()
+        
+        path = Path(cassette_config.get('path', DEFAULT_CASSETTE_PATH)).expanduser()
+        if not path.is_absolute():
+            path = self.get_state_dir() / path
+        self.logger.info(f"📼 脚本调用{'回放' if mode == MODE_REPLAY else '录制'}: {path}")
+        return ScriptCassette(path, mode, cassette_config.get('time_scale', 1.0))
+    
+    def _create_read_store(self, notes_config: Dict[str, Any]) -> Optional[NoteStoreReader]:
+        """
+        根据 notes_config.read_store 创建备忘录数据库只读查询器
+        
+        Args:
+            notes_config: notes_config 配置
+            
+        Returns:
+            查询器实例，未启用时返回None
+        """
+        store_config = notes_config.get('read_store', {})
+        if not store_config.get('enabled', False):
+            return None
+        
+        self.logger.info("读取操作直接查询备忘录数据库（只读）")
+        return NoteStoreReader(
+            store_config.get('path', DEFAULT_NOTESTORE_PATH),
+            account=notes_config.get('account', 'iCloud')
+        )
+    
+    def _create_concurrency_limiter(self, notes_config: Dict[str, Any]) -> Optional[AdaptiveConcurrencyLimiter]:
+        """
+        根据 notes_config.adaptive_concurrency 创建自适应并发控制器
+        
+        Args:
+            notes_config: notes_config 配置
+            
+        Returns:
+            控制器实例，未启用时返回None
+        """
+        limiter_config = notes_config.get('adaptive_concurrency', {})
+        if not limiter_config.get('enabled', True):
+            return None
+        
+        return AdaptiveConcurrencyLimiter(
+            initial_limit=limiter_config.get('initial_limit', 2),
+            min_limit=limiter_config.get('min_limit', 1),
+            max_limit=limiter_config.get('max_limit', 8),
+            target_p95=limiter_config.get('target_p95_seconds', 5.0),
+            decrease_factor=limiter_config.get('decrease_factor', 0.5),
+            window=limiter_config.get('window', 50)
+        )
+    
+    def _create_note_splitter(self, notes_config: Dict[str, Any]) -> Optional[NoteSplitter]:
+        """
+        根据 notes_config.split_notes 创建超大备忘录拆分器
+        
+        Args:
+            notes_config: notes_config 配置
+            
+        Returns:
+            拆分器实例，未启用时返回None
+        """
+        split_config = notes_config.get('split_notes', {})
+        if not split_config.get('enabled', True):
+            return None
+        
+        return NoteSplitter(
+            max_part_bytes=split_config.get('max_part_bytes', 100000),
+            manifest=getattr(self.backend, 'manifest', None)
+        )
+    
+    def _create_delta_planner(self, notes_config: Dict[str, Any]) -> Optional[DeltaPlanner]:
+        """
+        根据 notes_config.delta_updates 创建只追加内容的增量规划器
+        
+        Args:
+            notes_config: notes_config 配置
+            
+        Returns:
+            增量规划器实例，未启用或没有备忘录清单时返回None
+        """
+        delta_config = notes_config.get('delta_updates', {})
+        manifest = getattr(self.backend, 'manifest', None)
+        if not delta_config.get('enabled', True) or manifest is None:
+            return None
+        
+        return DeltaPlanner(manifest, min_prefix_chars=delta_config.get('min_prefix_chars', 0))
+    
+    def _create_script_retrier(self, notes_config: Dict[str, Any]) -> Optional[ScriptRetrier]:
+        """
+        根据 notes_config.retry 创建脚本重试器和熔断器
+        
+        Args:
+            notes_config: notes_config 配置
+            
+        Returns:
+            重试器实例，未启用时返回None
+        """
+        retry_config = notes_config.get('retry', {})
+        if not retry_config.get('enabled', True):
+            return None
+        
+        return ScriptRetrier(
+            max_attempts=retry_config.get('max_attempts', 3),
+            base_delay=retry_config.get('base_delay_seconds', 0.5),
+            max_delay=retry_config.get('max_delay_seconds', 8.0),
+            breaker=CircuitBreaker(
+                failure_threshold=retry_config.get('breaker_failure_threshold', 5),
+                reset_timeout=retry_config.get('breaker_reset_seconds', 30)
+            )
+        )
+    
+    def _create_worker_pool(self, pool_config: Dict[str, Any]) -> Optional[OsascriptWorkerPool]:
+        """
+        根据配置创建常驻osascript进程池
+        
+        Args:
+            pool_config: notes_config.worker_pool 配置
+            
+        Returns:
+            进程池实例，未启用时返回None
+        """
+        if not pool_config.get('enabled', False):
+            return None
+        
+        return OsascriptWorkerPool(
+            size=pool_config.get('size', 2),
+            runner_command=pool_config.get('runner_command'),
+            request_timeout=pool_config.get('request_timeout', 30),
+            max_requests_per_worker=pool_config.get('max_requests_per_worker', 500),
+            max_worker_age=pool_config.get('max_worker_age_seconds', 600),
+            health_check_interval=pool_config.get('health_check_interval', 60)
+        )
+    
+    def get_state_dir(self) -> Path:
+        """
+        获取本地状态目录（清单、缓存等），相对路径以配置文件所在目录为基准
+        
+        Returns:
+            状态目录路径
+        """
+        state_dir = Path(self.config.get('state', {}).get('directory', '.mindsync')).expanduser()
+        if not state_dir.is_absolute():
+            state_dir = Path(self.config_path).absolute().parent / state_dir
+        return state_dir
+    
+    def _create_note_manifest(self, notes_config: Dict[str, Any]) -> Optional[NoteManifest]:
+        """
+        创建源文件到备忘录ID的清单
+        
+        Args:
+            notes_config: notes_config 配置
+            
+        Returns:
+            清单实例，未启用或创建失败时返回None
+        """
+        if not notes_config.get('use_note_manifest', True):
+            return None
+        
+        try:
+            return NoteManifest(self.get_state_dir() / 'manifest.db')
+        except Exception as e:
+            self.logger.warning(f"⚠️ 无法打开备忘录清单，退回按标题定位: {e}")
+            return None
+    
+    def _create_sync_manifest(self, notes_config: Dict[str, Any]) -> Optional[SyncManifest]:
+        """
+        创建记录已同步文件内容摘要的同步清单
+        
+        Args:
+            notes_config: notes_config 配置
+            
+        Returns:
+            同步清单实例，未启用或创建失败时返回None（每次都完整同步）
+        """
+        if not notes_config.get('sync_manifest', {}).get('enabled', True):
+            return None
+        
+        try:
+            return SyncManifest(self.get_state_dir() / 'sync_manifest.db')
+        except Exception as e:
+            self.logger.warning(f"⚠️ 无法打开同步清单，每次完整同步: {e}")
+            return None
+    
+    def _sync_fingerprint(self) -> str:
+        """
+        规则集（含各规则参数）、影响写入内容的配置和转换器版本的摘要，
+        任一变化时同步清单中的记录全部失效
+        """
+        notes_config = self.config.get('notes_config', {})
+        payload = {
+            'converter': CONVERTER_VERSION,
+            'rules': [[type(rule).__name__, {key: value for key, value in vars(rule).items() if key != 'logger'}]
+                      for rule in self.rules],
+            'sync_rules': self.config.get('sync_rules', {}),
+            'notes': {key: notes_config.get(key) for key in (
+                'backend', 'account', 'default_folder', 'title_prefix', 'title_suffix',
+                'add_timestamp', 'add_source_path', 'split_notes')}
+        }
+        return body_hash(json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str))
+    
+    def _filter_unchanged(self, file_paths: List[str], dry_run: bool = False) -> Tuple[List[str], List[str]]:
+        """
+        按同步清单筛出自上次成功同步后内容和规则都没有变化的文件。
+        先比较 (st_mtime_ns, st_size, st_ino) 签名，只有签名变化（或到了定期重新校验的时间）
+        的文件才读取内容计算摘要
+        
+        Args:
+            file_paths: 文件路径列表
+            dry_run: 是否只是试运行（试运行不跳过文件）
+            
+        Returns:
+            (需要同步的文件, 没有变化而跳过的文件) 元组，保持原有顺序
+        """
+        if self.sync_manifest is None or dry_run:
+            return list(file_paths), []
+        
+        manifest_config = self.config.get('notes_config', {}).get('sync_manifest', {})
+        rehash_seconds = manifest_config.get('rehash_interval_hours', 0) * 3600
+        fingerprint = self._sync_fingerprint()
+        records = self.sync_manifest.get_many(file_paths)
+        now = time.time()
+        
+        pending, unchanged = [], []
+        hashed = 0
+        for file_path in file_paths:
+            record = records.get(file_path)
+            if record is None or record['fingerprint'] != fingerprint:
+                pending.append(file_path)
+                continue
+            
+            try:
+                stat_result = os.stat(file_path)
+            except OSError:
+                pending.append(file_path)
+                continue
+            if not stat.S_ISREG(stat_result.st_mode):
+                pending.append(file_path)
+                continue
+            
+            signature = stat_signature(stat_result)
+            rehash_due = rehash_seconds > 0 and now - (record['hashed_at'] or 0) >= rehash_seconds
+            if signature == (record['st_mtime_ns'], record['st_size'], record['st_ino']) and not rehash_due:
+                unchanged.append(file_path)
+                continue
+            
+            hashed += 1
+            if generate_file_hash(file_path) == record['content_hash']:
+                # 只有修改时间等元数据变化，记录新的签名避免下次再读取
+                self.sync_manifest.record_signature(file_path, signature)
+                unchanged.append(file_path)
+            else:
+                pending.append(file_path)
+        
+        if hashed:
+            self.logger.debug(f"文件签名变化，重新计算了 {hashed} 个文件的摘要")
+        return pending, unchanged
+    
+    def reset_sync_manifest(self, file_paths: List[str] = None):
+        """
+        清除同步记录，下次同步时重新写入
+        
+        Args:
+            file_paths: 要清除的文件，为None时清空全部记录
+        """
+        if self.sync_manifest is None:
+            return
+        if file_paths is None:
+            self.sync_manifest.clear()
+        else:
+            for file_path in file_paths:
+                self.sync_manifest.remove(file_path)
+    
+    def close(self):
+        """释放引擎持有的资源"""
+        self.backend.close()
+        if self.sync_manifest is not None:
+            self.sync_manifest.close()
+    
     def setup_logging(self):
         """设置日志系统"""
         log_config = self.config.get('logging', {})
@@ -237,11 +770,24 @@ class MDSyncEngine:
         
         self.logger.info(f"开始同步文件: {md_file.name}")
         
+        if self._filter_unchanged([str(md_file)], dry_run)[1]:
+            self.logger.info(f"⏭️ 自上次同步后没有变化，跳过: {md_file.name}")
+            return True
+        
         # 设置试运行配置
         config = self.config.copy()
         if dry_run:
             config['dry_run'] = True
             self.logger.info("🔸 试运行模式")
+        elif (self.delta_planner is not None or self.sync_manifest is not None or
+              self.note_splitter is not None):
+            # 转换后超大的正文（或之前被拆分过的文件）在 _split_ops 中按部分写入，只在末尾增长的正文
+            # 只追加新增部分，写入成功后记录到同步清单；不支持批量的规则仍在 _plan_file 中调用 execute
+            ops, state = self._plan_file(md_file, config)
+            if ops:
+                for op, result in zip(ops, self._apply_ops(ops, batched=False)):
+                    self._record_op_result(op, result, state)
+            return self._file_outcome(str(md_file), state)
         
         # 应用所有规则
         success_count = 0
@@ -258,14 +804,15 @@ class MDSyncEngine:
                     
                     # 执行规则
                     if not dry_run:
-                        success = rule.execute(md_file, self.apple_bridge, config)
+                        success = rule.execute(md_file, self.backend, config)
                         if success:
+                            self._invalidate_notes_info()
                             success_count += 1
                         else:
                             self.logger.error(f"❌ 规则执行失败: {rule.name}")
                     else:
                         # 试运行模式
-                        rule.execute(md_file, self.apple_bridge, config)
+                        rule.execute(md_file, self.backend, config)
                         success_count += 1
                 
             except Exception as e:
@@ -288,6 +835,321 @@ class MDSyncEngine:
             self.logger.info(f"⏭️ 没有适用的规则: {md_file.name}")
             return True
     
+    def _sync_files_batched(self, file_paths: List[str], dry_run: bool = False) -> Dict[str, bool]:
+        """
+        批量写入模式：规则生成的写入操作汇总后交给 apply_batch，
+        同一文件夹的操作合并为少量脚本调用；不支持批量的规则仍直接执行
+        
+        Args:
+            file_paths: 文件路径列表
+            dry_run: 是否只是试运行（试运行不使用批量写入）
+            
+        Returns:
+            已处理文件路径到是否成功的映射，未包含的文件由调用方逐个同步
+        """
+        batch_config = self.config.get('notes_config', {}).get('batch_writes', {})
+        if dry_run or not batch_config.get('enabled', True) or len(file_paths) < 2:
+            return {}
+        
+        config = self.config.copy()
+        ops = []
+        op_owners = []
+        file_states = {}
+        
+        for file_path in file_paths:
+            md_file = Path(file_path)
+            if not md_file.is_file():
+                # 交给sync_file记录错误
+                continue
+            
+            file_ops, file_states[file_path] = self._plan_file(md_file, config)
+            ops.extend(file_ops)
+            op_owners.extend([file_path] * len(file_ops))
+        
+        if ops:
+            self.logger.info(f"📦 批量写入 {len(ops)} 个操作")
+            for owner, op, result in zip(op_owners, ops, self._apply_ops(ops)):
+                self._record_op_result(op, result, file_states[owner])
+        
+        return {file_path: self._file_outcome(file_path, state)
+                for file_path, state in file_states.items()}
+    
+    def _plan_file(self, md_file: Path, config: Dict[str, Any], defer_execute: bool = False):
+        """
+        对文件应用规则：支持批量的规则生成写入操作，其余规则（包括只重写了 execute 的子类）直接执行
+        
+        Args:
+            md_file: MD文件路径
+            config: 配置字典
+            defer_execute: 不支持批量的规则不在这里执行，而是放入状态字典的 deferred，
+                           由写入级调用 _execute_rule（流水线中只有写入级访问备忘录后端）
+            
+        Returns:
+            (待执行的操作列表, 状态字典) 元组。状态字典包含 applied、success_count、
+            failed（失败的规则和操作数）、deferred（推迟执行的规则），
+            启用同步清单时还有 signature、content_hash、fingerprint、targets、unchanged（正文未变化的目标）
+        """
+        ops = []
+        state = {'applied': 0, 'success_count': 0, 'failed': 0, 'deferred': []}
+        if self.sync_manifest is not None:
+            # 先于规则读取文件记录签名和摘要，读取期间文件被修改时下次同步会重新写入
+            state.update(signature=stat_signature(md_file.stat()), content_hash=generate_file_hash(md_file),
+                         fingerprint=self._sync_fingerprint(), targets=[], unchanged=[])
+        
+        for rule in self.rules:
+            if not rule.enabled:
+                continue
+            
+            try:
+                if not rule.should_apply(md_file, config):
+                    continue
+                state['applied'] += 1
+                
+                op = rule.build_operation(md_file, config) if rule.supports_batch() else None
+                if op is not None:
+                    ops.append(op)
+                elif defer_execute:
+                    state['deferred'].append(rule)
+                else:
+                    self._execute_rule(rule, md_file, config, state)
+                    
+            except Exception as e:
+                state['failed'] += 1
+                self.logger.error(f"❌ 规则执行异常: {rule.name} - {e}")
+        
+        if 'targets' in state:
+            ops = self._skip_unchanged_bodies(md_file, ops, state)
+        
+        ops = self._split_ops(ops, state)
+        if self.delta_planner is not None:
+            ops = [self.delta_planner.plan(op) for op in ops]
+        return ops, state
+    
+    def _execute_rule(self, rule: SyncRule, md_file: Path, config: Dict[str, Any], state: Dict[str, Any]):
+        """直接执行不支持批量的规则，结果计入文件的状态字典"""
+        try:
+            if rule.execute(md_file, self.backend, config):
+                self._invalidate_notes_info()
+                state['success_count'] += 1
+            else:
+                state['failed'] += 1
+                self.logger.error(f"❌ 规则执行失败: {rule.name}")
+        except Exception as e:
+            state['failed'] += 1
+            self.logger.error(f"❌ 规则执行异常: {rule.name} - {e}")
+    
+    def _skip_unchanged_bodies(self, md_file: Path, ops: List[Dict[str, Any]],
+                               state: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        记录各写入操作的目标和正文摘要，与上次写入该备忘录的正文相同的操作不再执行，直接计为成功
+        
+        Args:
+            md_file: MD文件路径
+            ops: 规则生成的操作
+            state: 文件的状态字典
+            
+        Returns:
+            仍需执行的操作
+        """
+        default_folder = self.config.get('notes_config', {}).get('default_folder', 'Notes')
+        previous = self.sync_manifest.get_targets(md_file)
+        
+        remaining = []
+        for op in ops:
+            if op.get('action') not in ('create', 'update', 'upsert'):
+                remaining.append(op)
+                continue
+            
+            target = (normalize_folder_path(op.get('folder') or default_folder), op['title'],
+                      body_hash(op.get('content', '')))
+            state['targets'].append(target)
+            if previous.get(target[:2]) == target[2]:
+                self.logger.info(f"⏭️ 正文未变化，跳过写入: {op['title']}")
+                state['success_count'] += 1
+                state['unchanged'].append(target[:2])
+                with self._unchanged_lock:
+                    self._unchanged_writes += 1
+            else:
+                remaining.append(op)
+        return remaining
+    
+    def _split_ops(self, ops: List[Dict[str, Any]], state: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        把超大正文的写入操作拆分为多条备忘录的操作，各部分都未变化的操作直接计为成功
+        
+        Args:
+            ops: 规则生成的操作
+            state: 文件的状态字典
+            
+        Returns:
+            实际需要执行的操作
+        """
+        if self.note_splitter is None:
+            return ops
+        
+        planned = []
+        for op in ops:
+            # 按转换后的正文大小判断，Markdown源文件的大小与写入备忘录的HTML正文相差较大
+            if not self.note_splitter.needs_split(len(op.get('content', '').encode('utf-8')),
+                                                  op.get('source_path')):
+                planned.append(op)
+                continue
+            part_ops, unchanged = self.note_splitter.plan(op)
+            if unchanged:
+                state['success_count'] += 1
+            planned.extend(part_ops)
+        return planned
+    
+    def _apply_ops(self, ops: List[Dict[str, Any]], batched: bool = True) -> List[Dict[str, Any]]:
+        """
+        执行操作列表，追加失败的操作退回整体改写后再执行一次
+        
+        Args:
+            ops: 待执行的操作
+            batched: 是否合并为批量脚本；同步单个文件时逐个执行，
+                     走进程池、预编译模板和参数化的单项脚本
+            
+        Returns:
+            与ops一一对应的结果列表
+        """
+        apply = self.backend.apply_batch if batched else self.backend.apply_each
+        results = apply(ops)
+        retry = [(index, DeltaPlanner.fallback(op)) for index, (op, result) in enumerate(zip(ops, results))
+                 if not result['success'] and DeltaPlanner.fallback(op) is not None]
+        if retry:
+            self.logger.warning(f"⚠️ {len(retry)} 个追加操作失败，改为整体改写")
+            for (index, _), result in zip(retry, apply([op for _, op in retry])):
+                results[index] = result
+        return results
+    
+    def _record_op_result(self, op: Dict[str, Any], result: Dict[str, Any], state: Dict[str, Any]):
+        """记录单个操作的执行结果，清理旧备忘录的删除操作不计入文件是否成功"""
+        if self.note_splitter is not None:
+            self.note_splitter.commit(op, result)
+        if self.delta_planner is not None:
+            self.delta_planner.commit(op, result)
+        if result['success']:
+            self._invalidate_notes_info()
+        if op.get('cleanup'):
+            return
+        if result['success']:
+            state['success_count'] += 1
+        else:
+            state['failed'] += 1
+    
+    def _file_outcome(self, file_path: str, state: Dict[str, Any]) -> bool:
+        """
+        与sync_file一致：没有适用规则视为成功，否则至少一个规则成功；
+        全部规则和操作都成功时记录到同步清单
+        """
+        success = state['applied'] == 0 or state['success_count'] > 0
+        if success:
+            self.logger.info(f"✅ 同步完成: {Path(file_path).name}")
+        else:
+            self.logger.error(f"❌ 所有规则执行失败: {Path(file_path).name}")
+        
+        if self.sync_manifest is not None and state.get('content_hash') and not state['failed']:
+            self.sync_manifest.record(file_path, state['content_hash'], state['fingerprint'], state['targets'],
+                                      signature=state['signature'])
+        return success
+    
+    def _begin_bulk_sync(self, file_count: int) -> bool:
+        """
+        批量同步开始前重置本次运行的统计并加载备忘录快照，让规则的存在性检查走内存索引
+        
+        Args:
+            file_count: 待同步文件数
+            
+        Returns:
+            本次是否加载了快照（需要在结束时释放）
+        """
+        self._reset_run_stats()
+        return self._load_bulk_snapshot(file_count)
+    
+    def _reset_run_stats(self):
+        """重置本次批量同步的脚本、模拟和写入统计"""
+        if self.concurrency_limiter is not None:
+            self.concurrency_limiter.reset_stats()
+        if self.script_retrier is not None:
+            self.script_retrier.reset_stats()
+        if isinstance(self.backend, SimulatedNotesBackend):
+            self.backend.reset_stats()
+        self.reset_operation_metrics()
+        with self._unchanged_lock:
+            self._unchanged_writes = 0
+    
+    def _load_bulk_snapshot(self, file_count: int) -> bool:
+        """
+        待同步文件数达到阈值时加载备忘录快照
+        
+        Args:
+            file_count: 待同步文件数
+            
+        Returns:
+            本次是否加载了快照（需要在结束时释放）
+        """
+        threshold = self.config.get('notes_config', {}).get('snapshot_threshold', 5)
+        if file_count < threshold or self.backend.snapshot_index is not None:
+            return False
+        
+        return self.backend.load_snapshot() is not None
+    
+    def _end_bulk_sync(self, snapshot_loaded: bool):
+        """批量同步结束后释放本次加载的快照"""
+        if snapshot_loaded:
+            self.backend.invalidate_snapshot()
+    
+    def get_operation_metrics(self, wall_seconds: float = None) -> Dict[str, Dict[str, Any]]:
+        """
+        获取备忘录后端各类操作的调用次数、正文字节数和延迟直方图
+        
+        Args:
+            wall_seconds: 参照的总耗时，提供时每个操作附带 wall_share（耗时占比）
+            
+        Returns:
+            操作名（exists、create、update、folder_check、list 等）到统计字典的映射，
+            按总耗时降序；未启用统计时返回空字典
+        """
+        if self.operation_metrics is None:
+            return {}
+        return self.operation_metrics.snapshot(wall_seconds)
+    
+    def reset_operation_metrics(self):
+        """清空操作统计"""
+        if self.operation_metrics is not None:
+            self.operation_metrics.reset()
+    
+    def _record_script_stats(self, stats: Dict[str, Any]):
+        """把本次批量同步省去的写入数、各操作耗时、并发上限、脚本延迟分布、重试情况和模拟耗时写入统计"""
+        with self._unchanged_lock:
+            stats['unchanged_count'] = self._unchanged_writes
+        if stats['unchanged_count']:
+            self.logger.info(f"   正文未变化、省去的写入: {stats['unchanged_count']}")
+        
+        operations = self.get_operation_metrics(stats.get('duration'))
+        if operations:
+            stats['operations'] = operations
+            for name, op_stats in list(operations.items())[:3]:
+                share = f"，占 {op_stats['wall_share']:.0%}" if 'wall_share' in op_stats else ""
+                self.logger.info(f"   {name}: {op_stats['count']} 次，共 {op_stats['total_seconds']:.2f}秒{share}")
+        
+        if self.concurrency_limiter is not None:
+            snapshot = self.concurrency_limiter.snapshot()
+            if snapshot['samples']:
+                stats['concurrency'] = snapshot
+                self.logger.info(f"   并发上限: {snapshot['limit']}，脚本p95延迟: {snapshot['latency_p95']:.2f}秒")
+        
+        if self.script_retrier is not None:
+            snapshot = self.script_retrier.snapshot()
+            if snapshot['retries'] or snapshot['errors'] or snapshot['breaker_opened']:
+                stats['retry'] = snapshot
+                self.logger.info(f"   脚本重试: {snapshot['retries']} 次，熔断暂停: {snapshot['breaker_opened']} 次")
+        
+        if isinstance(self.backend, SimulatedNotesBackend):
+            stats['simulation'] = self.backend.get_stats()
+            self.logger.info(f"   模拟调用: {stats['simulation']['calls']} 次，"
+                             f"模拟耗时: {stats['simulation']['simulated_seconds']:.2f}秒")
+    
     def sync_folder(self, folder_path: str, recursive: bool = True, dry_run: bool = False) -> Dict[str, Any]:
         """
         批量同步文件夹
@@ -312,17 +1174,9 @@ class MDSyncEngine:
         
         self.logger.info(f"开始批量同步: {folder}")
         
-        # 查找MD文件
-        if recursive:
-            md_files = list(folder.rglob("*.md"))
-        else:
-            md_files = list(folder.glob("*.md"))
-        
-        self.logger.info(f"找到 {len(md_files)} 个MD文件")
-        
         # 统计信息
         stats = {
-            'total_files': len(md_files),
+            'total_files': 0,
             'success_count': 0,
             'failure_count': 0,
             'skipped_count': 0,
@@ -330,36 +1184,15 @@ class MDSyncEngine:
             'processed_files': []
         }
         
-        # 处理每个文件
-        for md_file in md_files:
-            try:
-                success = self.sync_file(str(md_file), dry_run)
-                
-                file_info = {
-                    'path': str(md_file),
-                    'name': md_file.name,
-                    'success': success,
-                    'timestamp': datetime.now()
-                }
-                
-                if success:
-                    stats['success_count'] += 1
-                else:
-                    stats['failure_count'] += 1
-                
-                stats['processed_files'].append(file_info)
-                
-            except Exception as e:
-                self.logger.error(f"❌ 处理文件异常: {md_file} - {e}")
-                stats['failure_count'] += 1
-                
-                stats['processed_files'].append({
-                    'path': str(md_file),
-                    'name': md_file.name,
-                    'success': False,
-                    'error': str(e),
-                    'timestamp': datetime.now()
-                })
+        pipeline_config = self._pipeline_config(dry_run)
+        if pipeline_config is not None:
+            # 边遍历目录边比较签名、转换和写入
+            self._sync_pipelined(self._iter_md_files(folder, recursive), stats, pipeline_config)
+            self.logger.info(f"找到 {stats['total_files']} 个MD文件")
+        else:
+            md_files = self._find_md_files(folder, recursive)
+            stats['total_files'] = len(md_files)
+            self._sync_file_list(md_files, dry_run, stats)
         
         # 完成统计
         stats['end_time'] = datetime.now()
@@ -370,7 +1203,9 @@ class MDSyncEngine:
         self.logger.info(f"   总文件数: {stats['total_files']}")
         self.logger.info(f"   成功: {stats['success_count']}")
         self.logger.info(f"   失败: {stats['failure_count']}")
+        self.logger.info(f"   未变化跳过: {stats['skipped_count']}")
         self.logger.info(f"   耗时: {stats['duration']:.2f}秒")
+        self._record_script_stats(stats)
         
         return stats
     
@@ -391,69 +1226,664 @@ class MDSyncEngine:
             'total_files': len(file_paths),
             'success_count': 0,
             'failure_count': 0,
+            'skipped_count': 0,
             'start_time': datetime.now(),
             'processed_files': []
         }
         
+        pipeline_config = self._pipeline_config(dry_run)
+        if pipeline_config is not None and len(file_paths) >= 2:
+            self._sync_pipelined(file_paths, stats, pipeline_config)
+        else:
+            self._sync_file_list(file_paths, dry_run, stats)
+        
+        stats['end_time'] = datetime.now()
+        stats['duration'] = (stats['end_time'] - stats['start_time']).total_seconds()
+        
+        self.logger.info(f"📊 批量同步完成: 成功 {stats['success_count']}/{stats['total_files']}")
+        self._record_script_stats(stats)
+        
+        return stats
+    
+    def _sync_file_list(self, file_paths: List[str], dry_run: bool, stats: Dict[str, Any]):
+        """
+        依次完成签名比较、转换和写入各阶段后同步文件列表，结果累加到stats
+        
+        Args:
+            file_paths: 文件路径列表
+            dry_run: 是否只是试运行
+            stats: 同步统计信息
+        """
+        file_paths, skipped = self._filter_unchanged(file_paths, dry_run)
+        self._record_skipped(stats, skipped)
+        
+        snapshot_loaded = self._begin_bulk_sync(len(file_paths))
+        batch_outcomes = self._sync_files_batched(file_paths, dry_run)
+        
         for file_path in file_paths:
             try:
-                success = self.sync_file(file_path, dry_run)
-                
-                file_info = {
-                    'path': file_path,
-                    'name': Path(file_path).name,
-                    'success': success,
-                    'timestamp': datetime.now()
-                }
-                
-                if success:
-                    stats['success_count'] += 1
+                if file_path in batch_outcomes:
+                    success = batch_outcomes[file_path]
                 else:
-                    stats['failure_count'] += 1
-                
-                stats['processed_files'].append(file_info)
+                    success = self.sync_file(file_path, dry_run)
+                self._record_processed(stats, file_path, success)
                 
             except Exception as e:
                 self.logger.error(f"❌ 处理文件异常: {file_path} - {e}")
-                stats['failure_count'] += 1
+                self._record_processed(stats, file_path, False, str(e))
+        
+        self._end_bulk_sync(snapshot_loaded)
+    
+    def _pipeline_config(self, dry_run: bool) -> Optional[Dict[str, Any]]:
+        """流水线同步的配置，试运行或未启用时返回None"""
+        pipeline_config = self.config.get('notes_config', {}).get('pipeline', {})
+        if dry_run or not pipeline_config.get('enabled', True):
+            return None
+        return pipeline_config
+    
+    def _sync_pipelined(self, file_source: Iterable[str], stats: Dict[str, Any], pipeline_config: Dict[str, Any]):
+        """
+        分级流水线同步：签名比较和读取转换各用一组工作线程，写入由调用线程独占执行，
+        级间用有界队列连接，前一批写入备忘录时后面的文件已在比较和转换
+        
+        Args:
+            file_source: 文件路径（可以是边遍历目录边产出的生成器）
+            stats: 同步统计信息，total_files 按实际遍历到的文件数更新
+            pipeline_config: 流水线配置
+        """
+        max_batch = self._write_batch_size()
+        config = self.config.copy()
+        counts = {'discovered': 0, 'pending': 0}
+        counts_lock = threading.Lock()
+        skipped: List[str] = []
+        
+        def stat_stage(chunk: List[str]) -> List[str]:
+            pending, unchanged = self._filter_unchanged(chunk)
+            with counts_lock:
+                counts['discovered'] += len(chunk)
+                counts['pending'] += len(pending)
+                skipped.extend(unchanged)
+            return pending
+        
+        def convert_stage(file_path: str) -> List[Tuple[str, Optional[List[Dict[str, Any]]], Any]]:
+            md_file = Path(file_path)
+            if not md_file.is_file():
+                # 交给sync_file记录错误
+                return [(file_path, None, None)]
+            ops, state = self._plan_file(md_file, config, defer_execute=True)
+            return [(file_path, ops, state)]
+        
+        snapshot = {'loaded': False, 'checked': False}
+        
+        def write_stage(batches):
+            for batch in batches:
+                # 批量写入不读取快照，只有推迟执行的规则需要读取备忘录时才加载，
+                # 此时已比较过的待同步文件数决定是否值得加载
+                if not snapshot['checked'] and any(rule.reads_notes for _, _, state in batch if state is not None
+                                                   for rule in state['deferred']):
+                    snapshot['checked'] = True
+                    with counts_lock:
+                        pending_count = counts['pending']
+                    snapshot['loaded'] = self._load_bulk_snapshot(pending_count)
+                self._write_planned(batch, config, stats)
+        
+        self._reset_run_stats()
+        pipeline = StagedPipeline(queue_size=pipeline_config.get('queue_size', 256))
+        pipeline.add_stage("stat", stat_stage, workers=pipeline_config.get('stat_workers', 4))
+        pipeline.add_stage("convert", convert_stage, workers=pipeline_config.get('convert_workers', 4))
+        try:
+            pipeline.run(self._chunked(file_source, _PIPELINE_CHUNK_SIZE), write_stage, max_batch=max_batch)
+        finally:
+            self._end_bulk_sync(snapshot['loaded'])
+        
+        for stage, item, error in pipeline.errors:
+            # 签名比较级的输入是一组文件，转换级的输入是单个文件
+            failed_paths = item if stage == "stat" else [item] if item is not None else []
+            for file_path in failed_paths:
+                self._record_processed(stats, file_path, False, str(error))
+        
+        stats['total_files'] = counts['discovered']
+        self._record_skipped(stats, skipped)
+    
+    def _write_planned(self, batch: List[Tuple[str, Optional[List[Dict[str, Any]]], Any]],
+                       config: Dict[str, Any], stats: Dict[str, Any]):
+        """
+        流水线的写入级：执行推迟的规则，合并一批文件的写入操作执行，结果累加到stats
+        
+        Args:
+            batch: (文件路径, 操作列表, 状态字典) 列表，文件不存在时后两项为None
+            config: 配置字典
+            stats: 同步统计信息
+        """
+        ops = []
+        op_owners = []
+        for file_path, file_ops, state in batch:
+            if state is None:
+                continue
+            for rule in state.pop('deferred'):
+                self._execute_rule(rule, Path(file_path), config, state)
+            ops.extend(file_ops)
+            op_owners.extend([state] * len(file_ops))
+        
+        if ops:
+            self.logger.info(f"📦 批量写入 {len(ops)} 个操作")
+            for state, op, result in zip(op_owners, ops, self._apply_ops(ops)):
+                self._record_op_result(op, result, state)
+        
+        for file_path, _, state in batch:
+            try:
+                if state is None:
+                    success = self.sync_file(file_path)
+                else:
+                    success = self._file_outcome(file_path, state)
+                self._record_processed(stats, file_path, success)
+            except Exception as e:
+                self.logger.error(f"❌ 处理文件异常: {file_path} - {e}")
+                self._record_processed(stats, file_path, False, str(e))
+    
+    def _write_batch_size(self) -> int:
+        """
+        写入级每次合并的文件数：足够让 apply_batch 拆出的各组在并发控制器允许的范围内并发执行，
+        未启用批量写入时逐个写入
+        """
+        batch_config = self.config.get('notes_config', {}).get('batch_writes', {})
+        if not batch_config.get('enabled', True):
+            return 1
+        max_batch = batch_config.get('max_batch_size', 50)
+        if self.concurrency_limiter is not None:
+            max_batch *= self.concurrency_limiter.max_limit
+        return max_batch
+    
+    @staticmethod
+    def _chunked(file_source: Iterable[str], size: int) -> Iterator[List[str]]:
+        """把文件路径分组，签名比较按组批量查询同步清单"""
+        chunk = []
+        for file_path in file_source:
+            chunk.append(file_path)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    
+    def _record_processed(self, stats: Dict[str, Any], file_path: str, success: bool, error: str = None):
+        """把单个文件的同步结果计入统计"""
+        file_info = {
+            'path': file_path,
+            'name': os.path.basename(file_path),
+            'success': success,
+            'timestamp': datetime.now()
+        }
+        if error is not None:
+            file_info['error'] = error
+        
+        if success:
+            stats['success_count'] += 1
+        else:
+            stats['failure_count'] += 1
+        stats['processed_files'].append(file_info)
+    
+    def build_sync_plan(self, file_paths: List[str], options: Dict[str, Any] = None) -> SyncPlan:
+        """
+        规划阶段：只读取本地文件、同步清单和一次备忘录快照，生成同步计划，不写入备忘录
+        
+        Args:
+            file_paths: 文件路径列表
+            options: 记录在计划中的命令行选项
+            
+        Returns:
+            同步计划
+        """
+        notes_config = self.config.get('notes_config', {})
+        default_folder = notes_config.get('default_folder', 'Notes')
+        plan = SyncPlan(self._sync_fingerprint(), notes_config.get('account', 'iCloud'), options=options)
+        
+        pending, unchanged = self._filter_unchanged(file_paths)
+        for file_path in unchanged:
+            plan.add_file(file_path, STATUS_UNCHANGED, [{'action': ACTION_SKIP, 'folder': None, 'title': None,
+                                                         'reason': '文件未变化'}])
+        
+        snapshot_loaded = self.backend.snapshot_index is None and self.backend.load_snapshot() is not None
+        index = self.backend.snapshot_index
+        config = self.config.copy()
+        try:
+            for file_path in pending:
+                md_file = Path(file_path)
+                if not md_file.is_file():
+                    plan.add_file(file_path, STATUS_MISSING)
+                    continue
                 
-                stats['processed_files'].append({
-                    'path': file_path,
-                    'name': Path(file_path).name,
-                    'success': False,
-                    'error': str(e),
-                    'timestamp': datetime.now()
-                })
+                ops, state = self._plan_file(md_file, config, defer_execute=True)
+                changes = [{'action': ACTION_SKIP, 'folder': folder, 'title': title, 'reason': '正文未变化'}
+                           for folder, title in state.get('unchanged', [])]
+                planned_ops = []
+                for op in ops:
+                    change, op = self._plan_change(op, index, default_folder)
+                    changes.append(change)
+                    planned_ops.append(op)
+                for rule in state['deferred']:
+                    changes.append({'action': ACTION_EXECUTE, 'folder': None, 'title': None, 'reason': rule.name})
+                
+                plan.add_file(
+                    file_path, STATUS_PENDING, changes,
+                    ops=planned_ops,
+                    rules=[rule.name for rule in state['deferred']],
+                    content_hash=state.get('content_hash') or generate_file_hash(md_file),
+                    signature=state.get('signature') or stat_signature(md_file.stat()),
+                    targets=state.get('targets', []),
+                    applied=state['applied'],
+                    success_count=state['success_count'],
+                    failed=state['failed']
+                )
+        finally:
+            self._end_bulk_sync(snapshot_loaded)
+        
+        self.logger.info(f"📋 同步计划: {plan.summary()}")
+        return plan
+    
+    def _plan_change(self, op: Dict[str, Any], index: Optional[NotesIndex],
+                     default_folder: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        根据快照确定写入操作的变更类型；快照中不存在的备忘录改为直接创建，省去执行时的查找
+        
+        Args:
+            op: 待执行的操作（不会被修改）
+            index: 备忘录快照索引，没有快照时为None
+            default_folder: 默认文件夹
+            
+        Returns:
+            (变更字典, 计划中执行的操作) 元组，upsert 操作可能被改为 create 的副本
+        """
+        folder = op.get('folder') or default_folder
+        change = {'action': op['action'], 'folder': folder, 'title': op.get('title')}
+        if op['action'] == 'append':
+            change.update(action=ACTION_UPDATE, reason='追加')
+        elif op['action'] == 'delete' and op.get('cleanup'):
+            change['reason'] = '清理拆分前的备忘录'
+        elif op['action'] == 'upsert' and index is not None:
+            if index.has_note(folder, op['title']):
+                change['action'] = ACTION_UPDATE
+            else:
+                change['action'] = ACTION_CREATE
+                op = dict(op, action='create',
+                          create_folders=op.get('create_folders', True) and not index.has_folder(folder))
+        return change, op
+    
+    def apply_sync_plan(self, plan: SyncPlan) -> Dict[str, Any]:
+        """
+        执行阶段：按计划分批写入备忘录，同一文件夹的写入集中在一起，规划后被修改的文件不执行
+        
+        Args:
+            plan: 同步计划
+            
+        Returns:
+            同步统计信息，stale_count 为规划后被修改而未执行的文件数
+        """
+        if plan.fingerprint != self._sync_fingerprint():
+            self.logger.error("❌ 规则或配置在规划后发生了变化，请重新生成计划")
+            return {'error': '规则或配置已变化'}
+        
+        stats = {
+            'total_files': len(plan.files),
+            'success_count': 0,
+            'failure_count': 0,
+            'skipped_count': 0,
+            'stale_count': 0,
+            'start_time': datetime.now(),
+            'processed_files': []
+        }
+        
+        self._reset_run_stats()
+        config = self.config.copy()
+        rules = {rule.name: rule for rule in self.rules}
+        default_folder = self.config.get('notes_config', {}).get('default_folder', 'Notes')
+        
+        pending = []
+        for entry in plan.files:
+            file_path = entry['source_path']
+            if entry['status'] == STATUS_MISSING:
+                self._record_processed(stats, file_path, False, '文件不存在')
+            elif entry['status'] == STATUS_PENDING:
+                if self._plan_entry_current(entry):
+                    pending.append(entry)
+                else:
+                    self.logger.warning(f"⚠️ 文件在规划后被修改，未执行: {file_path}")
+                    stats['stale_count'] += 1
+                    self._record_processed(stats, file_path, False, '文件在规划后被修改')
+        self._record_skipped(stats, [entry['source_path'] for entry in plan.files
+                                     if entry['status'] == STATUS_UNCHANGED])
+        
+        # 按目标文件夹排序，每批写入覆盖尽量少的文件夹
+        pending.sort(key=lambda entry: ((entry['ops'][0].get('folder') or default_folder) if entry['ops'] else "",
+                                        entry['source_path']))
+        batch_size = self._write_batch_size()
+        batch = []
+        for entry in pending:
+            batch.append((entry['source_path'], entry['ops'], self._plan_entry_state(entry, rules)))
+            if len(batch) >= batch_size:
+                self._write_planned(batch, config, stats)
+                batch = []
+        if batch:
+            self._write_planned(batch, config, stats)
         
         stats['end_time'] = datetime.now()
         stats['duration'] = (stats['end_time'] - stats['start_time']).total_seconds()
         
-        self.logger.info(f"📊 批量同步完成: 成功 {stats['success_count']}/{stats['total_files']}")
+        self.logger.info(f"📊 计划执行完成: 成功 {stats['success_count']}/{stats['total_files']}，"
+                         f"规划后被修改 {stats['stale_count']}")
+        self._record_script_stats(stats)
         
         return stats
     
-    def get_notes_info(self) -> Dict[str, Any]:
-        """获取备忘录应用信息"""
+    def _plan_entry_current(self, entry: Dict[str, Any]) -> bool:
+        """文件自规划以来是否未被修改：签名相同，或签名变化但内容摘要相同"""
         try:
-            folders = self.apple_bridge.get_folders()
-            total_notes = 0
-            
-            folder_info = {}
-            for folder in folders:
-                notes = self.apple_bridge.get_existing_notes(folder)
-                folder_info[folder] = len(notes)
-                total_notes += len(notes)
-            
-            return {
-                'total_folders': len(folders),
-                'total_notes': total_notes,
-                'folders': folder_info,
-                'account': self.apple_bridge.account
+            signature = stat_signature(os.stat(entry['source_path']))
+        except OSError:
+            return False
+        if list(signature) == list(entry['signature']):
+            return True
+        return generate_file_hash(Path(entry['source_path'])) == entry['content_hash']
+    
+    def _plan_entry_state(self, entry: Dict[str, Any], rules: Dict[str, SyncRule]) -> Dict[str, Any]:
+        """
+        由文件计划恢复 _plan_file 的状态字典
+        
+        Args:
+            entry: 文件计划
+            rules: 规则名称到规则的映射
+            
+        Returns:
+            状态字典
+        """
+        state = {
+            'applied': entry['applied'],
+            'success_count': entry['success_count'],
+            'failed': entry['failed'],
+            'deferred': []
+        }
+        for name in entry['rules']:
+            if name in rules:
+                state['deferred'].append(rules[name])
+            else:
+                state['failed'] += 1
+                self.logger.error(f"❌ 计划中的规则不存在: {name}")
+        
+        if self.sync_manifest is not None:
+            state.update(signature=tuple(entry['signature']), content_hash=entry['content_hash'],
+                         fingerprint=self._sync_fingerprint(),
+                         targets=[tuple(target) for target in entry['targets']])
+        return state
+    
+    def _record_skipped(self, stats: Dict[str, Any], skipped: List[str]):
+        """把没有变化而跳过的文件计入统计，视为同步成功"""
+        stats['skipped_count'] = len(skipped)
+        stats['success_count'] += len(skipped)
+        timestamp = datetime.now()
+        for file_path in skipped:
+            stats['processed_files'].append({
+                'path': file_path,
+                'name': os.path.basename(file_path),
+                'success': True,
+                'skipped': True,
+                'timestamp': timestamp
+            })
+        if skipped:
+            self.logger.info(f"⏭️ {len(skipped)} 个文件自上次同步后没有变化，已跳过")
+    
+    def _find_md_files(self, folder: Path, recursive: bool) -> List[str]:
+        """查找文件夹中的MD文件，返回路径字符串（大目录树中逐个构造 Path 的开销不可忽略）"""
+        md_files = list(self._iter_md_files(folder, recursive))
+        
+        self.logger.info(f"找到 {len(md_files)} 个MD文件")
+        return md_files
+    
+    @staticmethod
+    def _iter_md_files(folder: Path, recursive: bool) -> Iterator[str]:
+        """边遍历文件夹边产出其中的MD文件路径"""
+        walker = os.walk(folder) if recursive else [next(os.walk(folder), (str(folder), [], []))]
+        for root, _, names in walker:
+            for name in names:
+                if name.endswith('.md'):
+                    yield os.path.join(root, name)
+    
+    def _create_async_bridge(self) -> Optional[AsyncAppleScriptBridge]:
+        """
+        为AppleScript后端创建异步桥接，其他后端返回None（写入改为在线程池中执行）
+        """
+        if not isinstance(self.backend, AppleScriptBridge):
+            return None
+        
+        async_config = self.config.get('notes_config', {}).get('async', {})
+        return AsyncAppleScriptBridge(
+            self.backend,
+            max_in_flight=async_config.get('max_in_flight', 4),
+            timeout=async_config.get('script_timeout', 30),
+            limiter=self.concurrency_limiter
+        )
+    
+    async def async_sync_folder(self, folder_path: str, recursive: bool = True,
+                                dry_run: bool = False) -> Dict[str, Any]:
+        """
+        异步批量同步文件夹，文件读取转换与备忘录写入并发交错执行
+        
+        Args:
+            folder_path: 文件夹路径
+            recursive: 是否递归处理子目录
+            dry_run: 是否只是试运行
+            
+        Returns:
+            同步统计信息，格式与 sync_folder 相同
+        """
+        folder = Path(folder_path)
+        
+        if not folder.exists():
+            self.logger.error(f"❌ 文件夹不存在: {folder}")
+            return {'error': '文件夹不存在'}
+        
+        if not folder.is_dir():
+            self.logger.error(f"❌ 不是文件夹: {folder}")
+            return {'error': '不是文件夹'}
+        
+        self.logger.info(f"开始异步批量同步: {folder}")
+        md_files = self._find_md_files(folder, recursive)
+        
+        return await self.async_sync_files(md_files, dry_run)
+    
+    async def async_sync_files(self, file_paths: List[str], dry_run: bool = False) -> Dict[str, Any]:
+        """
+        异步批量同步指定文件列表
+        
+        每个文件的规则处理（读取、转换）在线程池中进行，生成的写入操作交给异步桥接，
+        同时运行的脚本数受 notes_config.async.max_in_flight 限制，
+        同时处理中的文件数受 notes_config.async.max_pending_files 限制
+        
+        Args:
+            file_paths: 文件路径列表
+            dry_run: 是否只是试运行
+            
+        Returns:
+            同步统计信息，格式与 sync_files 相同
+        """
+        self.logger.info(f"开始异步批量同步 {len(file_paths)} 个文件")
+        loop = asyncio.get_running_loop()
+        
+        stats = {
+            'total_files': len(file_paths),
+            'success_count': 0,
+            'failure_count': 0,
+            'skipped_count': 0,
+            'start_time': datetime.now(),
+            'processed_files': []
+        }
+        
+        file_paths, skipped = await loop.run_in_executor(None, self._filter_unchanged, file_paths, dry_run)
+        self._record_skipped(stats, skipped)
+        
+        async_config = self.config.get('notes_config', {}).get('async', {})
+        async_bridge = self._create_async_bridge()
+        file_semaphore = asyncio.Semaphore(async_config.get('max_pending_files', 16))
+        
+        snapshot_loaded = await loop.run_in_executor(None, self._begin_bulk_sync, len(file_paths))
+        try:
+            outcomes = await asyncio.gather(
+                *(self._async_sync_one(file_path, dry_run, async_bridge, file_semaphore)
+                  for file_path in file_paths),
+                return_exceptions=True
+            )
+        finally:
+            self._end_bulk_sync(snapshot_loaded)
+        
+        for file_path, outcome in zip(file_paths, outcomes):
+            file_info = {
+                'path': file_path,
+                'name': Path(file_path).name,
+                'success': outcome is True,
+                'timestamp': datetime.now()
+            }
+            
+            if isinstance(outcome, Exception):
+                self.logger.error(f"❌ 处理文件异常: {file_path} - {outcome}")
+                file_info['error'] = str(outcome)
+            
+            if outcome is True:
+                stats['success_count'] += 1
+            else:
+                stats['failure_count'] += 1
+            
+            stats['processed_files'].append(file_info)
+        
+        stats['end_time'] = datetime.now()
+        stats['duration'] = (stats['end_time'] - stats['start_time']).total_seconds()
+        
+        self.logger.info(f"📊 异步批量同步完成: 成功 {stats['success_count']}/{stats['total_files']}，"
+                         f"耗时 {stats['duration']:.2f}秒")
+        self._record_script_stats(stats)
+        
+        return stats
+    
+    async def _async_sync_one(self, file_path: str, dry_run: bool,
+                              async_bridge: Optional[AsyncAppleScriptBridge],
+                              file_semaphore: asyncio.Semaphore) -> bool:
+        """异步同步单个文件"""
+        loop = asyncio.get_running_loop()
+        
+        async with file_semaphore:
+            md_file = Path(file_path)
+            if dry_run or not md_file.is_file():
+                # 试运行和无效路径沿用同步流程的处理与日志
+                return await loop.run_in_executor(None, self.sync_file, file_path, dry_run)
+            
+            config = self.config.copy()
+            ops, state = await loop.run_in_executor(None, self._plan_file, md_file, config)
+            
+            for op in ops:
+                result = await self._async_apply_op(op, async_bridge)
+                fallback = DeltaPlanner.fallback(op)
+                if not result['success'] and fallback is not None:
+                    self.logger.warning(f"⚠️ 追加失败，改为整体改写: {op.get('title')}")
+                    result = await self._async_apply_op(fallback, async_bridge)
+                self._record_op_result(op, result, state)
+            
+            return self._file_outcome(file_path, state)
+    
+    async def _async_apply_op(self, op: Dict[str, Any],
+                              async_bridge: Optional[AsyncAppleScriptBridge]) -> Dict[str, Any]:
+        """异步执行单个操作，没有异步桥接时在线程池中调用后端"""
+        if async_bridge is not None:
+            return await async_bridge.apply_op(op)
+        loop = asyncio.get_running_loop()
+        return (await loop.run_in_executor(None, self.backend.apply_batch, [op]))[0]
+    
+    def get_notes_info(self, refresh: bool = False) -> Dict[str, Any]:
+        """
+        获取备忘录应用信息，各文件夹的备忘录数量用一次聚合查询统计
+        
+        Args:
+            refresh: 是否忽略磁盘缓存重新统计
+            
+        Returns:
+            包含 total_folders、total_notes、folders（路径到数量）、account 的字典；
+            来自缓存时另有 cached_at（时间戳），失败时只包含 error
+        """
+        cache_config = self.config.get('notes_config', {}).get('info_cache', {})
+        cache_path = self.get_state_dir() / 'notes_info.json'
+        ttl = cache_config.get('ttl_seconds', 300) if cache_config.get('enabled', False) else 0
+        
+        if ttl > 0 and not refresh:
+            cached = self._load_notes_info_cache(cache_path, ttl)
+            if cached is not None:
+                return cached
+        
+        try:
+            counts = self.backend.count_notes_by_folder()
+            if counts is None:
+                return {'error': "统计备忘录数量失败"}
+            
+            info = {
+                'total_folders': len(counts),
+                'total_notes': sum(counts.values()),
+                'folders': counts,
+                'account': self.backend.account
             }
             
         except Exception as e:
             self.logger.error(f"获取备忘录信息失败: {e}")
             return {'error': str(e)}
+        
+        if ttl > 0:
+            try:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(cache_path, 'w', encoding='utf-8') as f:
+                    json.dump(dict(info, cached_at=time.time()), f, ensure_ascii=False)
+            except OSError as e:
+                self.logger.warning(f"⚠️ 无法写入备忘录信息缓存: {e}")
+        return info
+    
+    def _invalidate_notes_info(self):
+        """写入成功后删除 info 命令的统计缓存，同步后不再显示旧的数量"""
+        if not self.config.get('notes_config', {}).get('info_cache', {}).get('enabled', False):
+            return
+        try:
+            (self.get_state_dir() / 'notes_info.json').unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.logger.warning(f"⚠️ 无法删除备忘录信息缓存: {e}")
+    
+    def _load_notes_info_cache(self, cache_path: Path, ttl: float) -> Optional[Dict[str, Any]]:
+        """读取未过期且属于当前账户的备忘录信息缓存"""
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if cached.get('account') != self.backend.account or time.time() - cached.get('cached_at', 0) > ttl:
+            return None
+        return cached
+    
+    def export_notes(self, output_path: str, folder: str = None) -> int:
+        """
+        将文件夹中的备忘录（含正文）逐条导出为JSON Lines文件，
+        读取与写入都是流式的，导出大量备忘录时内存占用保持有界
+        
+        Args:
+            output_path: 输出文件路径
+            folder: 文件夹路径，默认使用default_folder
+            
+        Returns:
+            导出的备忘录数量
+        """
+        count = 0
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for record in self.backend.iter_notes(folder, include_body=True):
+                record.pop('type', None)
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                count += 1
+        
+        self.logger.info(f"💾 已导出 {count} 个备忘录到 {output_path}")
+        return count
     
     def validate_config(self) -> List[str]:
         """验证配置文件"""
@@ -477,6 +1907,11 @@ class MDSyncEngine:
         if max_size is not None and (not isinstance(max_size, (int, float)) or max_size <= 0):
             issues.append("max_file_size_mb 应该是正数")
         
+        # 检查备忘录后端
+        backend = self.config.get('notes_config', {}).get('backend', 'applescript')
+        if backend not in ('applescript', 'sqlite', 'simulated'):
+            issues.append(f"无效的备忘录后端: {backend}，应该是 applescript、sqlite 或 simulated")
+        
         # 检查日志配置
         log_level = self.config.get('logging', {}).get('level', 'INFO')
         valid_levels = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+同步清单
+以源文件路径为键记录最后一次成功同步时的文件内容摘要、写入的目标文件夹/标题及其正文摘要和同步时间。
+内容摘要和规则指纹（规则集、相关配置与转换器版本）都没有变化的文件不再读取、转换和写入。
+同时记录文件的 (st_mtime_ns, st_size, st_ino)，签名未变的文件不必读取内容计算摘要
+"""
+
+import os
+import time
+import sqlite3
+import threading
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# 查询的文件数超过此值时整表扫描，不再拼接 IN 查询（sqlite 单条语句的参数个数也有上限）
+_FULL_SCAN_THRESHOLD = 500
+
+def stat_signature(stat_result: os.stat_result) -> Tuple[int, int, int]:
+    """文件的 (修改时间纳秒, 大小, inode) 签名，任一变化都视为文件可能被修改"""
+    return (stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino)
+
+class SyncManifest:
+    """基于SQLite的同步清单"""
+    
+    def __init__(self, db_path: Union[str, Path]):
+        """
+        初始化同步清单
+        
+        Args:
+            db_path: SQLite文件路径，使用 ":memory:" 表示仅保存在内存中
+        """
+        self.db_path = str(db_path)
+        if self.db_path != ":memory:":
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._create_schema()
+    
+    def _create_schema(self):
+        """创建数据表"""
+        with self._lock, self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS files (
+                    source_path TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    synced_at TEXT NOT NULL
+                )
+            ''')
+            # 旧版本清单没有文件签名和摘要计算时间
+            columns = {row['name'] for row in self._conn.execute('PRAGMA table_info(files)')}
+            for column, column_type in (('st_mtime_ns', 'INTEGER'), ('st_size', 'INTEGER'),
+                                        ('st_ino', 'INTEGER'), ('hashed_at', 'REAL')):
+                if column not in columns:
+                    self._conn.execute(f'ALTER TABLE files ADD COLUMN {column} {column_type}')
+            # 一个文件可能被多个规则写入不同的备忘录
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS targets (
+                    source_path TEXT NOT NULL,
+                    folder TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    body_hash TEXT NOT NULL,
+                    synced_at TEXT NOT NULL,
+                    PRIMARY KEY (source_path, folder, title)
+                )
+            ''')
+    
+    def get(self, source_path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+        """
+        获取源文件的同步记录
+        
+        Args:
+            source_path: 源文件路径
+        
+        Returns:
+            记录字典（content_hash、fingerprint、synced_at、st_mtime_ns、st_size、st_ino、
+            hashed_at），未同步过返回None
+        """
+        return self.get_many([source_path]).get(source_path)
+    
+    def get_many(self, source_paths: List[Union[str, Path]]) -> Dict[Union[str, Path], Dict[str, Any]]:
+        """
+        批量获取同步记录，扫描大量文件时避免逐个查询
+        
+        Args:
+            source_paths: 源文件路径列表
+        
+        Returns:
+            传入的路径到记录字典的映射，未同步过的路径不包含在内
+        """
+        keys = {}
+        for source_path in source_paths:
+            keys.setdefault(self._key(source_path), []).append(source_path)
+        
+        records = {}
+        key_list = list(keys)
+        with self._lock:
+            cursor = self._conn.cursor()
+            # 大量记录时元组比 sqlite3.Row 快得多
+            cursor.row_factory = None
+            if len(key_list) > _FULL_SCAN_THRESHOLD:
+                # 查询的文件很多时整表扫描比逐个查询快
+                cursor.execute('SELECT * FROM files')
+            else:
+                cursor.execute(f'SELECT * FROM files WHERE source_path IN ({",".join("?" * len(key_list))})',
+                               key_list)
+            columns = [description[0] for description in cursor.description]
+            key_index = columns.index('source_path')
+            for row in cursor:
+                source_paths = keys.get(row[key_index])
+                if source_paths:
+                    record = dict(zip(columns, row))
+                    for source_path in source_paths:
+                        records[source_path] = record
+        return records
+    
+    def get_targets(self, source_path: Union[str, Path]) -> Dict[Tuple[str, str], str]:
+        """
+        获取源文件上次写入的各备忘录的正文摘要
+        
+        Args:
+            source_path: 源文件路径
+        
+        Returns:
+            (文件夹, 标题) 到正文摘要的映射
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT folder, title, body_hash FROM targets WHERE source_path = ?',
+                (self._key(source_path),)
+            ).fetchall()
+        return {(row['folder'], row['title']): row['body_hash'] for row in rows}
+    
+    def record(self, source_path: Union[str, Path], content_hash: str, fingerprint: str,
+               targets: List[Tuple[str, str, str]], signature: Tuple[int, int, int] = None):
+        """
+        记录一次成功的同步，替换该文件之前的记录
+        
+        Args:
+            source_path: 源文件路径
+            content_hash: 同步时的文件内容摘要
+            fingerprint: 同步时的规则指纹
+            targets: 写入的 (文件夹, 标题, 正文摘要) 列表
+            signature: 计算摘要前的文件签名，见 stat_signature
+        """
+        key = self._key(source_path)
+        now = datetime.now().isoformat()
+        mtime_ns, size, inode = signature or (None, None, None)
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT INTO files (source_path, content_hash, fingerprint, synced_at, '
+                'st_mtime_ns, st_size, st_ino, hashed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(source_path) DO UPDATE SET '
+                'content_hash = excluded.content_hash, fingerprint = excluded.fingerprint, '
+                'synced_at = excluded.synced_at, st_mtime_ns = excluded.st_mtime_ns, '
+                'st_size = excluded.st_size, st_ino = excluded.st_ino, hashed_at = excluded.hashed_at',
+                (key, content_hash, fingerprint, now, mtime_ns, size, inode, time.time())
+            )
+            self._conn.execute('DELETE FROM targets WHERE source_path = ?', (key,))
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO targets (source_path, folder, title, body_hash, synced_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [(key, folder, title, body_hash, now) for folder, title, body_hash in targets]
+            )
+    
+    def record_signature(self, source_path: Union[str, Path], signature: Tuple[int, int, int]):
+        """
+        文件签名变化但内容摘要未变（如只更新了修改时间）时记录新的签名和摘要计算时间
+        
+        Args:
+            source_path: 源文件路径（须已有同步记录）
+            signature: 计算摘要前的文件签名
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE files SET st_mtime_ns = ?, st_size = ?, st_ino = ?, hashed_at = ? WHERE source_path = ?',
+                signature + (time.time(), self._key(source_path))
+            )
+    
+    def remove(self, source_path: Union[str, Path]):
+        """删除源文件的同步记录，下次同步时重新写入"""
+        key = self._key(source_path)
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM files WHERE source_path = ?', (key,))
+            self._conn.execute('DELETE FROM targets WHERE source_path = ?', (key,))
+    
+    def clear(self):
+        """清空全部同步记录"""
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM files')
+            self._conn.execute('DELETE FROM targets')
+        logger.info("🧹 已清空同步清单")
+    
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+    
+    def _key(self, source_path: Union[str, Path]) -> str:
+        """统一源文件路径格式作为主键（扫描大量文件时调用频繁，不构造 Path 对象）"""
+        return os.path.abspath(os.path.expanduser(source_path))
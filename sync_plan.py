@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+同步计划
+规划阶段只读取本地文件、同步清单和一次备忘录快照，为每个文件记录将要进行的变更
+（创建/更新/跳过/删除）及其目标文件夹和标题，以及执行所需的写入操作；
+计划可以保存为JSON预览或审阅，执行阶段再按计划分批写入备忘录
+"""
+
+import json
+import time
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+logger = logging.getLogger(__name__)
+
+# 计划文件格式版本，格式不兼容地变化时递增
+PLAN_VERSION = 2
+
+# 变更类型
+ACTION_CREATE = "create"
+ACTION_UPDATE = "update"
+ACTION_SKIP = "skip"
+ACTION_DELETE = "delete"
+# 规划时没有快照，无法判断创建还是更新
+ACTION_UPSERT = "upsert"
+# 不支持批量的规则，执行阶段直接调用规则，无法预先确定变更
+ACTION_EXECUTE = "execute"
+
+# 文件状态
+STATUS_PENDING = "pending"
+STATUS_UNCHANGED = "unchanged"
+STATUS_MISSING = "missing"
+
+def _pack_op(op: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    追加操作的正文是其整体改写操作（fallback）正文的尾部，保存时只保留整体改写的正文
+    和尾部的起始位置，正文在计划文件中只出现一次
+    """
+    fallback = op.get('fallback')
+    if op.get('action') != 'append' or not fallback:
+        return op
+    body = fallback.get('content', '')
+    tail = op.get('content', '')
+    offset = len(body) - len(tail)
+    if offset < 0 or body[offset:] != tail:
+        return op
+    packed = {key: value for key, value in op.items() if key != 'content'}
+    packed['content_offset'] = offset
+    return packed
+
+def _unpack_op(op: Dict[str, Any]) -> Dict[str, Any]:
+    """还原 _pack_op 保存的追加操作"""
+    if 'content_offset' not in op:
+        return op
+    op = dict(op)
+    offset = op.pop('content_offset')
+    op['content'] = op['fallback'].get('content', '')[offset:]
+    return op
+
+class SyncPlan:
+    """可序列化的同步计划"""
+    
+    def __init__(self, fingerprint: str, account: str, options: Dict[str, Any] = None,
+                 created_at: float = None):
+        """
+        初始化同步计划
+        
+        Args:
+            fingerprint: 规划时的规则指纹，执行时规则或相关配置变化则拒绝执行
+            account: 备忘录账户
+            options: 生成计划时的命令行选项（执行时按相同选项配置规则）
+            created_at: 规划时间戳，默认为当前时间
+        """
+        self.fingerprint = fingerprint
+        self.account = account
+        self.options = options or {}
+        self.created_at = created_at if created_at is not None else time.time()
+        self.files: List[Dict[str, Any]] = []
+    
+    def add_file(self, source_path: str, status: str, changes: List[Dict[str, Any]] = None,
+                 **fields: Any) -> Dict[str, Any]:
+        """
+        添加一个文件的计划
+        
+        Args:
+            source_path: 源文件路径
+            status: 文件状态（pending、unchanged、missing）
+            changes: 变更列表，每项包含 action、folder、title，可选 reason
+            **fields: 执行所需的其他字段（ops、rules、content_hash、signature、targets、
+                      applied、success_count、failed）
+        
+        Returns:
+            文件计划字典
+        """
+        entry = {'source_path': source_path, 'status': status, 'changes': changes or []}
+        entry.update(fields)
+        self.files.append(entry)
+        return entry
+    
+    def summary(self) -> Dict[str, int]:
+        """
+        按变更类型统计
+        
+        Returns:
+            变更类型到数量的映射，另含 files（文件数）
+        """
+        counts = {'files': len(self.files)}
+        for entry in self.files:
+            for change in entry['changes']:
+                counts[change['action']] = counts.get(change['action'], 0) + 1
+        return counts
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可JSON序列化的字典"""
+        return {
+            'version': PLAN_VERSION,
+            'created_at': self.created_at,
+            'fingerprint': self.fingerprint,
+            'account': self.account,
+            'options': self.options,
+            'summary': self.summary(),
+            'files': [dict(entry, ops=[_pack_op(op) for op in entry['ops']]) if 'ops' in entry else entry
+                      for entry in self.files]
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SyncPlan':
+        """
+        从字典恢复计划
+        
+        Args:
+            data: to_dict 的结果
+        
+        Returns:
+            同步计划
+        
+        Raises:
+            ValueError: 计划格式版本不支持
+        """
+        if data.get('version') != PLAN_VERSION:
+            raise ValueError(f"不支持的计划格式版本: {data.get('version')}")
+        
+        plan = cls(data['fingerprint'], data['account'], options=data.get('options'),
+                   created_at=data.get('created_at'))
+        plan.files = [dict(entry, ops=[_unpack_op(op) for op in entry['ops']]) if 'ops' in entry else entry
+                      for entry in data.get('files', [])]
+        return plan
+    
+    def save(self, path: Union[str, Path]):
+        """保存为JSON文件"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        logger.info(f"💾 已保存同步计划: {path}")
+    
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'SyncPlan':
+        """
+        读取JSON计划文件
+        
+        Args:
+            path: 计划文件路径
+        
+        Returns:
+            同步计划
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
@@ -5,13 +5,21 @@
 将指定Unity项目的所有MD文档统一同步到Claude/{项目名}目录，自动排除Library等目录
 """
 
-import subprocess
 import sys
 from pathlib import Path
 from markdown_converter import convert_markdown_for_notes
+from apple_bridge import AppleScriptBridge
+from applescript_templates import CompiledScriptCache
 
 class UnityProjectSyncer:
     def __init__(self):
+        # 单个文档使用预编译的参数化模板，整个项目使用批量写入
+        self.apple_bridge = AppleScriptBridge(
+            account="iCloud",
+            default_folder="Claude",
+            script_cache=CompiledScriptCache()
+        )
+        
         # Unity项目中需要排除的目录模式
         self.exclude_patterns = [
             "Library",           # Unity Library目录
@@ -52,74 +60,33 @@ class UnityProjectSyncer:
         
         return md_files
     
+    def build_doc(self, md_file: Path, project_name: str) -> tuple:
+        """生成文档的备忘录标题和内容"""
+        # 生成标题
+        title = f"[{project_name}] {md_file.stem}"
+        
+        # 读取和转换内容
+        with open(md_file, 'r', encoding='utf-8') as f:
+            original_content = f.read()
+        
+        # 转换内容
+        converted_content = convert_markdown_for_notes(original_content)
+        final_content = f"{md_file.stem}<br><br>{converted_content}"
+        return title, final_content
+    
     def sync_single_doc(self, md_file: Path, project_name: str, target_folder: str, index: int, total: int) -> bool:
         """同步单个文档到指定文件夹"""
         try:
-            # 生成标题
-            title = f"[{project_name}] {md_file.stem}"
-            
-            # 读取和转换内容
-            with open(md_file, 'r', encoding='utf-8') as f:
-                original_content = f.read()
+            title, final_content = self.build_doc(md_file, project_name)
             
-            # 转换内容
-            converted_content = convert_markdown_for_notes(original_content)
-            final_content = f"{md_file.stem}<br><br>{converted_content}"
+            # 查找并更新或创建备忘录，项目文件夹不存在时自动创建
+            result = self.apple_bridge.upsert_note(title, final_content, target_folder)
             
-            # 转义AppleScript字符串
-            escaped_title = title.replace('\\', '\\\\').replace('"', '\\"')
-            escaped_content = final_content.replace('\\', '\\\\').replace('"', '\\"')
-            
-            # 创建AppleScript
-            script = f'''
-            tell application "Notes"
-                set acc to account "iCloud"
-                set claudeFolder to folder "Claude" of acc
-                
-                -- 确保项目文件夹存在
-                try
-                    set projectFolder to folder "{project_name}" of claudeFolder
-                on error
-                    set projectFolder to make new folder at end of folders of claudeFolder with properties {{name:"{project_name}"}}
-                end try
-                
-                -- 检查是否已存在同名备忘录
-                set noteExists to false
-                repeat with n in notes of projectFolder
-                    if name of n is "{escaped_title}" then
-                        set noteExists to true
-                        tell n
-                            set body to "{escaped_content}"
-                        end tell
-                        exit repeat
-                    end if
-                end repeat
-                
-                -- 如果不存在则创建新备忘录
-                if not noteExists then
-                    set newNote to make new note at end of notes of projectFolder
-                    tell newNote
-                        set body to "{escaped_content}"
-                    end tell
-                end if
-                
-                return "success"
-            end tell
-            '''
-            
-            # 执行AppleScript
-            result = subprocess.run(
-                ['osascript', '-e', script],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            if result.returncode == 0:
+            if result is not None:
                 print(f"✅ {index}/{total} 同步成功: {md_file.stem}")
                 return True
             else:
-                print(f"❌ {index}/{total} 同步失败: {md_file.name} - {result.stderr}")
+                print(f"❌ {index}/{total} 同步失败: {md_file.name}")
                 return False
                 
         except Exception as e:
@@ -163,11 +130,32 @@ class UnityProjectSyncer:
             print("❌ 用户取消同步")
             return False
         
-        # 同步所有文档
+        # 同步所有文档：所有文档位于同一文件夹，合并为少量批量脚本调用
         success_count = 0
+        total = len(md_files)
+        ops = []
+        op_files = []
         for i, md_file in enumerate(md_files, 1):
-            if self.sync_single_doc(md_file, project_name, target_folder, i, len(md_files)):
+            try:
+                title, final_content = self.build_doc(md_file, project_name)
+            except Exception as e:
+                print(f"❌ {i}/{total} 处理失败: {md_file.name} - {e}")
+                continue
+            ops.append({
+                'action': 'upsert',
+                'title': title,
+                'content': final_content,
+                'folder': target_folder
+            })
+            op_files.append((i, md_file))
+        
+        results = self.apple_bridge.apply_batch(ops) if ops else []
+        for (i, md_file), result in zip(op_files, results):
+            if result['success']:
+                print(f"✅ {i}/{total} 同步成功: {md_file.stem}")
                 success_count += 1
+            else:
+                print(f"❌ {i}/{total} 同步失败: {md_file.name} - {result['error']}")
         
         print(f"\n📊 同步完成: 成功 {success_count}/{len(md_files)}")
         
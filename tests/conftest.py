@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""测试公共配置：项目模块位于仓库根目录"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+
+import pytest
+
+@pytest.fixture
+def make_engine(tmp_path):
+    """在临时目录中创建使用SQLite后端的同步引擎，notes_config 中的键覆盖默认值"""
+    from sync_engine import MDSyncEngine
+    
+    engines = []
+    
+    def factory(**notes_config):
+        config_path = tmp_path / f"config{len(engines)}.json"
+        config_path.write_text(json.dumps({
+            'notes_config': dict({'backend': 'sqlite', 'sqlite_path': str(tmp_path / 'notes.db')}, **notes_config),
+            'logging': {'level': 'WARNING', 'console_output': False, 'log_file': str(tmp_path / 'sync.log')},
+            'state': {'directory': str(tmp_path / 'state')}
+        }), encoding='utf-8')
+        engine = MDSyncEngine(str(config_path))
+        engines.append(engine)
+        return engine
+    
+    yield factory
+    for engine in engines:
+        engine.close()
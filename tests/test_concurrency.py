@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""AIMD自适应并发上限测试"""
+
+import threading
+import time
+
+from concurrency import AdaptiveConcurrencyLimiter, percentile
+
+def test_percentile_nearest_rank():
+    assert percentile([], 0.95) == 0.0
+    assert percentile([3.0, 1.0, 2.0], 0.5) == 2.0
+    assert percentile(list(range(1, 101)), 0.95) == 95
+    assert percentile([7.0], 0.95) == 7.0
+
+def test_initial_limit_is_clamped():
+    assert AdaptiveConcurrencyLimiter(initial_limit=20, max_limit=8).limit == 8
+    assert AdaptiveConcurrencyLimiter(initial_limit=0, min_limit=2).limit == 2
+
+def test_additive_increase_after_one_round_per_limit():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=4, target_p95=1.0)
+    
+    # 每个上限值需要观察 limit 个样本后才提高 1
+    limiter.record(0.1)
+    assert limiter.limit == 2
+    limiter.record(0.1)
+    assert limiter.limit == 3
+    for _ in range(3):
+        limiter.record(0.1)
+    assert limiter.limit == 4
+    
+    # 不超过上限
+    for _ in range(10):
+        limiter.record(0.1)
+    assert limiter.limit == 4
+    assert limiter.snapshot()['increases'] == 2
+
+def test_multiplicative_decrease_on_failure_and_timeout():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8, min_limit=1, max_limit=8)
+    limiter.record(1.0, timed_out=True)
+    assert limiter.limit == 4
+    limiter.record(1.0, success=False)
+    assert limiter.limit == 2
+    limiter.record(1.0, success=False)
+    limiter.record(1.0, success=False)
+    assert limiter.limit == 1
+    
+    stats = limiter.snapshot()
+    assert stats['failures'] == 4
+    assert stats['decreases'] == 3
+
+def test_decrease_when_p95_exceeds_target():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=8, target_p95=1.0)
+    for latency in (0.1, 0.1, 0.1, 3.0):
+        limiter.record(latency)
+    assert limiter.limit == 2
+    
+    # 旧上限下的慢样本被清空，新一轮快样本可以重新提高
+    limiter.record(0.1)
+    limiter.record(0.1)
+    assert limiter.limit == 3
+
+def test_acquire_blocks_at_limit():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=2)
+    limiter.acquire()
+    limiter.acquire()
+    assert limiter.in_flight == 2
+    
+    acquired = threading.Event()
+    
+    def waiter():
+        limiter.acquire()
+        acquired.set()
+    
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.1)
+    assert not acquired.is_set()
+    
+    limiter.release(0.1)
+    assert acquired.wait(2)
+    thread.join()
+    assert limiter.in_flight == 2
+
+def test_concurrent_callers_never_exceed_limit():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=3, max_limit=3)
+    lock = threading.Lock()
+    active = [0]
+    peak = [0]
+    
+    def call():
+        limiter.acquire()
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.01)
+        with lock:
+            active[0] -= 1
+        limiter.release(0.01)
+    
+    threads = [threading.Thread(target=call) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert peak[0] <= 3
+    assert limiter.in_flight == 0
+
+def test_snapshot_and_reset():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=4)
+    for latency in (0.5, 1.0, 2.0):
+        limiter.record(latency)
+    stats = limiter.snapshot()
+    assert stats['samples'] == 3
+    assert stats['latency_p50'] == 1.0
+    assert stats['latency_max'] == 2.0
+    
+    limit = limiter.limit
+    limiter.reset_stats()
+    stats = limiter.snapshot()
+    assert stats['samples'] == 0
+    assert stats['increases'] == 0
+    assert stats['limit'] == limit
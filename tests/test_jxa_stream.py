@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""JSON分帧读取协议测试（用Python替代JXA解释器）"""
+
+import sys
+import time
+
+import pytest
+
+from apple_bridge import AppleScriptBridge
+from jxa_stream import stream_records
+from osascript_pool import ScriptRunnerError
+from resilience import ERROR_NOT_FOUND
+
+def python_command(code):
+    """执行给定Python代码的解释器命令，stream_records 追加的 -e 脚本和参数出现在 sys.argv 中"""
+    return [sys.executable, '-c', code]
+
+def test_yields_records_and_passes_args():
+    code = ("import sys, json\n"
+            "for arg in sys.argv[3:]:\n"
+            "    print(json.dumps({'arg': arg}))\n"
+            "print('not json')\n")
+    records = list(stream_records("script", ["a", "b"], command=python_command(code)))
+    assert records == [{'arg': 'a'}, {'arg': 'b'}]
+
+def test_error_record_raises_with_code():
+    code = "import json; print(json.dumps({'type': 'error', 'message': 'missing', 'code': -1728}))"
+    with pytest.raises(ScriptRunnerError) as excinfo:
+        list(stream_records("script", command=python_command(code)))
+    assert excinfo.value.kind == ERROR_NOT_FOUND
+
+def test_nonzero_exit_reports_stderr():
+    code = "import sys; sys.stderr.write('execution error: boom (-1712)'); sys.exit(1)"
+    with pytest.raises(ScriptRunnerError, match="boom"):
+        list(stream_records("script", command=python_command(code)))
+
+def test_large_stderr_does_not_deadlock():
+    # stderr 超过管道缓冲区时脚本会阻塞在写入上，必须与 stdout 同时读取
+    code = ("import sys, json\n"
+            "sys.stderr.write('x' * (1024 * 1024))\n"
+            "sys.stderr.flush()\n"
+            "print(json.dumps({'ok': True}))\n")
+    start = time.monotonic()
+    records = list(stream_records("script", command=python_command(code), timeout=10))
+    assert records == [{'ok': True}]
+    assert time.monotonic() - start < 5
+
+def test_hung_script_times_out():
+    code = "import time; time.sleep(30)"
+    start = time.monotonic()
+    with pytest.raises(ScriptRunnerError) as excinfo:
+        list(stream_records("script", command=python_command(code), timeout=0.5))
+    assert excinfo.value.timeout
+    assert time.monotonic() - start < 5
+
+def test_timeout_extends_with_output_volume():
+    # 基础超时0.5秒，持续输出的数据每MB延长10秒，总耗时超过基础超时也不应超时
+    code = ("import sys, json, time\n"
+            "for i in range(8):\n"
+            "    print(json.dumps({'i': i, 'pad': 'x' * 200000}), flush=True)\n"
+            "    time.sleep(0.1)\n")
+    records = list(stream_records("script", command=python_command(code), timeout=0.5, timeout_per_mb=10))
+    assert len(records) == 8
+
+def test_early_stop_kills_process():
+    code = ("import json, time\n"
+            "print(json.dumps({'i': 0}), flush=True)\n"
+            "time.sleep(30)\n")
+    start = time.monotonic()
+    for record in stream_records("script", command=python_command(code), timeout=60):
+        break
+    assert time.monotonic() - start < 5
+
+def test_bridge_reads_use_script_timeout():
+    bridge = AppleScriptBridge(read_protocol="json", jxa_command=python_command("import time; time.sleep(30)"),
+                               script_timeout=0.5)
+    bridge.cassette = None
+    start = time.monotonic()
+    with pytest.raises(ScriptRunnerError) as excinfo:
+        list(bridge.iter_folders())
+    assert excinfo.value.timeout
+    assert time.monotonic() - start < 5
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""只追加内容的增量更新测试"""
+
+import threading
+
+from note_delta import DeltaPlanner, body_hash
+from note_manifest import NoteManifest
+
+def synced_planner(content, **kwargs):
+    """清单中已记录一次成功写入的规划器"""
+    manifest = NoteManifest(":memory:")
+    manifest.record("/docs/log.md", "id-1", "日志", "Claude")
+    manifest.record_body("/docs/log.md", body_hash(content), len(content))
+    return DeltaPlanner(manifest, **kwargs)
+
+def upsert(content, **fields):
+    return dict({'action': 'upsert', 'title': "日志", 'folder': "Claude", 'content': content,
+                 'source_path': "/docs/log.md"}, **fields)
+
+def test_extension_becomes_append_with_fallback():
+    planner = synced_planner("第一行\n")
+    op = upsert("第一行\n第二行\n")
+    planned = planner.plan(op)
+    
+    assert planned['action'] == 'append'
+    assert planned['content'] == "第二行\n"
+    assert DeltaPlanner.fallback(planned)['content'] == op['content']
+    assert DeltaPlanner.fallback(planned)['action'] == 'upsert'
+    assert planned['delta'] == {'source_path': "/docs/log.md", 'hash': body_hash(op['content']),
+                                'length': len(op['content'])}
+    # 不修改调用方的操作
+    assert 'delta' not in op
+
+def test_changed_prefix_rewrites_whole_body():
+    planner = synced_planner("第一行\n")
+    planned = planner.plan(upsert("第1行\n第二行\n"))
+    assert planned['action'] == 'upsert'
+    assert DeltaPlanner.fallback(planned) is None
+
+def test_no_append_when_title_folder_or_length_disagree():
+    planner = synced_planner("第一行\n")
+    assert planner.plan(upsert("第一行\n"))['action'] == 'upsert'
+    assert planner.plan(upsert("第一行\n追加", title="改名"))['action'] == 'upsert'
+    assert planner.plan(upsert("第一行\n追加", folder="Other"))['action'] == 'upsert'
+    assert synced_planner("第一行\n", min_prefix_chars=100).plan(upsert("第一行\n追加"))['action'] == 'upsert'
+
+def test_ops_without_tracking_are_untouched():
+    planner = synced_planner("第一行\n")
+    delete = {'action': 'delete', 'title': "日志", 'folder': "Claude", 'source_path': "/docs/log.md"}
+    assert planner.plan(delete) is delete
+    part = upsert("第一行\n追加", part={'index': 1})
+    assert planner.plan(part) is part
+    
+    created = planner.plan(upsert("第一行\n追加", action='create'))
+    assert created['action'] == 'create'
+    assert 'delta' in created
+
+def test_commit_records_body_only_on_success():
+    planner = synced_planner("a\n")
+    planned = planner.plan(upsert("a\nb\n"))
+    planner.commit(planned, {'success': False})
+    assert planner.manifest.get("/docs/log.md")['body_hash'] == body_hash("a\n")
+    
+    planned = planner.plan(upsert("a\nb\n"))
+    assert planned['action'] == 'append'
+    planner.commit(planned, {'success': True})
+    record = planner.manifest.get("/docs/log.md")
+    assert record['body_hash'] == body_hash("a\nb\n")
+    assert record['body_length'] == len("a\nb\n")
+    assert planner.plan(upsert("a\nb\nc\n"))['content'] == "c\n"
+
+def test_same_file_twice_before_commit_rewrites_second():
+    planner = synced_planner("a\n")
+    assert planner.plan(upsert("a\nb\n"))['action'] == 'append'
+    assert planner.plan(upsert("a\nb\nc\n"))['action'] == 'upsert'
+
+def test_concurrent_plans_append_once():
+    planner = synced_planner("a\n")
+    barrier = threading.Barrier(8)
+    actions = []
+    
+    def plan():
+        barrier.wait()
+        actions.append(planner.plan(upsert("a\nb\n"))['action'])
+    
+    threads = [threading.Thread(target=plan) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert actions.count('append') == 1
+    assert actions.count('upsert') == 7
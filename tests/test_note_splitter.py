@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""超大备忘录拆分测试"""
+
+from note_manifest import NoteManifest
+from note_splitter import NoteSplitter, part_source_key, part_title, split_content
+
+def size(text):
+    return len(text.encode('utf-8'))
+
+def document(sections=6, lines=20):
+    """由多个标题章节组成的Markdown"""
+    blocks = []
+    for i in range(sections):
+        blocks.append(f"## 第{i}章")
+        blocks.extend(f"第{i}章 第{j}行 内容内容内容" for j in range(lines))
+    return "\n".join(blocks)
+
+def apply(splitter, ops):
+    """模拟全部写入成功并记录结果"""
+    for op in ops:
+        splitter.commit(op, {'success': True})
+
+def test_small_content_is_not_split():
+    assert split_content("short", 100) == ["short"]
+
+def test_parts_respect_budget_and_preserve_content():
+    content = document()
+    parts = split_content(content, 1000)
+    assert len(parts) > 1
+    assert all(size(part) <= 1000 for part in parts)
+    assert "\n".join(parts) == content
+
+def test_parts_start_at_headings():
+    # 每章小于预算时，各部分都从标题行开始
+    parts = split_content(document(sections=6, lines=5), 400)
+    assert len(parts) > 1
+    assert all(part.startswith("## ") for part in parts)
+
+def test_br_separator_and_oversized_lines():
+    content = "<br>".join(["【标题】", "x" * 500, "尾"])
+    parts = split_content(content, 200)
+    assert all(size(part) <= 200 for part in parts)
+    assert "".join(parts).replace("<br>", "") == content.replace("<br>", "")
+    
+    # 多字节字符按字符边界切开
+    parts = split_content("备" * 100, 31)
+    assert all(size(part) <= 31 for part in parts)
+    assert "".join(parts) == "备" * 100
+
+def test_plan_without_manifest_writes_titled_parts():
+    splitter = NoteSplitter(max_part_bytes=1000)
+    op = {'action': 'upsert', 'title': "大文件", 'folder': "F", 'content': document(),
+          'source_path': "/docs/big.md"}
+    ops, unchanged = splitter.plan(op)
+    
+    assert not unchanged
+    count = len(ops)
+    assert count > 1
+    for index, part_op in enumerate(ops, start=1):
+        assert part_op['title'] == part_title("大文件", index, count)
+        assert part_op['content'].startswith(part_op['title'])
+        assert part_op['source_path'] == part_source_key("/docs/big.md", index)
+        assert size(part_op['content']) <= 1000
+        assert 'part' not in part_op
+
+def test_unchanged_parts_are_skipped_and_only_changed_parts_rewritten():
+    splitter = NoteSplitter(max_part_bytes=1000, manifest=NoteManifest(":memory:"))
+    content = document()
+    op = {'action': 'upsert', 'title': "大文件", 'folder': "F", 'content': content,
+          'source_path': "/docs/big.md"}
+    
+    ops, unchanged = splitter.plan(op)
+    apply(splitter, ops)
+    count = len(ops)
+    
+    assert splitter.plan(op) == ([], True)
+    
+    # 只改动最后一章，只改写最后一部分
+    changed = dict(op, content=content.replace("第5章 第19行", "第5章 第十九行"))
+    ops, unchanged = splitter.plan(changed)
+    assert not unchanged
+    assert [part_op['title'] for part_op in ops] == [part_title("大文件", count, count)]
+
+def test_shrinking_deletes_stale_parts():
+    manifest = NoteManifest(":memory:")
+    splitter = NoteSplitter(max_part_bytes=1000, manifest=manifest)
+    op = {'action': 'upsert', 'title': "大文件", 'folder': "F", 'content': document(),
+          'source_path': "/docs/big.md"}
+    ops, _ = splitter.plan(op)
+    apply(splitter, ops)
+    old_count = len(ops)
+    
+    # 缩小到不再超出预算：删除全部旧部分，再写入单条备忘录
+    small = dict(op, content="## 只剩一章\n内容")
+    assert splitter.needs_split(size(small['content']), "/docs/big.md")
+    ops, _ = splitter.plan(small)
+    deletes = [part_op for part_op in ops if part_op['action'] == 'delete']
+    assert len(deletes) == old_count
+    assert all(part_op['cleanup'] for part_op in deletes)
+    assert ops[-1] is small
+    
+    apply(splitter, ops)
+    assert manifest.get_parts("/docs/big.md") == {}
+    assert not splitter.needs_split(size(small['content']), "/docs/big.md")
+
+def test_first_split_deletes_previous_single_note():
+    manifest = NoteManifest(":memory:")
+    manifest.record("/docs/big.md", "id-1", "大文件", "F")
+    splitter = NoteSplitter(max_part_bytes=1000, manifest=manifest)
+    op = {'action': 'upsert', 'title': "大文件", 'folder': "F", 'content': document(),
+          'source_path': "/docs/big.md"}
+    
+    ops, _ = splitter.plan(op)
+    assert ops[0] == {'action': 'delete', 'title': "大文件", 'folder': "F",
+                      'source_path': "/docs/big.md", 'cleanup': True}
+
+def test_failed_writes_are_not_recorded():
+    manifest = NoteManifest(":memory:")
+    splitter = NoteSplitter(max_part_bytes=1000, manifest=manifest)
+    op = {'action': 'upsert', 'title': "大文件", 'folder': "F", 'content': document(),
+          'source_path': "/docs/big.md"}
+    ops, _ = splitter.plan(op)
+    for part_op in ops:
+        splitter.commit(part_op, {'success': False})
+    
+    assert manifest.get_parts("/docs/big.md") == {}
+    assert len(splitter.plan(op)[0]) == len(ops)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""备忘录数据库只读查询测试（使用按 NoteStore 表结构构造的夹具数据库）"""
+
+import sqlite3
+
+import pytest
+
+from apple_bridge import AppleScriptBridge
+from notestore_reader import NoteStoreReader, NoteStoreError
+
+STORE_UUID = "0A1B2C3D-TEST"
+
+# 实体编号与真实数据库一样由 Z_PRIMARYKEY 给出
+ENT_NOTE, ENT_ACCOUNT, ENT_FOLDER = 12, 14, 15
+
+OBJECT_COLUMNS = ('Z_PK', 'Z_ENT', 'ZNAME', 'ZTITLE1', 'ZTITLE2', 'ZFOLDER', 'ZPARENT', 'ZOWNER',
+                  'ZCREATIONDATE1', 'ZCREATIONDATE3', 'ZMODIFICATIONDATE1', 'ZMARKEDFORDELETION', 'ZFOLDERTYPE')
+
+def obj(pk, ent, **fields):
+    """一行 ZICCLOUDSYNCINGOBJECT"""
+    return tuple([pk, ent] + [fields.get(column) for column in OBJECT_COLUMNS[2:]])
+
+@pytest.fixture
+def notestore(tmp_path):
+    """构造一个小型 NoteStore.sqlite"""
+    path = tmp_path / "NoteStore.sqlite"
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE Z_PRIMARYKEY (Z_ENT INTEGER PRIMARY KEY, Z_NAME VARCHAR, Z_SUPER INTEGER, Z_MAX INTEGER)')
+    conn.execute('CREATE TABLE Z_METADATA (Z_VERSION INTEGER PRIMARY KEY, Z_UUID VARCHAR(255), Z_PLIST BLOB)')
+    conn.execute(f'CREATE TABLE ZICCLOUDSYNCINGOBJECT ({", ".join(OBJECT_COLUMNS)})')
+    conn.executemany('INSERT INTO Z_PRIMARYKEY (Z_ENT, Z_NAME) VALUES (?, ?)',
+                     [(ENT_NOTE, 'ICNote'), (ENT_ACCOUNT, 'ICAccount'), (ENT_FOLDER, 'ICFolder')])
+    conn.execute('INSERT INTO Z_METADATA (Z_VERSION, Z_UUID) VALUES (1, ?)', (STORE_UUID,))
+    conn.executemany(f'INSERT INTO ZICCLOUDSYNCINGOBJECT VALUES ({", ".join("?" * len(OBJECT_COLUMNS))})', [
+        obj(1, ENT_ACCOUNT, ZNAME="iCloud"),
+        obj(2, ENT_ACCOUNT, ZNAME="On My Mac"),
+        obj(10, ENT_FOLDER, ZTITLE2="Notes", ZOWNER=1),
+        obj(11, ENT_FOLDER, ZTITLE2="Claude", ZOWNER=1),
+        obj(12, ENT_FOLDER, ZTITLE2="Proj", ZPARENT=11, ZOWNER=1),
+        obj(13, ENT_FOLDER, ZTITLE2="Recently Deleted", ZOWNER=1, ZFOLDERTYPE=1),
+        obj(14, ENT_FOLDER, ZTITLE2="Old", ZOWNER=1, ZMARKEDFORDELETION=1),
+        obj(15, ENT_FOLDER, ZTITLE2="Notes", ZOWNER=2),
+        obj(16, ENT_FOLDER, ZTITLE2="Nested", ZPARENT=13, ZOWNER=1),
+        obj(100, ENT_NOTE, ZTITLE1="Alpha", ZFOLDER=10, ZCREATIONDATE1=0.0, ZMODIFICATIONDATE1=86400.5),
+        obj(101, ENT_NOTE, ZTITLE1="Beta", ZFOLDER=12, ZCREATIONDATE3=60.0, ZMODIFICATIONDATE1=120.0),
+        obj(102, ENT_NOTE, ZTITLE1="Gamma", ZFOLDER=12, ZMODIFICATIONDATE1=0.0),
+        obj(103, ENT_NOTE, ZTITLE1="Beta", ZFOLDER=12, ZMODIFICATIONDATE1=0.0, ZMARKEDFORDELETION=1),
+        obj(104, ENT_NOTE, ZTITLE1="Trashed", ZFOLDER=13, ZMODIFICATIONDATE1=0.0),
+        obj(105, ENT_NOTE, ZTITLE1="Elsewhere", ZFOLDER=15, ZMODIFICATIONDATE1=0.0),
+    ])
+    conn.commit()
+    conn.close()
+    return path
+
+def test_folder_listing_excludes_trash_deleted_and_other_accounts(notestore):
+    reader = NoteStoreReader(notestore, account="iCloud")
+    assert reader.get_folders() == ["Claude", "Claude/Proj", "Notes"]
+    assert reader.folder_tree().has_folder("Claude/Proj")
+
+def test_notes_in_folder(notestore):
+    reader = NoteStoreReader(notestore, account="iCloud")
+    assert sorted(reader.get_notes("Claude/Proj")) == ["Beta", "Gamma"]
+    assert reader.get_notes("Missing") == []
+
+def test_lookup_by_title_and_id(notestore):
+    reader = NoteStoreReader(notestore, account="iCloud")
+    
+    note = reader.get_note("Beta", "Claude/Proj")
+    assert note['id'] == f"x-coredata://{STORE_UUID}/ICNote/p101"
+    assert note['folder'] == "Claude/Proj"
+    
+    # 按ID定位时标题可以已经改变
+    assert reader.get_note("Renamed", "Claude/Proj", note_id=note['id'])['name'] == "Beta"
+    assert reader.get_note("Beta", "Notes", note_id=note['id']) is None
+    assert reader.note_exists("Alpha", "Notes")
+    assert not reader.note_exists("Trashed", "Recently Deleted")
+
+def test_dates_are_converted_from_core_data_epoch(notestore):
+    reader = NoteStoreReader(notestore, account="iCloud")
+    
+    alpha = reader.get_note("Alpha", "Notes")
+    assert alpha['creation_date'] == "2001-01-01T00:00:00.000Z"
+    assert alpha['modification_date'] == "2001-01-02T00:00:00.500Z"
+    
+    beta = reader.get_note("Beta", "Claude/Proj")
+    assert beta['creation_date'] == "2001-01-01T00:01:00.000Z"
+    assert beta['modification_date'] == "2001-01-01T00:02:00.000Z"
+
+def test_count_notes_by_folder(notestore):
+    reader = NoteStoreReader(notestore, account="iCloud")
+    assert reader.count_notes_by_folder() == {"Claude": 0, "Claude/Proj": 2, "Notes": 1}
+
+def test_load_index(notestore):
+    index = NoteStoreReader(notestore, account="iCloud").load_index()
+    assert index.has_note("Claude/Proj", "Beta")
+    assert not index.has_note("Recently Deleted", "Trashed")
+    assert len(index) == 3
+
+def test_missing_database_and_account(tmp_path, notestore):
+    with pytest.raises(NoteStoreError):
+        NoteStoreReader(tmp_path / "missing.sqlite").get_folders()
+    with pytest.raises(NoteStoreError):
+        NoteStoreReader(notestore, account="Exchange").get_folders()
+
+def test_bridge_reads_through_store(notestore):
+    bridge = AppleScriptBridge(read_store=NoteStoreReader(notestore, account="iCloud"))
+    bridge.cassette = None
+    
+    def no_scripts(*args, **kwargs):
+        raise AssertionError("读取不应执行脚本")
+    
+    bridge._run_osascript = no_scripts
+    assert sorted(bridge.get_existing_notes("Claude/Proj")) == ["Beta", "Gamma"]
+    assert bridge.count_notes_by_folder() == {"Claude": 0, "Claude/Proj": 2, "Notes": 1}
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""常驻脚本执行进程池测试（用实现相同分帧协议的Python执行器替代JXA）"""
+
+import os
+import sys
+import time
+
+import pytest
+
+from osascript_pool import OsascriptWorkerPool, ScriptRunnerError
+from resilience import ERROR_NOT_FOUND, ERROR_TIMEOUT
+
+# 按 "<字节数>\n<UTF-8 JSON>" 分帧读写；脚本文本是简单指令：
+#   echo:<文本>  原样返回文本和参数      pid    返回进程号
+#   sleep:<秒>   睡眠后返回              fail   返回带错误号的错误
+#   pings        返回本进程收到的ping次数
+RUNNER = r'''
+import json, os, sys, time
+stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+pings = 0
+
+def write_frame(obj):
+    body = json.dumps(obj).encode('utf-8')
+    stdout.write(str(len(body)).encode('ascii') + b'\n' + body)
+    stdout.flush()
+
+while True:
+    header = stdin.readline()
+    if not header:
+        break
+    req = json.loads(stdin.read(int(header)).decode('utf-8'))
+    if req['op'] == 'ping':
+        pings += 1
+        write_frame({'ok': True, 'result': 'pong'})
+        continue
+    cmd, _, arg = req.get('script', '').partition(':')
+    if cmd == 'echo':
+        write_frame({'ok': True, 'result': '|'.join([arg] + req['args'])})
+    elif cmd == 'pid':
+        write_frame({'ok': True, 'result': os.getpid()})
+    elif cmd == 'sleep':
+        time.sleep(float(arg))
+        write_frame({'ok': True, 'result': 'woke'})
+    elif cmd == 'pings':
+        write_frame({'ok': True, 'result': pings})
+    else:
+        write_frame({'ok': False, 'error': 'Can’t get note.', 'code': -1728})
+'''
+
+def make_pool(**kwargs):
+    kwargs.setdefault('runner_command', [sys.executable, '-c', RUNNER])
+    kwargs.setdefault('request_timeout', 5)
+    return OsascriptWorkerPool(**kwargs)
+
+def test_framing_round_trip_with_unicode_and_large_payload():
+    with make_pool(size=1) as pool:
+        assert pool.run_script("echo:你好", ["a", "b"]) == "你好|a|b"
+        
+        # 远超单次读取的64KB，需要跨多次读取拼帧
+        big = "备忘录" * 100000
+        assert pool.run_script("echo:" + big) == big
+        
+        # 同一进程上连续请求不会读到残留的半帧
+        assert pool.run_script("echo:again") == "again"
+
+def test_workers_are_reused():
+    with make_pool(size=1) as pool:
+        assert pool.run_script("pid") == pool.run_script("pid")
+
+def test_script_error_carries_code():
+    with make_pool(size=1) as pool:
+        pid = pool.run_script("pid")
+        with pytest.raises(ScriptRunnerError) as excinfo:
+            pool.run_script("fail")
+        assert excinfo.value.kind == ERROR_NOT_FOUND
+        assert excinfo.value.code == -1728
+        
+        # 脚本错误不影响进程，进程继续复用
+        assert pool.run_script("pid") == pid
+
+def test_timeout_discards_worker():
+    with make_pool(size=1) as pool:
+        pid = pool.run_script("pid")
+        
+        start = time.monotonic()
+        with pytest.raises(ScriptRunnerError) as excinfo:
+            pool.run_script("sleep:30", timeout=0.3)
+        assert excinfo.value.kind == ERROR_TIMEOUT
+        assert time.monotonic() - start < 5
+        
+        # 超时的进程可能卡在半帧上，必须换新进程
+        assert pool.run_script("pid") != pid
+        assert pool._spawned == 1
+
+def test_recycles_after_max_requests():
+    with make_pool(size=1, max_requests_per_worker=3) as pool:
+        pids = [pool.run_script("pid") for _ in range(6)]
+        assert pids[0] == pids[1] == pids[2]
+        assert pids[3] == pids[4] == pids[5]
+        assert pids[0] != pids[3]
+
+def test_recycles_after_max_age():
+    with make_pool(size=1, max_worker_age=0.3) as pool:
+        pid = pool.run_script("pid")
+        assert pool.run_script("pid") == pid
+        time.sleep(0.4)
+        assert pool.run_script("pid") != pid
+
+def test_idle_worker_is_pinged_before_reuse():
+    with make_pool(size=1, health_check_interval=0.2) as pool:
+        assert pool.run_script("pings") == "0"
+        assert pool.run_script("pings") == "0"
+        time.sleep(0.3)
+        assert pool.run_script("pings") == "1"
+
+def test_dead_worker_is_replaced():
+    with make_pool(size=1) as pool:
+        pid = int(pool.run_script("pid"))
+        worker = pool._idle.get_nowait()
+        worker.process.kill()
+        worker.process.wait()
+        pool._idle.put(worker)
+        
+        assert int(pool.run_script("pid")) != pid
+        assert pool._spawned == 1
+
+def test_closed_pool_rejects_requests():
+    pool = make_pool(size=1)
+    pool.run_script("pid")
+    pool.close()
+    assert pool._spawned == 0
+    with pytest.raises(ScriptRunnerError):
+        pool.run_script("pid")
+
+def test_missing_runner_reports_error():
+    pool = make_pool(runner_command=[os.path.join(os.sep, "nonexistent", "runner")])
+    with pytest.raises(ScriptRunnerError):
+        pool.run_script("pid")
+    assert pool._spawned == 0
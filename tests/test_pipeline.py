@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""分级线程流水线测试"""
+
+import threading
+import time
+
+import pytest
+
+from pipeline import StagedPipeline
+from rules.basic_rules import CreateNewRule
+
+def collect(pipeline, source, max_batch=1):
+    batches = []
+    pipeline.run(source, lambda iterator: batches.extend(iterator), max_batch=max_batch)
+    return batches
+
+def test_all_items_pass_through_every_stage():
+    pipeline = StagedPipeline(queue_size=4)
+    pipeline.add_stage("double", lambda x: [x * 2], workers=3)
+    pipeline.add_stage("expand", lambda x: [x, x + 1], workers=2)
+    
+    batches = collect(pipeline, range(100), max_batch=8)
+    items = [item for batch in batches for item in batch]
+    assert sorted(items) == sorted(v for x in range(100) for v in (2 * x, 2 * x + 1))
+    assert all(1 <= len(batch) <= 8 for batch in batches)
+    assert pipeline.errors == []
+
+def test_stage_may_drop_items():
+    pipeline = StagedPipeline()
+    pipeline.add_stage("even", lambda x: [x] if x % 2 == 0 else [], workers=2)
+    assert sorted(item for batch in collect(pipeline, range(10)) for item in batch) == [0, 2, 4, 6, 8]
+
+def test_item_errors_are_recorded_and_processing_continues():
+    def fail_on_three(x):
+        if x == 3:
+            raise ValueError("boom")
+        return [x]
+    
+    pipeline = StagedPipeline()
+    pipeline.add_stage("check", fail_on_three, workers=2)
+    items = [item for batch in collect(pipeline, range(6)) for item in batch]
+    assert sorted(items) == [0, 1, 2, 4, 5]
+    assert [(stage, item, str(error)) for stage, item, error in pipeline.errors] == [("check", 3, "boom")]
+
+def test_source_error_is_recorded():
+    def source():
+        yield 1
+        raise OSError("walk failed")
+    
+    pipeline = StagedPipeline()
+    pipeline.add_stage("id", lambda x: [x])
+    assert [item for batch in collect(pipeline, source()) for item in batch] == [1]
+    assert pipeline.errors[0][0] == "source"
+
+def test_stages_overlap():
+    # 每级耗时0.05秒、各4个线程，串行需要 20 * 0.1 秒
+    def slow(x):
+        time.sleep(0.05)
+        return [x]
+    
+    pipeline = StagedPipeline(queue_size=2)
+    pipeline.add_stage("a", slow, workers=4)
+    pipeline.add_stage("b", slow, workers=4)
+    start = time.monotonic()
+    collect(pipeline, range(20))
+    assert time.monotonic() - start < 1.0
+
+def test_backpressure_bounds_read_ahead():
+    produced = []
+    
+    def source():
+        for i in range(1000):
+            produced.append(i)
+            yield i
+    
+    def sink(batches):
+        for batch in batches:
+            time.sleep(0.2)
+            return
+    
+    pipeline = StagedPipeline(queue_size=2)
+    pipeline.add_stage("id", lambda x: [x])
+    pipeline.run(source(), sink)
+    # 两个队列各2项，加上各线程手中的项
+    assert len(produced) < 10
+
+def test_sink_error_stops_all_threads():
+    def sink(batches):
+        next(batches)
+        raise RuntimeError("write failed")
+    
+    before = threading.active_count()
+    pipeline = StagedPipeline(queue_size=2)
+    pipeline.add_stage("id", lambda x: [x], workers=3)
+    with pytest.raises(RuntimeError):
+        pipeline.run(iter(range(10 ** 6)), sink)
+    assert threading.active_count() == before
+
+def write_docs(folder, count):
+    folder.mkdir()
+    for i in range(count):
+        (folder / f"doc{i}.md").write_text(f"# 文档{i}\n\n正文 {i}\n", encoding='utf-8')
+
+def count_snapshot_loads(engine, monkeypatch):
+    loads = []
+    original = engine.backend.load_snapshot
+    
+    def load_snapshot():
+        loads.append(1)
+        return original()
+    
+    monkeypatch.setattr(engine.backend, 'load_snapshot', load_snapshot)
+    return loads
+
+def test_engine_pipeline_syncs_without_snapshot(tmp_path, make_engine, monkeypatch):
+    write_docs(tmp_path / "docs", 20)
+    engine = make_engine(sync_manifest={'enabled': False})
+    loads = count_snapshot_loads(engine, monkeypatch)
+    
+    stats = engine.sync_folder(str(tmp_path / "docs"))
+    assert (stats['total_files'], stats['success_count'], stats['failure_count']) == (20, 20, 0)
+    notes = [note for folder in engine.backend.get_folders() for note in engine.backend.iter_notes(folder)]
+    assert len(notes) == 20
+    # 默认规则都走批量写入，不需要快照
+    assert loads == []
+
+def test_engine_pipeline_loads_snapshot_for_deferred_existence_checks(tmp_path, make_engine, monkeypatch):
+    write_docs(tmp_path / "docs", 20)
+    engine = make_engine(sync_manifest={'enabled': False})
+    engine.add_rule(CreateNewRule(priority=200))
+    loads = count_snapshot_loads(engine, monkeypatch)
+    
+    stats = engine.sync_folder(str(tmp_path / "docs"))
+    assert stats['failure_count'] == 0
+    assert loads == [1]
+    assert engine.backend.snapshot_index is None
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""错误分类、重试器与熔断器测试"""
+
+import logging
+
+import pytest
+
+from apple_bridge import AppleScriptBridge
+from applescript_templates import SCRIPT_TEMPLATES
+from osascript_pool import ScriptRunnerError
+from resilience import (
+    CircuitBreaker, ScriptRetrier, classify_error, parse_error_code,
+    ERROR_TIMEOUT, ERROR_APP_NOT_RUNNING, ERROR_NOT_FOUND, ERROR_PERMISSION, ERROR_OTHER
+)
+
+class FakeRunner:
+    """按顺序返回预设输出的脚本执行器，替代 osascript"""
+    
+    def __init__(self, outputs):
+        self.outputs = list(outputs)
+        self.calls = 0
+        self.scripts = []
+    
+    def __call__(self, script, args, script_file=None, timeout=None):
+        self.calls += 1
+        self.scripts.append(script)
+        output = self.outputs.pop(0) if len(self.outputs) > 1 else self.outputs[0]
+        if isinstance(output, Exception):
+            raise output
+        return output
+
+def make_bridge(outputs, max_attempts=3, failure_threshold=5):
+    """创建使用假执行器和无等待重试器的桥接"""
+    retrier = ScriptRetrier(max_attempts=max_attempts, base_delay=0, max_delay=0,
+                            breaker=CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=60))
+    bridge = AppleScriptBridge(retrier=retrier)
+    bridge.cassette = None
+    runner = FakeRunner(outputs)
+    bridge._run_osascript = runner
+    return bridge, runner
+
+def test_parse_and_classify_error_codes():
+    assert parse_error_code("execution error: Notes got an error: AppleEvent timed out. (-1712)") == -1712
+    assert parse_error_code("error: 备忘录不存在: 标题") is None
+    assert classify_error("error: timed out (-1712)") == ERROR_TIMEOUT
+    assert classify_error("", code=-600) == ERROR_APP_NOT_RUNNING
+    assert classify_error("error: 对象不存在 (-1728)") == ERROR_NOT_FOUND
+    assert classify_error("error: Not authorized (-1743)") == ERROR_PERMISSION
+    assert classify_error("error: 备忘录不存在 (-2700)") == ERROR_OTHER
+    assert classify_error("anything", timeout=True) == ERROR_TIMEOUT
+
+def test_circuit_breaker_opens_and_recovers(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("resilience.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.wait_time() == pytest.approx(10)
+    
+    now[0] += 10
+    assert breaker.wait_time() == 0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # 试探调用进行中时其他调用等待
+    assert breaker.wait_time() > 0
+    
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.open_count == 2
+    
+    now[0] += 10
+    assert breaker.wait_time() == 0
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_retrier_retries_only_retryable_errors():
+    retrier = ScriptRetrier(max_attempts=3, base_delay=0, max_delay=0)
+    attempts = []
+    
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ScriptRunnerError("AppleScript执行超时", timeout=True)
+        return "ok"
+    
+    assert retrier.call(flaky, AppleScriptBridge._describe_error) == "ok"
+    assert retrier.snapshot()['retries'] == 2
+    
+    attempts.clear()
+    
+    def missing():
+        attempts.append(1)
+        raise ScriptRunnerError("execution error: 对象不存在 (-1728)")
+    
+    with pytest.raises(ScriptRunnerError):
+        retrier.call(missing, AppleScriptBridge._describe_error)
+    assert len(attempts) == 1
+
+def test_caught_timeout_is_retried():
+    bridge, runner = make_bridge(["error: Notes got an error: AppleEvent timed out. (-1712)", "success|||x-id"])
+    
+    assert bridge.execute_applescript("script") == "success|||x-id"
+    assert runner.calls == 2
+    snapshot = bridge.retrier.snapshot()
+    assert snapshot['retries'] == 1
+    assert snapshot['errors'] == {ERROR_TIMEOUT: 1}
+
+def test_caught_app_not_running_opens_breaker():
+    bridge, runner = make_bridge(["error: Notes isn’t running. (-600)"], max_attempts=2, failure_threshold=2)
+    
+    assert bridge.execute_applescript("script") is None
+    assert runner.calls == 2
+    assert bridge.retrier.breaker.state == CircuitBreaker.OPEN
+    assert bridge.retrier.snapshot()['errors'] == {ERROR_APP_NOT_RUNNING: 2}
+
+def test_caught_permission_error_is_logged_without_retry(caplog):
+    bridge, runner = make_bridge(["error: Not authorized to send Apple events to Notes. (-1743)"])
+    
+    with caplog.at_level(logging.ERROR):
+        assert bridge.execute_applescript("script") is None
+    assert runner.calls == 1
+    assert bridge.retrier.snapshot()['errors'] == {ERROR_PERMISSION: 1}
+    assert any("自动化" in record.getMessage() for record in caplog.records)
+
+def test_other_caught_errors_are_returned_to_caller():
+    bridge, runner = make_bridge(["error: 备忘录不存在: 标题 (-2700)"])
+    
+    assert bridge.execute_applescript("script") == "error: 备忘录不存在: 标题 (-2700)"
+    assert runner.calls == 1
+    assert not bridge.update_note("标题", "正文", "Notes")
+
+def test_write_script_reports_error_number():
+    bridge, runner = make_bridge(["error: Notes got an error: AppleEvent timed out. (-1712)", "false", "success|||x-id"])
+    
+    assert bridge.create_note("标题", "正文", "Notes")
+    assert runner.calls == 3
+    assert "on error errMsg number errNum" in runner.scripts[0]
+
+def test_timed_out_create_is_not_retried_when_note_exists():
+    bridge, runner = make_bridge(["error: Notes got an error: AppleEvent timed out. (-1712)", "true", "success|||x-id"])
+    
+    assert bridge.create_note("标题", "正文", "Notes")
+    # 超时后查询到备忘录已创建，不再执行创建脚本
+    assert runner.calls == 2
+    assert "make new note" not in runner.scripts[1]
+
+def test_timed_out_create_is_not_retried_when_existence_is_unknown():
+    bridge, runner = make_bridge([ScriptRunnerError("AppleScript执行超时", timeout=True)])
+    
+    assert not bridge.create_note("标题", "正文", "Notes")
+    # 创建超时，随后的存在性查询（可重试的读取）也一直超时
+    assert sum("make new note" in script for script in runner.scripts) == 1
+    assert runner.calls == 1 + bridge.retrier.max_attempts
+
+def test_timed_out_append_and_delete_are_not_retried():
+    bridge, runner = make_bridge(["error: Notes got an error: AppleEvent timed out. (-1712)"])
+    
+    assert not bridge.append_note("标题", "正文", "Notes")
+    assert runner.calls == 1
+    assert not bridge.delete_note("标题", "Notes")
+    assert runner.calls == 2
+
+def test_non_idempotent_scripts_still_retry_when_notes_not_running():
+    bridge, runner = make_bridge(["error: Notes is not running. (-600)", "success"])
+    
+    assert bridge.delete_note("标题", "Notes")
+    assert runner.calls == 2
+
+def test_timed_out_update_and_upsert_are_retried():
+    bridge, runner = make_bridge(["error: Notes got an error: AppleEvent timed out. (-1712)", "success|||x-id"])
+    assert bridge.update_note("标题", "正文", "Notes")
+    assert runner.calls == 2
+    
+    bridge, runner = make_bridge(["error: Notes got an error: AppleEvent timed out. (-1712)", "updated|||x-id"])
+    assert bridge.upsert_note("标题", "正文", "Notes") == "updated"
+    assert runner.calls == 2
+
+def test_templates_report_error_number():
+    for name, source in SCRIPT_TEMPLATES.items():
+        assert 'return "error: " & errMsg\n' not in source, name
+        if "on error errMsg" in source:
+            assert 'return "error: " & errMsg & " (" & errNum & ")"' in source, name
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""模拟延迟的内存后端测试"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import simulated_backend
+from concurrency import AdaptiveConcurrencyLimiter
+from note_manifest import NoteManifest
+from simulated_backend import LatencyModel, SimulatedNotesBackend
+
+def test_engine_accepts_simulated_backend(make_engine):
+    engine = make_engine(backend='simulated', simulation={'time_scale': 0})
+    assert isinstance(engine.backend, SimulatedNotesBackend)
+    assert not any("后端" in issue for issue in engine.validate_config())
+
+def test_validate_config_rejects_unknown_backend(make_engine):
+    engine = make_engine()
+    engine.config['notes_config']['backend'] = 'bogus'
+    assert any("bogus" in issue for issue in engine.validate_config())
+
+def make_backend(monkeypatch, time_scale=1.0, **options):
+    """创建延迟固定（无抖动）的模拟后端，sleep 只记录不等待"""
+    sleeps = []
+    monkeypatch.setattr(simulated_backend, "time", SimpleNamespace(
+        sleep=lambda seconds: sleeps.append(seconds), monotonic=time.monotonic))
+    latency = LatencyModel(call_seconds=0.2, call_jitter=0, spawn_seconds=0.05,
+                           per_kb_seconds=0.01, per_note_seconds=0.001, seed=1)
+    backend = SimulatedNotesBackend(latency=latency, time_scale=time_scale, **options)
+    return backend, sleeps
+
+def test_latency_model_is_reproducible_with_seed():
+    first = LatencyModel(stall_probability=0.3, seed=7)
+    second = LatencyModel(stall_probability=0.3, seed=7)
+    samples = [first.sample(2048, 10) for _ in range(20)]
+    assert samples == [second.sample(2048, 10) for _ in range(20)]
+    assert len({seconds for seconds, _ in samples}) > 1
+    
+    fixed = LatencyModel(call_seconds=0.2, call_jitter=0, per_kb_seconds=0.01, per_note_seconds=0.001,
+                         stall_probability=1.0, stall_seconds=10.0, seed=7)
+    seconds, stalled = fixed.sample(payload_bytes=4096, notes_scanned=100)
+    assert stalled
+    assert seconds == pytest.approx(0.2 + 4 * 0.01 + 100 * 0.001 + 10.0)
+
+def test_charge_sleeps_scaled_spawn_and_app_time(monkeypatch):
+    backend, sleeps = make_backend(monkeypatch, time_scale=0.5)
+    # 初始化（创建默认文件夹）不计费
+    assert backend.get_stats()['calls'] == 0 and sleeps == []
+    
+    backend._charge(payload_bytes=2048, notes_scanned=50)
+    app = 0.2 + 2 * 0.01 + 50 * 0.001
+    assert sleeps == pytest.approx([0.05 * 0.5, app * 0.5])
+    stats = backend.get_stats()
+    assert stats['calls'] == 1
+    assert stats['simulated_seconds'] == pytest.approx(0.05 + app)
+    assert stats['payload_bytes'] == 2048 and stats['notes_scanned'] == 50
+    
+    with backend._uncharged():
+        backend._charge(payload_bytes=2048)
+    assert backend.get_stats()['calls'] == 1
+
+def test_time_scale_zero_only_accumulates(monkeypatch):
+    backend, sleeps = make_backend(monkeypatch, time_scale=0)
+    backend.create_note("标题", "x" * 1024)
+    assert sleeps == []
+    assert backend.get_stats()['simulated_seconds'] == pytest.approx(0.05 + 0.2 + 0.01)
+
+def test_per_op_costs_follow_payload_and_folder_size(monkeypatch, tmp_path):
+    manifest = NoteManifest(":memory:")
+    backend, _ = make_backend(monkeypatch, time_scale=0, manifest=manifest)
+    backend.populate("Big", 100)
+    assert backend.get_stats()['calls'] == 0
+    
+    # 创建不查找，只按正文计费
+    assert backend.create_note("新备忘录", "x" * 3072, "Big", source_path=str(tmp_path / "a.md"))
+    assert backend.get_stats()['notes_scanned'] == 0
+    assert backend.get_stats()['payload_bytes'] == 3072
+    
+    # 没有记录ID时按标题遍历整个文件夹
+    backend.reset_stats()
+    assert backend.update_note("预置备忘录 1", "y", "Big")
+    stats = backend.get_stats()
+    assert stats['notes_scanned'] == 101
+    assert stats['simulated_seconds'] == pytest.approx(0.05 + 0.2 + 1 / 1024 * 0.01 + 101 * 0.001)
+    
+    # 清单中有ID时直接定位
+    backend.reset_stats()
+    assert backend.append_note("新备忘录", "z" * 1024, "Big", source_path=str(tmp_path / "a.md"))
+    stats = backend.get_stats()
+    assert stats['notes_scanned'] == 1 and stats['payload_bytes'] == 1024
+    
+    # 按文件夹统计只按文件夹数计费
+    backend.reset_stats()
+    counts = backend.count_notes_by_folder()
+    stats = backend.get_stats()
+    assert stats['calls'] == 1 and stats['notes_scanned'] == len(counts) == 2
+
+def test_serialize_holds_app_lock_while_charging(monkeypatch):
+    for serialize in (True, False):
+        backend, _ = make_backend(monkeypatch, serialize=serialize)
+        held = []
+        monkeypatch.setattr(simulated_backend.time, "sleep",
+                            lambda seconds: held.append(backend._app_lock.locked()))
+        backend._charge()
+        # 先启动进程（不占用备忘录应用），再在应用锁内处理调用
+        assert held == [False, serialize]
+
+def test_apply_batch_charges_one_call_per_chunk(monkeypatch):
+    backend, _ = make_backend(monkeypatch, time_scale=0, max_batch_size=4, max_batch_bytes=3000)
+    ops = [{'action': 'create', 'title': f"备忘录 {i}", 'content': "x" * 1000} for i in range(10)]
+    
+    results = backend.apply_batch(ops)
+    assert [result['status'] for result in results] == ["created"] * 10
+    # 按字节数每组最多3条，共4组，每组一次调用
+    stats = backend.get_stats()
+    assert stats['calls'] == 4
+    assert stats['payload_bytes'] == 10000
+    assert stats['simulated_seconds'] == pytest.approx(4 * (0.05 + 0.2) + 10000 / 1024 * 0.01)
+    
+    backend.reset_stats()
+    backend.apply_batch(ops[:8], max_batch_size=2, max_batch_bytes=10 ** 6)
+    assert backend.get_stats()['calls'] == 4
+
+def test_concurrent_apply_batch_overlaps_only_outside_app_lock(monkeypatch):
+    for serialize in (True, False):
+        backend, _ = make_backend(monkeypatch, serialize=serialize, max_batch_size=1,
+                                  concurrency=AdaptiveConcurrencyLimiter(initial_limit=3, max_limit=3))
+        active, peaks, lock = {'spawn': 0, 'app': 0}, {'spawn': 0, 'app': 0}, threading.Lock()
+        
+        def fake_sleep(seconds):
+            phase = 'spawn' if seconds == pytest.approx(0.05) else 'app'
+            with lock:
+                active[phase] += 1
+                peaks[phase] = max(peaks[phase], active[phase])
+            time.sleep(0.05)
+            with lock:
+                active[phase] -= 1
+        
+        monkeypatch.setattr(simulated_backend.time, "sleep", fake_sleep)
+        ops = [{'action': 'create', 'title': f"备忘录 {i}", 'content': ""} for i in range(6)]
+        assert all(result['success'] for result in backend.apply_batch(ops))
+        
+        stats = backend.get_stats()
+        assert stats['calls'] == 6
+        # 并发只缩短实际耗时，模拟耗时按调用数累计
+        assert stats['simulated_seconds'] == pytest.approx(6 * (0.05 + 0.2))
+        assert peaks['spawn'] > 1
+        if serialize:
+            assert peaks['app'] == 1
+            assert stats['queued_seconds'] > 0
+        else:
+            assert peaks['app'] > 1
+            assert stats['queued_seconds'] == 0
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""同步引擎规则执行路径测试"""
+
+from rules.basic_rules import ForceCreateRule, UpdateExistingRule
+
+class RecordingUpdateRule(UpdateExistingRule):
+    """只重写 execute 的子类，沿用父类的 build_operation"""
+    
+    def __init__(self):
+        super().__init__(priority=300)
+        self.executed = []
+    
+    def execute(self, md_file, apple_bridge, config):
+        self.executed.append(md_file.name)
+        return True
+
+def write_doc(tmp_path, name="doc.md"):
+    path = tmp_path / name
+    path.write_text("# 文档\n\n正文\n", encoding='utf-8')
+    return path
+
+def test_supports_batch_follows_execute_override():
+    assert UpdateExistingRule().supports_batch()
+    assert ForceCreateRule().supports_batch()
+    assert not RecordingUpdateRule().supports_batch()
+
+def test_execute_override_runs_with_manifest_and_delta(tmp_path, make_engine):
+    path = write_doc(tmp_path)
+    engine = make_engine(delta_updates={'enabled': True})
+    assert engine.sync_manifest is not None and engine.delta_planner is not None
+    rule = RecordingUpdateRule()
+    engine.rules = [rule]
+    
+    assert engine.sync_file(str(path))
+    assert rule.executed == ["doc.md"]
+    
+    stats = engine.sync_files([str(write_doc(tmp_path, "a.md")), str(write_doc(tmp_path, "b.md"))])
+    assert stats['failure_count'] == 0
+    assert sorted(rule.executed) == ["a.md", "b.md", "doc.md"]
+
+def test_force_create_ops_carry_source_path(tmp_path):
+    path = write_doc(tmp_path)
+    op = ForceCreateRule().build_operation(path, {})
+    assert op['action'] == 'create'
+    assert op['source_path'] == str(path)
+
+def test_single_file_sync_writes_each_op_without_batch_script(tmp_path, make_engine, monkeypatch):
+    path = write_doc(tmp_path)
+    engine = make_engine(delta_updates={'enabled': True})
+    
+    def no_batch(*args, **kwargs):
+        raise AssertionError("单个文件不应使用批量脚本")
+    
+    monkeypatch.setattr(engine.backend, 'apply_batch', no_batch)
+    assert engine.sync_file(str(path))
+    assert engine.sync_manifest.get(str(path)) is not None
+
+def test_applescript_reads_default_to_text_protocol(make_engine):
+    engine = make_engine(backend='applescript')
+    assert engine.backend.read_protocol == "text"
+
+def test_info_cache_is_opt_in_and_cleared_by_writes(tmp_path, make_engine):
+    engine = make_engine()
+    engine.get_notes_info()
+    assert not (tmp_path / "state" / "notes_info.json").exists()
+    
+    engine = make_engine(info_cache={'enabled': True, 'ttl_seconds': 300})
+    before = engine.get_notes_info()
+    assert (tmp_path / "state" / "notes_info.json").exists()
+    assert 'cached_at' in engine.get_notes_info()
+    
+    assert engine.sync_file(str(write_doc(tmp_path)))
+    assert not (tmp_path / "state" / "notes_info.json").exists()
+    assert engine.get_notes_info()['total_notes'] == before['total_notes'] + 1
+
+def test_split_decision_uses_converted_content_size(tmp_path, make_engine):
+    path = tmp_path / "big.md"
+    path.write_text("# 文档\n\n" + "".join(f"- **第{i}项**\n" for i in range(300)), encoding='utf-8')
+    engine = make_engine(split_notes={'enabled': True, 'max_part_bytes': 5500},
+                         delta_updates={'enabled': False}, sync_manifest={'enabled': False})
+    assert engine.delta_planner is None and engine.sync_manifest is None
+    # 源文件未超出预算，转换为备忘录正文后超出
+    assert path.stat().st_size < 5500
+    
+    assert engine.sync_file(str(path))
+    titles = engine.backend.get_existing_notes(f"Claude/{tmp_path.name}")
+    assert len(titles) > 1 and all(title.startswith("big (") for title in titles)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""同步清单测试"""
+
+import os
+
+from sync_manifest import SyncManifest, stat_signature
+
+def test_record_get_and_targets(tmp_path):
+    manifest = SyncManifest(tmp_path / "state" / "sync_manifest.db")
+    source = tmp_path / "a.md"
+    source.write_text("a")
+    signature = stat_signature(source.stat())
+    
+    assert manifest.get(str(source)) is None
+    manifest.record(str(source), "hash-1", "fp", [("F", "A", "body-1"), ("G", "A", "body-2")], signature=signature)
+    
+    record = manifest.get(str(source))
+    assert (record['content_hash'], record['fingerprint']) == ("hash-1", "fp")
+    assert (record['st_mtime_ns'], record['st_size'], record['st_ino']) == signature
+    assert manifest.get_targets(str(source)) == {("F", "A"): "body-1", ("G", "A"): "body-2"}
+    
+    # 再次记录替换之前的目标
+    manifest.record(str(source), "hash-2", "fp", [("F", "A", "body-3")])
+    assert manifest.get(str(source))['content_hash'] == "hash-2"
+    assert manifest.get_targets(str(source)) == {("F", "A"): "body-3"}
+    
+    manifest.remove(str(source))
+    assert manifest.get(str(source)) is None
+    assert manifest.get_targets(str(source)) == {}
+    manifest.close()
+
+def test_get_many_matches_equivalent_paths(tmp_path, monkeypatch):
+    manifest = SyncManifest(":memory:")
+    monkeypatch.chdir(tmp_path)
+    manifest.record(str(tmp_path / "a.md"), "h", "fp", [])
+    
+    records = manifest.get_many(["a.md", str(tmp_path / "a.md"), str(tmp_path / "b.md")])
+    assert set(records) == {"a.md", str(tmp_path / "a.md")}
+
+def test_get_many_full_scan_for_many_paths():
+    manifest = SyncManifest(":memory:")
+    paths = [f"/docs/{i}.md" for i in range(600)]
+    for path in paths[::2]:
+        manifest.record(path, "h", "fp", [])
+    assert sorted(manifest.get_many(paths)) == sorted(paths[::2])
+
+def test_record_signature_and_clear():
+    manifest = SyncManifest(":memory:")
+    manifest.record("/docs/a.md", "h", "fp", [], signature=(1, 2, 3))
+    manifest.record_signature("/docs/a.md", (4, 5, 6))
+    record = manifest.get("/docs/a.md")
+    assert (record['st_mtime_ns'], record['st_size'], record['st_ino']) == (4, 5, 6)
+    assert record['content_hash'] == "h"
+    
+    manifest.clear()
+    assert manifest.get("/docs/a.md") is None
+
+def write_docs(folder, count=3):
+    folder.mkdir()
+    paths = []
+    for i in range(count):
+        path = folder / f"doc{i}.md"
+        path.write_text(f"# 文档{i}\n\n正文 {i}\n", encoding='utf-8')
+        paths.append(path)
+    return paths
+
+def note_bodies(engine):
+    """后端中全部备忘录的标题到正文的映射"""
+    return {note['name']: note['body'] for folder in engine.backend.get_folders()
+            for note in engine.backend.iter_notes(folder, include_body=True)}
+
+def test_unchanged_files_are_skipped(tmp_path, make_engine):
+    paths = write_docs(tmp_path / "docs")
+    engine = make_engine()
+    
+    stats = engine.sync_folder(str(tmp_path / "docs"))
+    assert (stats['success_count'], stats['skipped_count']) == (3, 0)
+    
+    # 跳过的文件也计入成功数
+    stats = engine.sync_folder(str(tmp_path / "docs"))
+    assert (stats['success_count'], stats['skipped_count']) == (3, 3)
+    
+    # 只改变修改时间：重新计算摘要后仍然跳过，并记录新签名
+    stat_result = paths[0].stat()
+    os.utime(paths[0], ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 10 ** 9))
+    stats = engine.sync_folder(str(tmp_path / "docs"))
+    assert stats['skipped_count'] == 3
+    record = engine.sync_manifest.get(str(paths[0]))
+    assert record['st_mtime_ns'] == paths[0].stat().st_mtime_ns
+    
+    # 修改内容后重新同步
+    paths[1].write_text("# 文档1\n\n新的正文\n", encoding='utf-8')
+    stats = engine.sync_folder(str(tmp_path / "docs"))
+    assert stats['skipped_count'] == 2
+    assert "新的正文" in note_bodies(engine)["doc1"]
+
+def test_fingerprint_change_resyncs_everything(tmp_path, make_engine):
+    write_docs(tmp_path / "docs")
+    make_engine().sync_folder(str(tmp_path / "docs"))
+    
+    assert make_engine().sync_folder(str(tmp_path / "docs"))['skipped_count'] == 3
+    stats = make_engine(title_prefix="📄 ").sync_folder(str(tmp_path / "docs"))
+    assert (stats['success_count'], stats['skipped_count']) == (3, 0)
+
+def test_reset_and_disabled_manifest(tmp_path, make_engine):
+    paths = write_docs(tmp_path / "docs")
+    engine = make_engine()
+    engine.sync_folder(str(tmp_path / "docs"))
+    
+    engine.reset_sync_manifest([str(paths[0])])
+    assert engine.sync_folder(str(tmp_path / "docs"))['skipped_count'] == 2
+    
+    engine = make_engine(sync_manifest={'enabled': False})
+    assert engine.sync_manifest is None
+    assert engine.sync_folder(str(tmp_path / "docs"))['skipped_count'] == 0
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""两阶段同步计划测试"""
+
+import json
+
+from sync_plan import ACTION_CREATE, ACTION_EXECUTE, ACTION_UPDATE, SyncPlan, STATUS_PENDING
+
+# 模拟后端支持快照，规划时可以确定创建还是更新
+SIMULATED = {'backend': 'simulated', 'simulation': {'time_scale': 0}}
+
+def note_bodies(engine):
+    return {note['name']: note['body'] for folder in engine.backend.get_folders()
+            for note in engine.backend.iter_notes(folder, include_body=True)}
+
+def write_actions(entry):
+    """文件计划中的写入变更（不含直接执行的过滤规则）"""
+    return [change['action'] for change in entry['changes'] if change['action'] != ACTION_EXECUTE]
+
+def test_plan_and_apply_creates_notes(tmp_path, make_engine):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "a.md").write_text("# A\n\n正文\n", encoding='utf-8')
+    engine = make_engine(**SIMULATED)
+    
+    plan = engine.build_sync_plan([str(docs / "a.md")])
+    entry = plan.files[0]
+    assert entry['status'] == STATUS_PENDING
+    assert write_actions(entry) == [ACTION_CREATE]
+    assert entry['ops'][0]['action'] == 'create'
+    assert note_bodies(engine) == {}
+    
+    plan.save(tmp_path / "plan.json")
+    stats = engine.apply_sync_plan(SyncPlan.load(tmp_path / "plan.json"))
+    assert (stats['success_count'], stats['stale_count']) == (1, 0)
+    assert "正文" in note_bodies(engine)["a"]
+
+def test_plan_change_does_not_mutate_caller_op(tmp_path, make_engine):
+    engine = make_engine(**SIMULATED)
+    engine.backend.load_snapshot()
+    op = {'action': 'upsert', 'title': "新备忘录", 'folder': "Claude", 'content': "x"}
+    change, planned = engine._plan_change(op, engine.backend.snapshot_index, "Notes")
+    
+    assert change['action'] == ACTION_CREATE
+    assert planned['action'] == 'create'
+    assert op == {'action': 'upsert', 'title': "新备忘录", 'folder': "Claude", 'content': "x"}
+
+def test_saved_plan_stores_appended_body_once(tmp_path, make_engine):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    path = docs / "log.md"
+    head = "".join(f"第{i}行 已经同步的内容\n" for i in range(200))
+    path.write_text("# 日志\n\n" + head, encoding='utf-8')
+    engine = make_engine(delta_updates={'enabled': True}, **SIMULATED)
+    engine.sync_file(str(path))
+    
+    path.write_text("# 日志\n\n" + head + "新增的一行\n", encoding='utf-8')
+    plan = engine.build_sync_plan([str(path)])
+    entry = plan.files[0]
+    assert write_actions(entry) == [ACTION_UPDATE]
+    assert entry['ops'][0]['action'] == 'append'
+    
+    plan.save(tmp_path / "plan.json")
+    saved = (tmp_path / "plan.json").read_text(encoding='utf-8')
+    assert saved.count("第199行") == 1
+    assert 'content_offset' in json.loads(saved)['files'][0]['ops'][0]
+    
+    loaded = SyncPlan.load(tmp_path / "plan.json")
+    assert loaded.files[0]['ops'] == json.loads(json.dumps(entry['ops']))
+    
+    stats = engine.apply_sync_plan(loaded)
+    assert stats['failure_count'] == 0
+    body = note_bodies(engine)["log"]
+    assert body.count("第199行") == 1
+    assert "新增的一行" in body
+
+def test_modified_file_is_not_applied(tmp_path, make_engine):
+    path = tmp_path / "a.md"
+    path.write_text("# A\n", encoding='utf-8')
+    engine = make_engine()
+    plan = engine.build_sync_plan([str(path)])
+    
+    path.write_text("# A\n\n改动\n", encoding='utf-8')
+    stats = engine.apply_sync_plan(plan)
+    assert (stats['stale_count'], stats['failure_count']) == (1, 1)
+    assert note_bodies(engine) == {}